@@ -0,0 +1,23 @@
+"""
+ASGI config for IRL games archive project.
+
+Serves the same Django application as config/wsgi.py, plus the long-lived
+connections WSGI workers can't hold, like the comment event streams
+(games/<pk>/comments/stream/). It exposes a module-level variable named
+``application`` for any ASGI server.
+
+"""
+
+import os
+import sys
+from pathlib import Path
+
+from django.core.asgi import get_asgi_application
+
+# This allows easy placement of apps within the interior
+# games_project directory.
+BASE_DIR = Path(__file__).resolve(strict=True).parent.parent
+sys.path.append(str(BASE_DIR / "games_project"))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.production")
+
+application = get_asgi_application()
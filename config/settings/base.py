@@ -56,6 +56,8 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 ROOT_URLCONF = "config.urls"
 # https://docs.djangoproject.com/en/dev/ref/settings/#wsgi-application
 WSGI_APPLICATION = "config.wsgi.application"
+# https://docs.djangoproject.com/en/dev/howto/deployment/asgi/
+ASGI_APPLICATION = "config.asgi.application"
 
 # APPS
 # ------------------------------------------------------------------------------
@@ -85,6 +87,8 @@ LOCAL_APPS = [
     "games_project.users",
     "games_project.games",
     "games_project.feedback",
+    "games_project.instrumentation",
+    "games_project.jobs",
 ]
 # https://docs.djangoproject.com/en/dev/ref/settings/#installed-apps
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
@@ -133,7 +137,7 @@ AUTH_PASSWORD_VALIDATORS = [
 # https://docs.djangoproject.com/en/dev/ref/settings/#middleware
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "games_project.contrib.middleware.AsyncWhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.locale.LocaleMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -143,6 +147,8 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "allauth.account.middleware.AccountMiddleware",
     "games_project.users.middleware.UserIpMiddleware",
+    # last, so its view time covers the view only
+    "games_project.instrumentation.middleware.InstrumentationMiddleware",
 ]
 
 # STATIC
@@ -285,3 +291,47 @@ SOCIALACCOUNT_FORMS = {"signup": "games_project.users.forms.UserSocialSignupForm
 
 # Your stuff...
 # ------------------------------------------------------------------------------
+# UserIpMiddleware writes new IPs in batches of this many users...
+USER_IP_BUFFER_SIZE = env.int("USER_IP_BUFFER_SIZE", default=100)
+# ...or when this many seconds passed since the last write
+USER_IP_FLUSH_INTERVAL = env.int("USER_IP_FLUSH_INTERVAL", default=30)
+USER_IP_BACKGROUND_FLUSH = True
+
+# reply_async_view inserts queued comments in batches of this many...
+COMMENT_WRITE_BATCH_SIZE = env.int("COMMENT_WRITE_BATCH_SIZE", default=100)
+# ...collected for at most this many seconds, by a worker thread
+COMMENT_WRITE_FLUSH_INTERVAL = env.float("COMMENT_WRITE_FLUSH_INTERVAL", default=0.2)
+COMMENT_WRITE_BACKGROUND = True
+# fan-out of comment stream events: "local" (one process) or "redis"
+COMMENT_EVENTS_BROKER = env("COMMENT_EVENTS_BROKER", default="local")
+# rows the pending vote counts of a comment are spread over
+COMMENT_VOTE_SHARDS = env.int("COMMENT_VOTE_SHARDS", default=8)
+
+# the stats admin reads the game_stats_mv snapshot instead of the live stats,
+# keep it fresh with the refresh_game_stats_view command
+GAME_STATS_MATERIALIZED_VIEW = env.bool("GAME_STATS_MATERIALIZED_VIEW", default=False)
+
+# the run_jobs command applies a job action to this many objects per transaction...
+JOBS_CHUNK_SIZE = env.int("JOBS_CHUNK_SIZE", default=1000)
+# ...and takes over running jobs without progress for this many seconds
+JOBS_STALE_AFTER = env.int("JOBS_STALE_AFTER", default=300)
+
+# internal nginx location of MEDIA_ROOT, attachment downloads are handed off
+# to it with X-Accel-Redirect, see contrib.downloads. Streamed by Django if unset
+MEDIA_ACCEL_REDIRECT_URL = env("DJANGO_MEDIA_ACCEL_REDIRECT_URL", default=None)
+
+# InstrumentationMiddleware, off unless enabled
+INSTRUMENTATION_ENABLED = env.bool("DJANGO_INSTRUMENTATION_ENABLED", default=False)
+# share of the requests that are measured
+INSTRUMENTATION_SAMPLE_RATE = env.float(
+    "DJANGO_INSTRUMENTATION_SAMPLE_RATE", default=0.1
+)
+# requests logged as warnings, as are the ones repeating a query this many times
+INSTRUMENTATION_SLOW_REQUEST_MS = env.int(
+    "DJANGO_INSTRUMENTATION_SLOW_REQUEST_MS",
+    default=500,
+)
+INSTRUMENTATION_DUPLICATE_QUERIES = 5
+# last sampled requests summarized on the slow endpoints admin page
+INSTRUMENTATION_WINDOW = 1000
+INSTRUMENTATION_SLOW_ENDPOINTS = 20
@@ -72,6 +72,11 @@ STORAGES = {
         "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
     },
 }
+# the protected media location of compose/production/nginx/default.conf
+MEDIA_ACCEL_REDIRECT_URL = env(
+    "DJANGO_MEDIA_ACCEL_REDIRECT_URL",
+    default="/protected-media/",
+)
 
 # EMAIL
 # ------------------------------------------------------------------------------
@@ -150,9 +155,17 @@ LOGGING = {
             "handlers": ["console", "mail_admins"],
             "propagate": True,
         },
+        # one JSON line per sampled request, see InstrumentationMiddleware
+        "games_project.instrumentation": {
+            "level": "INFO",
+            "handlers": ["console"],
+            "propagate": False,
+        },
     },
 }
 
 
 # Your stuff...
 # ------------------------------------------------------------------------------
+# every server process streams the comment events of all processes
+COMMENT_EVENTS_BROKER = env("COMMENT_EVENTS_BROKER", default="redis")
@@ -36,3 +36,7 @@ TEMPLATES[0]["OPTIONS"]["debug"] = True  # type: ignore[index]
 MEDIA_URL = "http://media.testserver/"
 # Your stuff...
 # ------------------------------------------------------------------------------
+# Background threads would not see the data of the test transaction
+USER_IP_BACKGROUND_FLUSH = False
+USER_IP_BUFFER_SIZE = 1
+COMMENT_WRITE_BACKGROUND = False
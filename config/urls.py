@@ -1,11 +1,12 @@
 from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include
 from django.urls import path
 from django.views import defaults as default_views
 from django.views.generic import TemplateView
 
+from games_project.instrumentation.views import slow_endpoints_view
+
 urlpatterns = [
     path("", TemplateView.as_view(template_name="pages/home.html"), name="home"),
     path(
@@ -13,6 +14,12 @@ urlpatterns = [
         TemplateView.as_view(template_name="pages/about.html"),
         name="about",
     ),
+    # before the admin urls, which would answer it with a 404
+    path(
+        f"{settings.ADMIN_URL}slow-endpoints/",
+        slow_endpoints_view,
+        name="slow_endpoints",
+    ),
     # Django Admin, use {% url 'admin:index' %}
     path(settings.ADMIN_URL, admin.site.urls),
     # User management
@@ -21,8 +28,7 @@ urlpatterns = [
     # Your stuff: custom urls includes go here
     path("games/", include("games_project.games.urls", namespace="games")),
     # ...
-    # Media files
-    *static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT),
+    # no media urls, the attachments are downloaded through views checking access
 ]
 
 
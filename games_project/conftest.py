@@ -1,5 +1,8 @@
 import pytest
+from django.core.cache import cache
 
+from games_project.games.models import Category
+from games_project.games.models import Game
 from games_project.users.models import User
 from games_project.users.tests.factories import UserFactory
 
@@ -9,6 +12,23 @@ def _media_storage(settings, tmpdir) -> None:
     settings.MEDIA_ROOT = tmpdir.strpath
 
 
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    # cached pages and counts would outlive the rolled back test data
+    yield
+    cache.clear()
+
+
 @pytest.fixture
 def user(db) -> User:
     return UserFactory()
+
+
+@pytest.fixture
+def category(db) -> Category:
+    return Category.objects.create(title="Tag", slug="tag")
+
+
+@pytest.fixture
+def game(category) -> Game:
+    return Game.objects.create(title="Freeze tag", slug="freeze-tag", category=category)
@@ -0,0 +1,277 @@
+"""
+Admin pages that stay fast on tables with millions of rows: estimated
+counts instead of COUNT(*), autocomplete filters instead of a link per
+related object, and inlines showing one page of their objects.
+"""
+
+import contextlib
+import itertools
+import json
+
+from django import forms
+from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.utils import get_fields_from_path
+from django.contrib.admin.utils import lookup_spawns_duplicates
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+
+# rows from which an estimate is good enough for the changelist pages
+ESTIMATED_COUNT_THRESHOLD = 100_000
+# page links next to the current one in the changelist, as in Django's admin
+PAGE_LINKS_ON_EACH_SIDE = 3
+INLINE_PAGE_SIZE = 20
+
+
+def table_row_estimate(model, using="default"):
+    """Rows of the model's table from the planner statistics, None if unknown."""
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples FROM pg_class WHERE oid = to_regclass(%s)",
+            [connection.ops.quote_name(model._meta.db_table)],  # noqa: SLF001
+        )
+        row = cursor.fetchone()
+
+    # -1 until the table is first vacuumed or analyzed
+    return int(row[0]) if row and row[0] >= 0 else None
+
+
+def query_row_estimate(queryset):
+    """Rows the planner expects `queryset` to return."""
+    plan = json.loads(queryset.explain(format="json"))
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator of querysets that only counts exactly below
+    ESTIMATED_COUNT_THRESHOLD rows. Above it, whole tables are counted from
+    pg_class.reltuples and filtered querysets from the plan of the query.
+    A page counts the rows of the linked pages after it, which gives the
+    real end once it is near, until then the last pages aren't linked.
+    """
+
+    threshold = ESTIMATED_COUNT_THRESHOLD
+    estimated = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if queryset.query.where:
+            estimate = query_row_estimate(queryset)
+        else:
+            estimate = table_row_estimate(queryset.model, queryset.db)
+
+        if estimate is not None and estimate >= self.threshold:
+            self.estimated = True
+            return estimate
+        return super().count
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if self.estimated:
+            self._count_ahead(number)
+        return super().page(number)
+
+    def get_elided_page_range(
+        self, number=1, *, on_each_side=PAGE_LINKS_ON_EACH_SIDE, on_ends=2
+    ):
+        pages = list(
+            super().get_elided_page_range(
+                number, on_each_side=on_each_side, on_ends=on_ends
+            ),
+        )
+        if not self.estimated:
+            return pages
+
+        # the pages after the counted ones may not exist
+        last = self.validate_number(number) + on_each_side
+        linked = list(
+            itertools.takewhile(lambda p: p == self.ELLIPSIS or p <= last, pages),
+        )
+        if len(linked) < len(pages) and linked[-1] != self.ELLIPSIS:
+            linked.append(self.ELLIPSIS)
+        return linked
+
+    def _count_ahead(self, number):
+        bottom = (number - 1) * self.per_page
+        limit = (PAGE_LINKS_ON_EACH_SIDE + 1) * self.per_page
+        # LIMIT bounded, as cheap as reading the page itself
+        rows = self.object_list[bottom : bottom + limit].count()
+
+        if rows < limit:
+            self.estimated = False
+            count = bottom + rows
+        else:
+            count = max(self.count, bottom + rows)
+        self.__dict__["count"] = count
+        self.__dict__.pop("num_pages", None)
+
+
+class AutocompleteFilter(admin.SimpleListFilter):
+    """
+    Filter by one related object picked in a select2 autocomplete, searched
+    by the admin of the related model, instead of listing every related
+    object. Subclasses set `field_path`, e.g. "comments__author", and the
+    model admin uses LargeTableAdminMixin for the media.
+    """
+
+    template = "admin/autocomplete_filter.html"
+    field_path = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # ModelAdmin.lookup_allowed() reads it from the class
+        cls.parameter_name = f"{cls.field_path}__pk"
+
+    def __init__(self, request, params, model, model_admin):
+        self.relation = get_fields_from_path(model, self.field_path)[-1]
+        self.title = self.title or self.relation.verbose_name
+        self.admin_site = model_admin.admin_site
+        super().__init__(request, params, model, model_admin)
+
+        # the changelist redirects with ?e=1, the query would fail later
+        if (value := self.value()) is not None:
+            pk = self.relation.remote_field.model._meta.pk  # noqa: SLF001
+            try:
+                value = pk.to_python(value)
+                pk.run_validators(value)
+            except ValidationError as e:
+                raise IncorrectLookupParameters(e) from e
+            self.used_parameters[self.parameter_name] = value
+
+    def has_output(self):
+        return True
+
+    def lookups(self, request, model_admin):
+        return []
+
+    def choices(self, changelist):
+        yield {
+            "selected": self.value() is None,
+            "query_string": changelist.get_query_string(
+                remove=[self.parameter_name],
+            ),
+            "display": _("All"),
+        }
+
+    def widget(self):
+        field = forms.ModelChoiceField(
+            self.relation.remote_field.model._default_manager.all(),  # noqa: SLF001
+            widget=AutocompleteSelect(
+                self.relation,
+                self.admin_site,
+                attrs={"data-width": "100%"},
+            ),
+            required=False,
+        )
+        return field.widget.render(self.parameter_name, self.value())
+
+    def queryset(self, request, queryset):
+        if (value := self.value()) is None:
+            return queryset
+        if lookup_spawns_duplicates(queryset.model._meta, self.field_path):  # noqa: SLF001
+            # a subquery, joining a to-many relation would repeat rows
+            matching = queryset.model._default_manager.filter(  # noqa: SLF001
+                **{self.field_path: value},
+            )
+            return queryset.filter(pk__in=matching.values("pk"))
+        return queryset.filter(**{self.field_path: value})
+
+
+class LargeTableAdminMixin:
+    """
+    Changelist without exact counts of large tables, see
+    EstimatedCountPaginator, and with the media of AutocompleteFilter.
+    """
+
+    paginator = EstimatedCountPaginator
+    # skip the second COUNT(*) of the whole table next to filtered results
+    show_full_result_count = False
+
+    @property
+    def media(self):
+        media = super().media
+        if any(
+            isinstance(list_filter, type)
+            and issubclass(list_filter, AutocompleteFilter)
+            for list_filter in self.list_filter
+        ):
+            media += AutocompleteSelect(None, self.admin_site).media
+            # listed after jquery.init.js, which defines django.jQuery
+            media += forms.Media(
+                js=["admin/js/jquery.init.js", "js/admin_autocomplete_filter.js"],
+            )
+        return media
+
+
+class PaginatedInlineMixin:
+    """
+    Inline with forms for one page of its objects, `per_page` of them in
+    the inline's ordering, picked by the `<model>_page` query parameter.
+    The page links load other pages into the change form without a reload,
+    use raw_id_fields or autocomplete_fields for its relations.
+    """
+
+    per_page = INLINE_PAGE_SIZE
+    template = "admin/edit_inline/paginated_tabular.html"
+
+    @property
+    def page_param(self):
+        return f"{self.opts.model_name}_page"
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        per_page = self.per_page
+        page_param = self.page_param
+        params = request.GET.copy()
+
+        class PaginatedFormSet(formset):
+            def get_queryset(self):
+                if hasattr(self, "page"):
+                    return self._queryset
+
+                queryset = super().get_queryset()
+                self.paginator = Paginator(
+                    queryset.values_list("pk", flat=True), per_page
+                )
+                self.page = self.paginator.get_page(params.get(page_param))
+                if self.is_bound:
+                    # the objects of the submitted forms, even if the page
+                    # shifted since it was loaded
+                    pk_field = self.model._meta.pk  # noqa: SLF001
+                    pks = []
+                    for i in range(self.initial_form_count()):
+                        value = self.data.get(f"{self.add_prefix(i)}-{pk_field.name}")
+                        # invalid ids fail the validation of their form
+                        with contextlib.suppress(ValidationError):
+                            pks.append(pk_field.to_python(value))
+                else:
+                    pks = list(self.page.object_list)
+                self._queryset = queryset.filter(pk__in=pks)
+                return self._queryset
+
+            def page_links(self):
+                """(page number, query string) pairs, None for the gaps."""
+                self.get_queryset()
+                links = []
+                for number in self.paginator.get_elided_page_range(self.page.number):
+                    if number == self.paginator.ELLIPSIS:
+                        links.append((number, None))
+                        continue
+                    params[page_param] = number
+                    links.append((number, f"?{params.urlencode()}"))
+                return links
+
+        return PaginatedFormSet
+
+    @property
+    def media(self):
+        return super().media + forms.Media(
+            js=["admin/js/inlines.js", "js/admin_paginated_inline.js"],
+        )
@@ -0,0 +1,66 @@
+"""
+Downloads of stored files after the view checked access to them. Behind
+nginx, MEDIA_ACCEL_REDIRECT_URL is its internal location of MEDIA_ROOT and
+the view only answers with an X-Accel-Redirect, nginx sends the file with
+Range support. Without it, e.g. in development, Django streams the file.
+"""
+
+import mimetypes
+import posixpath
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse
+from django.http import Http404
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.cache import patch_cache_control
+from django.utils.http import content_disposition_header
+from django.utils.http import http_date
+
+
+def file_download_response(request, file, *, as_attachment=True):
+    """Response sending the FieldFile `file`, a 304 if the client has it."""
+    if not file:
+        raise Http404
+    storage, name = file.storage, file.name
+    try:
+        last_modified = int(storage.get_modified_time(name).timestamp())
+        size = storage.size(name)
+    except FileNotFoundError as e:
+        raise Http404 from e
+
+    etag = f'"{last_modified:x}-{size:x}"'
+    filename = posixpath.basename(name)
+    content_type, _ = mimetypes.guess_type(filename)
+
+    response = HttpResponse(content_type=content_type or "application/octet-stream")
+    response["Content-Disposition"] = content_disposition_header(
+        as_attachment,
+        filename,
+    )
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    # only for whoever was allowed to download it, revalidated every time
+    patch_cache_control(response, private=True, no_cache=True)
+
+    conditional = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=last_modified,
+        response=response,
+    )
+    if conditional is not response:
+        # a 304 or 412, before the file is opened
+        return conditional
+
+    if accel_url := settings.MEDIA_ACCEL_REDIRECT_URL:
+        response["X-Accel-Redirect"] = accel_url + quote(name)
+        return response
+
+    return FileResponse(
+        file.open("rb"),
+        as_attachment=as_attachment,
+        filename=filename,
+        headers=response.headers,
+    )
@@ -1,11 +1,25 @@
+import posixpath
+
 from django.contrib import admin
+from django.utils.html import format_html
+
+from games_project.contrib.admin_toolkit import AutocompleteFilter
+from games_project.contrib.admin_toolkit import LargeTableAdminMixin
 
 from .models import Comment
 
 
+class GameFilter(AutocompleteFilter):
+    field_path = "game"
+
+
+class AuthorFilter(AutocompleteFilter):
+    field_path = "author"
+
+
 # Register your models here.
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = [
         "author",
         "game",
@@ -14,9 +28,20 @@ class CommentAdmin(admin.ModelAdmin):
         "rating",
         "upvotes",
         "downvotes",
-        "attachment",
+        "display_attachment",
     ]
 
     list_display_links = ["text"]
-    list_editable = ["rating", "upvotes", "downvotes"]
+    list_filter = [GameFilter, AuthorFilter]
+    # votes are counted from CommentVote, see feedback.services.comment_vote
+    list_editable = ["rating"]
     ordering = ["-created"]
+    # the media urls of the file inputs are not served, see games:comment_attachment
+    readonly_fields = ["display_attachment"]
+
+    @admin.display(description="Download attachment")
+    def display_attachment(self, obj):
+        if url := obj.get_attachment_url():
+            name = posixpath.basename(obj.attachment.name)
+            return format_html('<a href="{}">{}</a>', url, name)
+        return None
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class FeedbackConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "games_project.feedback"
+
+    def ready(self):
+        import games_project.feedback.signals  # noqa: F401, PLC0415
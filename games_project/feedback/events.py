@@ -0,0 +1,123 @@
+import asyncio
+import contextlib
+import json
+import logging
+import threading
+from collections import defaultdict
+from functools import partial
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+
+def comments_channel(game_pk):
+    return f"games:comments-events:{game_pk}"
+
+
+class LocalBroker:
+    """
+    In-process pub/sub, enough for a single server process in development.
+    Publishing is thread safe, subscribers are asyncio queues.
+    """
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers[channel])
+
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(queue.put_nowait, message)
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self, channel):
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue())
+        with self._lock:
+            self._subscribers[channel].add(subscriber)
+        try:
+            yield subscriber[1]
+        finally:
+            with self._lock:
+                self._subscribers[channel].discard(subscriber)
+
+
+class RedisBroker:
+    """Redis pub/sub, fans events out to every server process."""
+
+    def __init__(self, url):
+        self.url = url
+        self._client = None
+
+    def publish(self, channel, message):
+        import redis  # noqa: PLC0415
+
+        if self._client is None:
+            self._client = redis.Redis.from_url(self.url)
+        self._client.publish(channel, message)
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self, channel):
+        import redis.asyncio  # noqa: PLC0415
+
+        client = redis.asyncio.Redis.from_url(self.url)
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(channel)
+        queue = asyncio.Queue()
+
+        async def read():
+            async for message in pubsub.listen():
+                await queue.put(message["data"].decode())
+
+        reader = asyncio.create_task(read())
+        try:
+            yield queue
+        finally:
+            reader.cancel()
+            await pubsub.unsubscribe(channel)
+            await pubsub.aclose()
+            await client.aclose()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def comments_broker():
+    """The broker picked by COMMENT_EVENTS_BROKER, "local" or "redis"."""
+    global _broker  # noqa: PLW0603
+
+    with _broker_lock:
+        if _broker is None:
+            if settings.COMMENT_EVENTS_BROKER == "redis":
+                _broker = RedisBroker(settings.REDIS_URL)
+            else:
+                _broker = LocalBroker()
+
+    return _broker
+
+
+def _publish(game_pk, message):
+    # live updates are best effort, the comment itself is saved
+    try:
+        comments_broker().publish(comments_channel(game_pk), message)
+    except Exception:
+        logger.exception("Failed to publish comment event of game %s", game_pk)
+
+
+def publish_comment_event(event, comment):
+    """
+    Send `event` ("comment" or "deleted") of a comment to the game's stream
+    subscribers once the transaction commits.
+    """
+    if event == "deleted":
+        data = {"id": comment.pk, "parent_id": comment.parent_id}
+    else:
+        data = comment.to_dict()
+
+    message = json.dumps({"event": event, "comment": data}, cls=DjangoJSONEncoder)
+    transaction.on_commit(partial(_publish, comment.game_id, message))
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from games_project.feedback.services import ACTIVITY_BACKFILL_BATCH_SIZE
+from games_project.feedback.services import activity_buckets_backfill_batch
+from games_project.games.models import Game
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the hourly comment activity buckets from comments, in batches "
+        "of games. Each batch is committed on its own, so an interrupted run "
+        "can be resumed with --after-game."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--after-game",
+            type=int,
+            default=0,
+            help="Only backfill games with a greater id (resume point).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=ACTIVITY_BACKFILL_BATCH_SIZE,
+            help=f"Games per batch (default = {ACTIVITY_BACKFILL_BATCH_SIZE}).",
+        )
+
+    def handle(self, *args, **options):
+        games = Game.objects.order_by("pk").values_list("pk", flat=True)
+        batch_size = options["batch_size"]
+
+        backfilled = 0
+        last_pk = options["after_game"]
+        while batch := list(games.filter(pk__gt=last_pk)[:batch_size]):
+            activity_buckets_backfill_batch(batch)
+            backfilled += len(batch)
+            last_pk = batch[-1]
+            self.stdout.write(
+                f"Backfilled {backfilled} games, resume with --after-game {last_pk}.",
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Backfilled activity of {backfilled} games."),
+        )
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from games_project.feedback.services import comment_votes_flush
+
+
+class Command(BaseCommand):
+    help = (
+        "Add the pending vote counts of the vote shards to their comments. "
+        "Runs once, or every --interval seconds until stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            help="Keep flushing, waiting this many seconds between flushes.",
+        )
+
+    def handle(self, *args, **options):
+        interval = options["interval"]
+
+        while True:
+            flushed = comment_votes_flush()
+            if flushed or not interval:
+                self.stdout.write(f"Flushed votes of {flushed} comments.")
+            if not interval:
+                break
+
+            time.sleep(interval)
+            close_old_connections()
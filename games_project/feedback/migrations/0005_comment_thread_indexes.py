@@ -0,0 +1,24 @@
+# Generated by Django 5.2.10 on 2026-10-18 14:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback', '0004_alter_comment_options_alter_comment_parent'),
+        ('games', '0013_gamestats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(condition=models.Q(('parent__isnull', True)), fields=['game', '-created', '-id'], name='feedback_comment_thread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['parent', 'created', 'id'], name='feedback_comment_replies_idx'),
+        ),
+    ]
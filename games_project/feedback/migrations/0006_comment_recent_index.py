@@ -0,0 +1,20 @@
+# Generated by Django 5.2.10 on 2026-10-18 14:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback', '0005_comment_thread_indexes'),
+        ('games', '0016_game_facet_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['game', 'created'], name='feedback_comment_recent_idx'),
+        ),
+    ]
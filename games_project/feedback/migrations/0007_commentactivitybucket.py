@@ -0,0 +1,33 @@
+# Generated by Django 5.2.10 on 2026-10-18 14:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback', '0006_comment_recent_index'),
+        ('games', '0016_game_facet_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommentActivityBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('comments_count', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('rating_count', models.PositiveIntegerField(default=0)),
+                ('upvotes', models.PositiveIntegerField(default=0)),
+                ('downvotes', models.PositiveIntegerField(default=0)),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity_buckets', to='games.game')),
+            ],
+            options={
+                'verbose_name': 'Comment activity bucket',
+                'verbose_name_plural': 'Comment activity buckets',
+                'constraints': [models.UniqueConstraint(fields=('game', 'hour'), name='feedback_bucket_game_hour_uniq')],
+            },
+        ),
+    ]
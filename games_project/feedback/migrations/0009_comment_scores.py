@@ -0,0 +1,38 @@
+# Generated by Django 5.2.10 on 2026-10-18 15:19
+
+import django.db.models.expressions
+import django.db.models.functions.comparison
+import django.db.models.functions.datetime
+import django.db.models.functions.math
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback', '0008_comment_votes'),
+        ('games', '0016_game_facet_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='hot_score',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.comparison.Cast(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.math.Sign(django.db.models.expressions.CombinedExpression(models.F('upvotes'), '-', models.F('downvotes'))), '*', django.db.models.functions.math.Log(10, django.db.models.functions.comparison.Greatest(django.db.models.functions.math.Abs(django.db.models.expressions.CombinedExpression(models.F('upvotes'), '-', models.F('downvotes'))), 1))), '+', django.db.models.expressions.CombinedExpression(django.db.models.functions.datetime.Extract('created', 'epoch'), '/', models.Value(45000))), models.FloatField()), output_field=models.FloatField()),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='score',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(downvotes=0, then=models.Value(0.0), upvotes=0), default=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Cast('upvotes', models.FloatField()), '/', django.db.models.functions.comparison.Cast(django.db.models.expressions.CombinedExpression(models.F('upvotes'), '+', models.F('downvotes')), models.FloatField())), '+', django.db.models.expressions.CombinedExpression(models.Value(3.8415999999999997), '/', django.db.models.expressions.CombinedExpression(models.Value(2), '*', django.db.models.functions.comparison.Cast(django.db.models.expressions.CombinedExpression(models.F('upvotes'), '+', models.F('downvotes')), models.FloatField())))), '-', django.db.models.expressions.CombinedExpression(models.Value(1.96), '*', django.db.models.functions.math.Sqrt(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Cast('upvotes', models.FloatField()), '/', django.db.models.functions.comparison.Cast(django.db.models.expressions.CombinedExpression(models.F('upvotes'), '+', models.F('downvotes')), models.FloatField())), '*', django.db.models.expressions.CombinedExpression(models.Value(1), '-', django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Cast('upvotes', models.FloatField()), '/', django.db.models.functions.comparison.Cast(django.db.models.expressions.CombinedExpression(models.F('upvotes'), '+', models.F('downvotes')), models.FloatField())))), '+', django.db.models.expressions.CombinedExpression(models.Value(3.8415999999999997), '/', django.db.models.expressions.CombinedExpression(models.Value(4), '*', django.db.models.functions.comparison.Cast(django.db.models.expressions.CombinedExpression(models.F('upvotes'), '+', models.F('downvotes')), models.FloatField())))), '/', django.db.models.functions.comparison.Cast(django.db.models.expressions.CombinedExpression(models.F('upvotes'), '+', models.F('downvotes')), models.FloatField()))))), '/', django.db.models.expressions.CombinedExpression(models.Value(1), '+', django.db.models.expressions.CombinedExpression(models.Value(3.8415999999999997), '/', django.db.models.functions.comparison.Cast(django.db.models.expressions.CombinedExpression(models.F('upvotes'), '+', models.F('downvotes')), models.FloatField())))), output_field=models.FloatField()), output_field=models.FloatField()),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['game', 'parent', '-score', '-id'], name='feedback_comment_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['game', 'parent', '-hot_score', '-id'], name='feedback_comment_hot_idx'),
+        ),
+    ]
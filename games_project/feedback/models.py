@@ -1,9 +1,67 @@
 from django.conf import settings
-from django.contrib.humanize.templatetags.humanize import naturaltime
 from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.db.models import Case
+from django.db.models import F
+from django.db.models import Prefetch
+from django.db.models import Q
+from django.db.models import Value
+from django.db.models import When
+from django.db.models.functions import Abs
+from django.db.models.functions import Cast
+from django.db.models.functions import Extract
+from django.db.models.functions import Greatest
+from django.db.models.functions import Log
+from django.db.models.functions import Sign
+from django.db.models.functions import Sqrt
+from django.urls import reverse
+
+from games_project.games.pagination import PAGE_SIZE
+from games_project.games.pagination import apaginate_keyset
+from games_project.games.pagination import encode_cursor
+
+# orderings of the top-level comments by the `sort` of the comments API
+COMMENTS_ORDERINGS = {
+    "new": ["-created", "-id"],
+    "top": ["-score", "-id"],
+    "hot": ["-hot_score", "-id"],
+}
+REPLIES_ORDERING = ["created", "id"]
+REPLIES_PREVIEW_SIZE = 3
+# confidence of the Wilson score, 95%
+WILSON_Z = 1.96
+# age in seconds that weighs as much as ten times the votes in the hot score
+HOT_DECAY_SECONDS = 45_000
+
+
+def _wilson_score():
+    # lower bound of the Wilson interval of the share of upvotes
+    total = Cast(F("upvotes") + F("downvotes"), models.FloatField())
+    share = Cast("upvotes", models.FloatField()) / total
+    z2 = WILSON_Z**2
+
+    return Case(
+        When(upvotes=0, downvotes=0, then=Value(0.0)),
+        default=(
+            share
+            + z2 / (2 * total)
+            - WILSON_Z * Sqrt((share * (1 - share) + z2 / (4 * total)) / total)
+        )
+        / (1 + z2 / total),
+        output_field=models.FloatField(),
+    )
+
+
+def _hot_score():
+    # order of magnitude of the net votes plus a bonus growing with time
+    votes = F("upvotes") - F("downvotes")
+    return Cast(
+        Sign(votes) * Log(10, Greatest(Abs(votes), 1))
+        + Extract("created", "epoch") / HOT_DECAY_SECONDS,
+        models.FloatField(),
+    )
 
 
 class Comment(models.Model):
@@ -31,8 +89,21 @@ class Comment(models.Model):
         validators=[MinValueValidator(1), MaxValueValidator(10)],
     )
 
-    upvotes = models.PositiveSmallIntegerField(default=0)
-    downvotes = models.PositiveSmallIntegerField(default=0)
+    # flushed vote counts, pending ones are in CommentVoteShard
+    upvotes = models.PositiveIntegerField(default=0)
+    downvotes = models.PositiveIntegerField(default=0)
+
+    # stored by Postgres, so every write of the votes updates them
+    score = models.GeneratedField(
+        expression=_wilson_score(),
+        output_field=models.FloatField(),
+        db_persist=True,
+    )
+    hot_score = models.GeneratedField(
+        expression=_hot_score(),
+        output_field=models.FloatField(),
+        db_persist=True,
+    )
 
     created = models.DateTimeField(auto_now_add=True)
     modified = models.DateTimeField(auto_now=True)
@@ -41,6 +112,32 @@ class Comment(models.Model):
         ordering = ["created"]
         verbose_name = "Comment"
         verbose_name_plural = "Comments"
+        indexes = [
+            # keyset pagination of top-level comments and of replies
+            models.Index(
+                fields=["game", "-created", "-id"],
+                condition=Q(parent__isnull=True),
+                name="feedback_comment_thread_idx",
+            ),
+            models.Index(
+                fields=["parent", "created", "id"],
+                name="feedback_comment_replies_idx",
+            ),
+            # top K comments and replies by score
+            models.Index(
+                fields=["game", "parent", "-score", "-id"],
+                name="feedback_comment_score_idx",
+            ),
+            models.Index(
+                fields=["game", "parent", "-hot_score", "-id"],
+                name="feedback_comment_hot_idx",
+            ),
+            # recent activity per game, see games_recent_comment_counts()
+            models.Index(
+                fields=["game", "created"],
+                name="feedback_comment_recent_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.text
@@ -59,6 +156,15 @@ class Comment(models.Model):
             msg = "Cannot reply to a reply. Maximum nesting depth is 1."
             raise ValidationError(msg)
 
+    def get_attachment_url(self):
+        """Download url of the attachment, None without one."""
+        if not self.attachment:
+            return None
+        return reverse(
+            "games:comment_attachment",
+            kwargs={"game_pk": self.game_id, "comment_pk": self.pk},
+        )
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -67,27 +173,143 @@ class Comment(models.Model):
             "rating": self.rating or "-",
             "upvotes": self.upvotes,
             "downvotes": self.downvotes,
-            "time_ago": naturaltime(self.created),
+            # absolute time keeps cached payloads valid, clients format it
+            "created": self.created.isoformat(),
             "parent_id": self.parent_id,
+            "attachment_url": self.get_attachment_url(),
         }
 
     @classmethod
-    def get_all_for_game(cls, game_pk):
+    async def aget_page_for_game(
+        cls, game_pk, cursor=None, limit=PAGE_SIZE, sort="new"
+    ):
+        preview = cls.objects.select_related("author").order_by(*REPLIES_ORDERING)[
+            : REPLIES_PREVIEW_SIZE + 1
+        ]
         comments = (
             cls.objects.filter(game__pk=game_pk, parent__isnull=True)
             .select_related("author")
-            .prefetch_related("replies__author")
-            .order_by("-created")
+            .prefetch_related(
+                Prefetch("replies", queryset=preview, to_attr="replies_preview"),
+            )
+        )
+        comments, next_cursor = await apaginate_keyset(
+            comments, COMMENTS_ORDERINGS[sort], cursor, limit
         )
 
         comments_with_replies = []
         for comment in comments:
             comment_dict = comment.to_dict()
 
-            comment_dict["replies"] = [
-                reply.to_dict() for reply in comment.replies.all().order_by("created")
-            ]
+            replies = comment.replies_preview[:REPLIES_PREVIEW_SIZE]
+            comment_dict["replies"] = [reply.to_dict() for reply in replies]
+            comment_dict["replies_next_cursor"] = (
+                encode_cursor([replies[-1].created, replies[-1].id])
+                if len(comment.replies_preview) > REPLIES_PREVIEW_SIZE
+                else None
+            )
 
             comments_with_replies.append(comment_dict)
 
-        return comments_with_replies
+        return {"results": comments_with_replies, "next_cursor": next_cursor}
+
+    @classmethod
+    async def aget_replies_page(cls, game_pk, comment_pk, cursor=None, limit=PAGE_SIZE):
+        replies = cls.objects.filter(
+            game__pk=game_pk, parent__pk=comment_pk
+        ).select_related("author")
+        replies, next_cursor = await apaginate_keyset(
+            replies, REPLIES_ORDERING, cursor, limit
+        )
+
+        return {
+            "results": [reply.to_dict() for reply in replies],
+            "next_cursor": next_cursor,
+        }
+
+
+class CommentVote(models.Model):
+    """The vote of a user on a comment, counted through CommentVoteShard."""
+
+    class Value(models.IntegerChoices):
+        UP = 1, "Upvote"
+        DOWN = -1, "Downvote"
+
+    comment = models.ForeignKey(Comment, on_delete=models.CASCADE, related_name="votes")
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="comment_votes"
+    )
+    value = models.SmallIntegerField(choices=Value.choices)
+    created = models.DateTimeField(auto_now_add=True)
+    modified = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Comment vote"
+        verbose_name_plural = "Comment votes"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["comment", "user"],
+                name="feedback_vote_comment_user_uniq",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_value_display()} of comment #{self.comment_id}"
+
+
+class CommentVoteShard(models.Model):
+    """
+    Vote counts of a comment not yet added to it by flush_comment_votes,
+    spread over COMMENT_VOTE_SHARDS rows so that votes on a hot comment
+    rarely wait for the same row lock. Counts may be negative.
+    """
+
+    comment = models.ForeignKey(
+        Comment, on_delete=models.CASCADE, related_name="vote_shards"
+    )
+    shard = models.PositiveSmallIntegerField()
+    upvotes = models.IntegerField(default=0)
+    downvotes = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Comment vote shard"
+        verbose_name_plural = "Comment vote shards"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["comment", "shard"],
+                name="feedback_vote_shard_uniq",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Votes of comment #{self.comment_id}, shard {self.shard}"
+
+
+class CommentActivityBucket(models.Model):
+    """
+    Comments of a game written in one (UTC) hour, kept up to date by
+    feedback.services so activity over time never scans the comments.
+    """
+
+    game = models.ForeignKey(
+        "games.Game", on_delete=models.CASCADE, related_name="activity_buckets"
+    )
+    hour = models.DateTimeField()
+    comments_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    upvotes = models.PositiveIntegerField(default=0)
+    downvotes = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Comment activity bucket"
+        verbose_name_plural = "Comment activity buckets"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["game", "hour"],
+                name="feedback_bucket_game_hour_uniq",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Activity of game #{self.game_id} at {self.hour:%Y-%m-%d %H}h"
@@ -0,0 +1,114 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.db import close_old_connections
+
+from .services import comments_create_batch
+
+logger = logging.getLogger(__name__)
+
+
+class CommentWriteQueue:
+    """
+    Accepted comments waiting to be inserted by a worker thread, in batches
+    of up to `max_batch` comments collected for at most `flush_interval`
+    seconds. Without `background` comments are written right away, in the
+    caller's thread.
+
+    The queue lives in process memory: comments still waiting when the
+    process is killed are lost, a normal exit writes them first.
+    """
+
+    def __init__(self, max_batch, flush_interval, *, background=True):
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.background = background
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def add(self, comment):
+        if not self.background:
+            self._write([comment])
+            return
+
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, daemon=True)
+                self._worker.start()
+        self._queue.put(comment)
+
+    def close(self, timeout=None):
+        """Write the waiting comments and stop the worker."""
+        with self._lock:
+            worker, self._worker = self._worker, None
+        if worker is not None:
+            self._queue.put(None)
+            worker.join(timeout)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while batch[-1] is not None and len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            stop = batch[-1] is None
+            if comments := [comment for comment in batch if comment is not None]:
+                close_old_connections()
+                try:
+                    self._write(comments)
+                except Exception:
+                    logger.exception(
+                        "Failed to save %s accepted comments", len(comments)
+                    )
+            if stop:
+                return
+
+    def _write(self, comments):
+        try:
+            comments_create_batch(comments)
+        except DatabaseError:
+            if not self.background:
+                raise
+            # e.g. a game deleted meanwhile, don't lose the rest of the batch
+            for comment in comments:
+                self._write_one(comment)
+
+    def _write_one(self, comment):
+        try:
+            comments_create_batch([comment])
+        except DatabaseError:
+            logger.exception("Failed to save accepted comment %s", comment.pk)
+
+
+_comment_write_queue = None
+_comment_write_queue_lock = threading.Lock()
+
+
+def comment_write_queue():
+    """The process-wide queue, created on first use."""
+    global _comment_write_queue  # noqa: PLW0603
+
+    with _comment_write_queue_lock:
+        if _comment_write_queue is None:
+            _comment_write_queue = CommentWriteQueue(
+                max_batch=settings.COMMENT_WRITE_BATCH_SIZE,
+                flush_interval=settings.COMMENT_WRITE_FLUSH_INTERVAL,
+                background=settings.COMMENT_WRITE_BACKGROUND,
+            )
+            atexit.register(_comment_write_queue.close)
+
+    return _comment_write_queue
@@ -0,0 +1,325 @@
+import datetime
+import random
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.db import connection
+from django.db import transaction
+from django.db.models import Count
+from django.db.models import F
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
+from django.db.models.functions import TruncHour
+
+from games_project.games.cache import invalidate_comments_cache
+from games_project.games.services import game_stats_comments_created
+
+from .events import publish_comment_event
+from .models import Comment
+from .models import CommentActivityBucket
+from .models import CommentVote
+from .models import CommentVoteShard
+
+ACTIVITY_BACKFILL_BATCH_SIZE = 100
+ACTIVITY_FIELDS = [
+    "comments_count",
+    "rating_sum",
+    "rating_count",
+    "upvotes",
+    "downvotes",
+]
+
+
+def activity_hour(moment):
+    """Start of the UTC hour of `moment`, the key of its activity bucket."""
+    return moment.astimezone(datetime.UTC).replace(minute=0, second=0, microsecond=0)
+
+
+def _activity_totals(comments):
+    return (
+        comments.order_by()
+        .annotate(hour=TruncHour("created", tzinfo=datetime.UTC))
+        .values("game_id", "hour")
+        .annotate(
+            comments_count=Count("id"),
+            rating_sum=Sum("rating", default=0),
+            rating_count=Count("rating"),
+            upvotes=Sum("upvotes", default=0),
+            downvotes=Sum("downvotes", default=0),
+        )
+    )
+
+
+def _activity_buckets_save(totals):
+    CommentActivityBucket.objects.bulk_create(
+        [CommentActivityBucket(**row) for row in totals],
+        update_conflicts=True,
+        unique_fields=["game", "hour"],
+        update_fields=ACTIVITY_FIELDS,
+    )
+
+
+def activity_bucket_rebuild(game_id, hour):
+    """Recalculate one bucket from the comments of its hour."""
+    comments = Comment.objects.filter(
+        game_id=game_id,
+        created__gte=hour,
+        created__lt=hour + datetime.timedelta(hours=1),
+    )
+    totals = list(_activity_totals(comments))
+
+    if totals:
+        _activity_buckets_save(totals)
+    else:
+        CommentActivityBucket.objects.filter(game_id=game_id, hour=hour).delete()
+
+
+def activity_bucket_comment_created(comment):
+    activity_buckets_comments_created([comment])
+
+
+def activity_buckets_comments_created(comments):
+    """Add new comments to their buckets, one UPDATE per game and hour."""
+    by_bucket = defaultdict(list)
+    for comment in comments:
+        by_bucket[comment.game_id, activity_hour(comment.created)].append(comment)
+
+    for (game_id, hour), bucket_comments in by_bucket.items():
+        ratings = [c.rating for c in bucket_comments if c.rating is not None]
+
+        updated = CommentActivityBucket.objects.filter(
+            game_id=game_id, hour=hour
+        ).update(
+            comments_count=F("comments_count") + len(bucket_comments),
+            rating_sum=F("rating_sum") + sum(ratings),
+            rating_count=F("rating_count") + len(ratings),
+            upvotes=F("upvotes") + sum(c.upvotes for c in bucket_comments),
+            downvotes=F("downvotes") + sum(c.downvotes for c in bucket_comments),
+        )
+
+        # first comments of the hour
+        if not updated:
+            activity_bucket_rebuild(game_id, hour)
+
+
+def activity_bucket_comment_changed(comment):
+    # rating or votes may have changed, the previous values are not known here
+    activity_bucket_rebuild(comment.game_id, activity_hour(comment.created))
+
+
+def activity_bucket_comment_deleted(comment):
+    has_rating = comment.rating is not None
+
+    # never create rows here, the game itself may be deleted in this transaction
+    CommentActivityBucket.objects.filter(
+        game_id=comment.game_id, hour=activity_hour(comment.created)
+    ).update(
+        comments_count=F("comments_count") - 1,
+        rating_sum=F("rating_sum") - (comment.rating or 0),
+        rating_count=F("rating_count") - int(has_rating),
+        upvotes=F("upvotes") - comment.upvotes,
+        downvotes=F("downvotes") - comment.downvotes,
+    )
+
+
+def activity_buckets_votes_flushed(votes):
+    """
+    Add flushed vote counts, (game_id, created, upvotes, downvotes) of each
+    comment, to the buckets. One UPDATE per game and hour.
+    """
+    totals = defaultdict(lambda: [0, 0])
+    for game_id, created, upvotes, downvotes in votes:
+        bucket = totals[game_id, activity_hour(created)]
+        bucket[0] += upvotes
+        bucket[1] += downvotes
+
+    for (game_id, hour), (upvotes, downvotes) in totals.items():
+        updated = CommentActivityBucket.objects.filter(
+            game_id=game_id, hour=hour
+        ).update(
+            upvotes=F("upvotes") + upvotes,
+            downvotes=F("downvotes") + downvotes,
+        )
+
+        # not backfilled yet
+        if not updated:
+            activity_bucket_rebuild(game_id, hour)
+
+
+def activity_buckets_reset_rating(games):
+    return CommentActivityBucket.objects.filter(game__in=games).update(
+        rating_sum=0,
+        rating_count=0,
+    )
+
+
+def activity_buckets_backfill_batch(game_ids):
+    """
+    Replace the buckets of the given games with ones recalculated from their
+    comments. Running it again for the same games gives the same buckets.
+    """
+    with transaction.atomic():
+        CommentActivityBucket.objects.filter(game_id__in=game_ids).delete()
+        _activity_buckets_save(
+            _activity_totals(Comment.objects.filter(game_id__in=game_ids)),
+        )
+
+
+def comment_allocate_id():
+    """Take the id of a comment before inserting it, see comments_create_batch."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, 'id'))",
+            [Comment._meta.db_table],  # noqa: SLF001
+        )
+        return cursor.fetchone()[0]
+
+
+def comments_create_batch(comments):
+    """
+    Insert already validated comments in one statement. bulk_create skips
+    the signals, so stats, activity buckets and caches are updated here,
+    batched per game.
+    """
+    with transaction.atomic():
+        created = Comment.objects.bulk_create(comments)
+        game_stats_comments_created(created)
+        activity_buckets_comments_created(created)
+        invalidate_comments_cache(*{comment.game_id for comment in created})
+        for comment in created:
+            publish_comment_event("comment", comment)
+
+    return created
+
+
+def _comment_vote_save(comment_id, user, value):
+    # an INSERT first, two first votes of the same user can't both succeed
+    if value:
+        try:
+            with transaction.atomic():
+                CommentVote.objects.create(
+                    comment_id=comment_id, user=user, value=value
+                )
+        except IntegrityError:
+            pass
+        else:
+            return 0
+
+    vote = (
+        CommentVote.objects.select_for_update()
+        .filter(comment_id=comment_id, user=user)
+        .first()
+    )
+    if vote is None:
+        return 0
+
+    previous = vote.value
+    if not value:
+        vote.delete()
+    elif value != previous:
+        vote.value = value
+        vote.save(update_fields=["value", "modified"])
+    return previous
+
+
+def _vote_shard_add(comment_id, upvotes, downvotes):
+    table = CommentVoteShard._meta.db_table  # noqa: SLF001
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {table} (comment_id, shard, upvotes, downvotes)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (comment_id, shard) DO UPDATE SET
+                upvotes = {table}.upvotes + EXCLUDED.upvotes,
+                downvotes = {table}.downvotes + EXCLUDED.downvotes
+            """,  # noqa: S608
+            [
+                comment_id,
+                random.randrange(settings.COMMENT_VOTE_SHARDS),
+                upvotes,
+                downvotes,
+            ],
+        )
+
+
+def comment_vote(*, comment_id, user, value):
+    """
+    Set the vote of `user` on a comment to `value`, 1 or -1, or take it back
+    with 0, and return the previous value. The counts change in a random
+    shard, the comment row is never locked.
+    """
+    with transaction.atomic():
+        previous = _comment_vote_save(comment_id, user, value)
+        if previous != value:
+            _vote_shard_add(
+                comment_id,
+                upvotes=(value == CommentVote.Value.UP)
+                - (previous == CommentVote.Value.UP),
+                downvotes=(value == CommentVote.Value.DOWN)
+                - (previous == CommentVote.Value.DOWN),
+            )
+
+    return previous
+
+
+def comment_vote_counts(comment_id):
+    """Up- and downvotes of a comment, the pending ones included."""
+    return (
+        Comment.objects.filter(pk=comment_id)
+        .annotate(
+            total_upvotes=F("upvotes") + Coalesce(Sum("vote_shards__upvotes"), 0),
+            total_downvotes=F("downvotes") + Coalesce(Sum("vote_shards__downvotes"), 0),
+        )
+        .values_list("total_upvotes", "total_downvotes")
+        .get()
+    )
+
+
+def comment_votes_flush():
+    """
+    Move the counts of all vote shards to their comments in one statement,
+    then update the activity buckets, caches and streams of those comments.
+    Returns the number of updated comments.
+    """
+    shards = CommentVoteShard._meta.db_table  # noqa: SLF001
+    comments = Comment._meta.db_table  # noqa: SLF001
+
+    with transaction.atomic():
+        # votes added meanwhile wait for the deleted shard rows, then insert
+        # new ones
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH flushed AS (
+                    DELETE FROM {shards}
+                    RETURNING comment_id, upvotes, downvotes
+                ), totals AS (
+                    SELECT comment_id,
+                        SUM(upvotes) AS upvotes,
+                        SUM(downvotes) AS downvotes
+                    FROM flushed
+                    GROUP BY comment_id
+                )
+                UPDATE {comments} AS comment SET
+                    upvotes = GREATEST(comment.upvotes + totals.upvotes, 0),
+                    downvotes = GREATEST(comment.downvotes + totals.downvotes, 0)
+                FROM totals
+                WHERE comment.id = totals.comment_id
+                RETURNING comment.id, comment.game_id, comment.created,
+                    totals.upvotes, totals.downvotes
+                """,  # noqa: S608
+            )
+            flushed = cursor.fetchall()
+
+        if not flushed:
+            return 0
+
+        activity_buckets_votes_flushed([row[1:] for row in flushed])
+        invalidate_comments_cache(*{row[1] for row in flushed})
+        for comment in Comment.objects.filter(
+            pk__in=[row[0] for row in flushed]
+        ).select_related("author"):
+            publish_comment_event("comment", comment)
+
+    return len(flushed)
@@ -0,0 +1,57 @@
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from games_project.games.cache import invalidate_comments_cache
+from games_project.games.services import game_stats_comment_changed
+from games_project.games.services import game_stats_comment_created
+from games_project.games.services import game_stats_comment_deleted
+
+from .events import publish_comment_event
+from .models import Comment
+from .services import activity_bucket_comment_changed
+from .services import activity_bucket_comment_created
+from .services import activity_bucket_comment_deleted
+
+
+@receiver(post_save, sender=Comment)
+def update_game_stats_on_save(sender, instance, created, **kwargs):
+    if created:
+        game_stats_comment_created(instance)
+    else:
+        game_stats_comment_changed(instance)
+
+
+# post_delete also fires for replies removed by cascade and admin bulk delete
+@receiver(post_delete, sender=Comment)
+def update_game_stats_on_delete(sender, instance, **kwargs):
+    game_stats_comment_deleted(instance)
+
+
+@receiver(post_save, sender=Comment)
+def update_activity_bucket_on_save(sender, instance, created, **kwargs):
+    if created:
+        activity_bucket_comment_created(instance)
+    else:
+        activity_bucket_comment_changed(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def update_activity_bucket_on_delete(sender, instance, **kwargs):
+    activity_bucket_comment_deleted(instance)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comments_cache_on_change(sender, instance, **kwargs):
+    invalidate_comments_cache(instance.game_id)
+
+
+@receiver(post_save, sender=Comment)
+def publish_comment_on_save(sender, instance, **kwargs):
+    publish_comment_event("comment", instance)
+
+
+@receiver(post_delete, sender=Comment)
+def publish_comment_on_delete(sender, instance, **kwargs):
+    publish_comment_event("deleted", instance)
@@ -1,81 +1,286 @@
+let nextCommentsCursor = null;
+let commentsLoading = false;
+// Aborts the list request in flight when the list is reloaded
+let commentsRequest = null;
+
 document.addEventListener("DOMContentLoaded", function() {
-    loadComments()
+    loadComments();
+
+    const sortSelect = document.getElementById("comments-sort");
+    if (sortSelect) sortSelect.addEventListener("change", () => loadComments());
+
+    const newHint = document.getElementById("comments-new-hint");
+    if (newHint) {
+        newHint.addEventListener("click", () => {
+            if (sortSelect) sortSelect.value = "new";
+            loadComments();
+        });
+    }
+
+    // Fetch the next page when the end of the list scrolls into view
+    const sentinel = document.getElementById("comments-sentinel");
+    if (sentinel) {
+        const observer = new IntersectionObserver(entries => {
+            if (entries.some(entry => entry.isIntersecting) && nextCommentsCursor) {
+                loadComments(nextCommentsCursor);
+            }
+        });
+        observer.observe(sentinel);
+    }
+
+    listenForComments();
 });
 
-function loadComments() {
+// New, changed and deleted comments pushed by the server, applied in place
+function listenForComments() {
     const commentsContainer = document.getElementById("comments-container");
-    const commentTemplate = document.getElementById("comment-template");
+    if (!commentsContainer || !window.EventSource) return;
 
-    const url = commentsContainer.getAttribute("data-url");
+    const events = new EventSource(`${commentsContainer.getAttribute("data-url")}stream/`);
+    events.addEventListener("comment", event => applyComment(JSON.parse(event.data).comment));
+    events.addEventListener("deleted", event => removeComment(JSON.parse(event.data).comment));
+}
 
-    fetch(url)
+// Up- or downvote, clicking the active vote again takes it back
+document.addEventListener("click", function(event) {
+    const button = event.target.closest('.vote-btn');
+    if (!button) return;
+
+    const commentsContainer = document.getElementById("comments-container");
+    const card = button.closest('.card[data-comment-id]');
+    const csrfInput = document.querySelector('[name=csrfmiddlewaretoken]');
+    const value = card.dataset.vote === button.dataset.value ? 0 : Number(button.dataset.value);
+
+    fetch(`${commentsContainer.getAttribute("data-url")}${card.dataset.commentId}/vote/`, {
+        method: "POST",
+        headers: {
+            'Content-Type': 'application/json',
+            'X-CSRFToken': csrfInput ? csrfInput.value : ''
+        },
+        body: JSON.stringify({ value: value })
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (!data.success) {
+            alert("Failed to vote: " + JSON.stringify(data.errors));
+            return;
+        }
+
+        card.dataset.vote = data.vote;
+        card.querySelectorAll(':scope > div .vote-btn').forEach(voteButton => {
+            voteButton.classList.toggle('fw-bold', voteButton.dataset.value === String(data.vote));
+        });
+        card.querySelector('.comment-upvotes').textContent = data.upvotes;
+        card.querySelector('.comment-downvotes').textContent = data.downvotes;
+    })
+    .catch(error => {
+        alert("Failed to vote: " + error.message);
+    });
+});
+
+function findCommentCard(commentId) {
+    const commentsContainer = document.getElementById("comments-container");
+    return commentsContainer.querySelector(`.card[data-comment-id="${commentId}"]`);
+}
+
+// Update a shown comment or insert a new one where it belongs
+function applyComment(comment) {
+    const commentsContainer = document.getElementById("comments-container");
+    const card = findCommentCard(comment.id);
+
+    if (card) {
+        card.querySelector('.comment-text').textContent = comment.text;
+        card.querySelector('.comment-upvotes').textContent = comment.upvotes;
+        card.querySelector('.comment-downvotes').textContent = comment.downvotes;
+        card.querySelector('.comment-rating').textContent = comment.rating;
+        return;
+    }
+
+    if (comment.parent_id) {
+        const parentCard = findCommentCard(comment.parent_id);
+        const repliesContainer = parentCard ? parentCard.querySelector('.replies') : null;
+        if (repliesContainer) {
+            const moreButton = repliesContainer.querySelector('.more-replies-btn');
+            repliesContainer.insertBefore(createCommentElement(comment, true), moreButton);
+        }
+        return;
+    }
+
+    // Only the newest first list starts with it, others offer to switch
+    const sortSelect = document.getElementById("comments-sort");
+    if (sortSelect && sortSelect.value !== "new") {
+        const newHint = document.getElementById("comments-new-hint");
+        if (newHint) newHint.classList.remove('d-none');
+        return;
+    }
+
+    const noComments = commentsContainer.querySelector('.alert');
+    if (noComments) noComments.remove();
+    commentsContainer.prepend(createCommentElement(comment, false));
+}
+
+function removeComment(comment) {
+    const card = findCommentCard(comment.id);
+    if (card) card.remove();
+}
+
+// Without a cursor the list is reloaded from the first page
+function loadComments(cursor = null) {
+    const commentsContainer = document.getElementById("comments-container");
+    const url = new URL(commentsContainer.getAttribute("data-url"), window.location.origin);
+
+    const sortSelect = document.getElementById("comments-sort");
+
+    if (commentsLoading && cursor) return;
+    if (sortSelect) url.searchParams.set("sort", sortSelect.value);
+    if (cursor) url.searchParams.set("cursor", cursor);
+    commentsLoading = true;
+
+    // A slower response for the previous sort must not replace this one
+    if (commentsRequest) commentsRequest.abort();
+    const request = new AbortController();
+    commentsRequest = request;
+
+    fetch(url, { signal: request.signal })
         .then(response => {
             if (!response.ok) throw new Error(`HTTP error (.js): ${response.status}`);
             return response.json();
         })
         .then(data => {
-            commentsContainer.innerHTML = "";
+            if (request.signal.aborted) return;
+            if (!cursor) {
+                const newHint = document.getElementById("comments-new-hint");
+                if (newHint) newHint.classList.add('d-none');
+                commentsContainer.innerHTML = "";
+                if (data.results.length === 0) {
+                    commentsContainer.innerHTML = '<div class="alert alert-light border">No comments</div>';
+                }
+            }
+            nextCommentsCursor = data.next_cursor;
 
-            // Render each top-level comment with its replies
-            data.forEach(comment => {
+            // Render each top-level comment with its replies preview
+            data.results.forEach(comment => {
                 const commentElement = createCommentElement(comment, false);
                 commentsContainer.appendChild(commentElement);
 
-                if (comment.replies.length > 0) {
-                    // Find the comment we just added in the DOM
-                    const commentCard = commentsContainer.querySelector(`[data-comment-id="${comment.id}"]`);
-
-                    if (commentCard) {
-                        const repliesContainer = commentCard.querySelector('.replies');
-
-                        if (repliesContainer) {
-                            comment.replies.forEach(reply => {
-                                const replyElement = createCommentElement(reply, true);
-                                repliesContainer.appendChild(replyElement);
-                            });
-                        }
-                    }
+                // Find the comment we just added in the DOM
+                const commentCard = commentsContainer.querySelector(`[data-comment-id="${comment.id}"]`);
+                if (commentCard) {
+                    appendReplies(commentCard, comment.replies, comment.replies_next_cursor);
                 }
             });
         })
         .catch(error => {
+            if (request.signal.aborted) return;
             commentsContainer.innerHTML = `<div class="alert alert-danger">Failed to load comments. ${error.message}</div>`;
+        })
+        .finally(() => {
+            if (commentsRequest === request) {
+                commentsLoading = false;
+                commentsRequest = null;
+            }
         });
+}
 
-    function createCommentElement(comment, isReply) {
-        const clone = commentTemplate.content.cloneNode(true);
+function loadReplies(commentCard, cursor) {
+    const commentsContainer = document.getElementById("comments-container");
+    const commentsUrl = commentsContainer.getAttribute("data-url");
+    const url = new URL(`${commentsUrl}${commentCard.dataset.commentId}/replies/`, window.location.origin);
+    url.searchParams.set("cursor", cursor);
 
-        const card = clone.querySelector('.card');
-        if (card) card.dataset.commentId = comment.id;
+    fetch(url)
+        .then(response => {
+            if (!response.ok) throw new Error(`HTTP error (.js): ${response.status}`);
+            return response.json();
+        })
+        .then(data => {
+            appendReplies(commentCard, data.results, data.next_cursor);
+        })
+        .catch(error => {
+            alert("Failed to load replies: " + error.message);
+        });
+}
 
-        clone.querySelector('.comment-author').textContent = comment.author_name;
-        clone.querySelector('.comment-text').textContent = comment.text;
-        clone.querySelector('.comment-upvotes').textContent = comment.upvotes;
-        clone.querySelector('.comment-downvotes').textContent = comment.downvotes;
-        clone.querySelector('.comment-date').textContent = comment.time_ago;
-        clone.querySelector('.comment-rating').textContent = comment.rating;
+function appendReplies(commentCard, replies, nextCursor) {
+    const repliesContainer = commentCard.querySelector('.replies');
+    if (!repliesContainer) return;
 
+    const moreButton = repliesContainer.querySelector('.more-replies-btn');
+    if (moreButton) moreButton.remove();
 
-        const replyBtn = clone.querySelector('.reply-btn');
-        const ratingContainer = clone.querySelector('.comment-rating').closest('small');
-        if (replyBtn) {
-            replyBtn.dataset.commentId = comment.id;
-            replyBtn.dataset.commentAuthor = comment.author_name;
+    replies.forEach(reply => {
+        repliesContainer.appendChild(createCommentElement(reply, true));
+    });
+
+    if (nextCursor) {
+        const button = document.createElement('button');
+        button.className = 'btn btn-sm btn-link more-replies-btn p-0';
+        button.textContent = 'Show more replies';
+        button.addEventListener('click', () => loadReplies(commentCard, nextCursor));
+        repliesContainer.appendChild(button);
+    }
+}
+
+function createCommentElement(comment, isReply) {
+    const commentTemplate = document.getElementById("comment-template");
+    const clone = commentTemplate.content.cloneNode(true);
+
+    const card = clone.querySelector('.card');
+    if (card) card.dataset.commentId = comment.id;
+
+    clone.querySelector('.comment-author').textContent = comment.author_name;
+    clone.querySelector('.comment-text').textContent = comment.text;
+    clone.querySelector('.comment-upvotes').textContent = comment.upvotes;
+    clone.querySelector('.comment-downvotes').textContent = comment.downvotes;
+    const commentDate = clone.querySelector('.comment-date');
+    commentDate.textContent = timeAgo(comment.created);
+    commentDate.title = new Date(comment.created).toLocaleString();
+    clone.querySelector('.comment-rating').textContent = comment.rating;
+    if (comment.attachment_url) {
+        const attachment = clone.querySelector('.comment-attachment');
+        attachment.href = comment.attachment_url;
+        attachment.classList.remove('d-none');
+    }
 
-            if (isReply) {
-                replyBtn.classList.add('d-none');
-                ratingContainer.classList.add('d-none');
-            }
-        }
 
-        // Remove replies container from reply comments
+    const replyBtn = clone.querySelector('.reply-btn');
+    const ratingContainer = clone.querySelector('.comment-rating').closest('small');
+    if (replyBtn) {
+        replyBtn.dataset.commentId = comment.id;
+        replyBtn.dataset.commentAuthor = comment.author_name;
+
         if (isReply) {
-            const repliesContainer = clone.querySelector('.replies');
-            if (repliesContainer) {
-                repliesContainer.remove();
-            }
+            replyBtn.classList.add('d-none');
+            ratingContainer.classList.add('d-none');
+        }
+    }
+
+    // Remove replies container from reply comments
+    if (isReply) {
+        const repliesContainer = clone.querySelector('.replies');
+        if (repliesContainer) {
+            repliesContainer.remove();
         }
+    }
+
+    return clone;
+}
+
+// The API sends absolute timestamps so its responses can be cached
+function timeAgo(isoDate) {
+    const seconds = Math.round((new Date(isoDate) - Date.now()) / 1000);
+    const units = [
+        ["year", 31536000],
+        ["month", 2592000],
+        ["week", 604800],
+        ["day", 86400],
+        ["hour", 3600],
+        ["minute", 60],
+    ];
+    const format = new Intl.RelativeTimeFormat(undefined, { numeric: "auto" });
 
-        return clone;
+    for (const [unit, size] of units) {
+        if (Math.abs(seconds) >= size) return format.format(Math.round(seconds / size), unit);
     }
+    return format.format(seconds, "second");
 }
@@ -38,7 +38,7 @@ document.addEventListener("DOMContentLoaded", function() {
         const gamePk = commentsContainer ? commentsContainer.dataset.gamePk : null;
         const csrftoken = formData.get("csrfmiddlewaretoken");
 
-        fetch(`/games/${gamePk}/reply/`, {
+        fetch(`/games/${gamePk}/reply/async/`, {
             method: "POST",
             headers: {
                 'Content-Type': 'application/json',
@@ -53,7 +53,8 @@ document.addEventListener("DOMContentLoaded", function() {
         .then(data => {
             if (data.success) {
                 resetForm();
-                loadComments();
+                // the stream sends it too, applyComment() doesn't duplicate it
+                applyComment(data.comment);
             } else {
                 displayErrors(data.errors);
             }
@@ -1,3 +1,369 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
 
-# Create your tests here.
+import pytest
+from asgiref.sync import async_to_sync
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+
+from games_project.feedback.models import REPLIES_PREVIEW_SIZE
+from games_project.feedback.models import Comment
+from games_project.feedback.models import CommentActivityBucket
+from games_project.feedback.models import CommentVote
+from games_project.feedback.models import CommentVoteShard
+from games_project.feedback.queues import CommentWriteQueue
+from games_project.feedback.services import comment_allocate_id
+from games_project.feedback.services import comment_vote
+from games_project.feedback.services import comment_votes_flush
+from games_project.games.models import Game
+from games_project.games.models import GameStats
+from games_project.games.pagination import encode_cursor
+from games_project.games.selectors import games_activity_trend
+from games_project.games.selectors import games_recent_comment_counts
+from games_project.users.tests.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+class TestCommentsPagination:
+    def test_pages_do_not_overlap(self, client, game, user):
+        comments = [
+            Comment.objects.create(game=game, author=user, text=f"comment {i}")
+            for i in range(5)
+        ]
+        url = reverse("games:comments", kwargs={"game_pk": game.pk})
+
+        first = client.get(url, data={"limit": 3}).json()
+        second = client.get(
+            url, data={"limit": 3, "cursor": first["next_cursor"]}
+        ).json()
+
+        ids = [c["id"] for c in first["results"] + second["results"]]
+        assert ids == [comment.pk for comment in reversed(comments)]
+        assert second["next_cursor"] is None
+
+    def test_sort_by_score(self, client, game, user):
+        votes = {"steady": (10, 0), "new": (1, 0), "bad": (0, 5), "popular": (100, 50)}
+        comments = {
+            text: Comment.objects.create(
+                game=game, author=user, text=text, upvotes=up, downvotes=down
+            )
+            for text, (up, down) in votes.items()
+        }
+        url = reverse("games:comments", kwargs={"game_pk": game.pk})
+
+        def texts(sort):
+            first = client.get(url, data={"sort": sort, "limit": 2}).json()
+            cursor = first["next_cursor"]
+            second = client.get(url, data={"sort": sort, "cursor": cursor}).json()
+            return [c["text"] for c in first["results"] + second["results"]]
+
+        assert texts("top") == ["steady", "popular", "new", "bad"]
+        assert texts("hot") == ["popular", "steady", "new", "bad"]
+        # scores follow votes written by any UPDATE, e.g. flush_comment_votes
+        Comment.objects.filter(pk=comments["bad"].pk).update(upvotes=1000)
+        cache.clear()
+        assert texts("top")[0] == "bad"
+
+    def test_invalid_sort(self, client, game):
+        url = reverse("games:comments", kwargs={"game_pk": game.pk})
+        response = client.get(url, data={"sort": "random"})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    def test_replies_preview_and_replies_page(self, client, game, user):
+        parent = Comment.objects.create(game=game, author=user, text="parent")
+        replies = [
+            Comment.objects.create(
+                game=game, author=user, parent=parent, text=f"reply {i}"
+            )
+            for i in range(REPLIES_PREVIEW_SIZE + 2)
+        ]
+
+        url = reverse("games:comments", kwargs={"game_pk": game.pk})
+        (comment,) = client.get(url).json()["results"]
+        assert [r["id"] for r in comment["replies"]] == [
+            reply.pk for reply in replies[:REPLIES_PREVIEW_SIZE]
+        ]
+
+        url = reverse(
+            "games:replies", kwargs={"game_pk": game.pk, "comment_pk": parent.pk}
+        )
+        data = client.get(url, data={"cursor": comment["replies_next_cursor"]}).json()
+        assert [r["id"] for r in data["results"]] == [
+            reply.pk for reply in replies[REPLIES_PREVIEW_SIZE:]
+        ]
+
+    def test_invalid_cursor(self, client, game):
+        url = reverse("games:comments", kwargs={"game_pk": game.pk})
+
+        response = client.get(url, data={"cursor": "not-a-cursor"})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+        # well-formed, but with integers out of the range of a bigint column
+        created = timezone.now()
+        for values in [[created, 10**400], [created, 2**63]]:
+            response = client.get(url, data={"cursor": encode_cursor(values)})
+            assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+class TestCommentsCache:
+    def test_not_modified_until_comments_change(
+        self, client, game, user, django_capture_on_commit_callbacks
+    ):
+        first = Comment.objects.create(game=game, author=user, text="first")
+        url = reverse("games:comments", kwargs={"game_pk": game.pk})
+
+        etag = client.get(url)["ETag"]
+        response = client.get(url, headers={"if-none-match": etag})
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+        with django_capture_on_commit_callbacks(execute=True):
+            second = Comment.objects.create(game=game, author=user, text="second")
+
+        response = client.get(url, headers={"if-none-match": etag})
+        assert response.status_code == HTTPStatus.OK
+        assert [c["id"] for c in response.json()["results"]] == [second.pk, first.pk]
+
+
+class TestCommentActivity:
+    def _buckets(self):
+        return list(
+            CommentActivityBucket.objects.order_by("hour").values(
+                "hour", "comments_count", "rating_sum", "rating_count", "upvotes"
+            ),
+        )
+
+    def test_incremental_buckets_match_backfill(self, game, user):
+        first = Comment.objects.create(game=game, author=user, text="a", rating=4)
+        Comment.objects.create(game=game, author=user, text="b", rating=6)
+        last = Comment.objects.create(game=game, author=user, text="c")
+
+        first.upvotes = 3
+        first.save()
+        last.delete()
+        incremental = self._buckets()
+
+        call_command("backfill_comment_activity", "--batch-size=1", stdout=None)
+        assert self._buckets() == incremental
+        assert incremental[0] | {"hour": None} == {
+            "hour": None,
+            "comments_count": 2,
+            "rating_sum": 10,
+            "rating_count": 2,
+            "upvotes": 3,
+        }
+
+    def test_long_windows_read_the_buckets(self, game, user):
+        now = timezone.now()
+        for days in [0, 3, 10]:
+            comment = Comment.objects.create(game=game, author=user, text="a")
+            Comment.objects.filter(pk=comment.pk).update(
+                created=now - datetime.timedelta(days=days, minutes=1),
+            )
+        call_command("backfill_comment_activity", stdout=None)
+
+        def count(days):
+            window = datetime.timedelta(days=days)
+            return games_recent_comment_counts([game.pk], window)[game.pk]
+
+        assert (count(1), count(7), count(30)) == (1, 2, 3)
+        assert [row["day"] for row in games_activity_trend(game.pk, days=7)] == [
+            (now - datetime.timedelta(days=days, minutes=1))
+            .astimezone(datetime.UTC)
+            .date()
+            for days in [3, 0]
+        ]
+
+
+class TestAsyncReply:
+    def _post(self, client, game, **data):
+        url = reverse("games:reply_async", kwargs={"game_pk": game.pk})
+        return client.post(url, data, content_type="application/json")
+
+    def test_accepts_and_saves_comment(self, client, game, user):
+        client.force_login(user)
+
+        response = self._post(client, game, text="Great game")
+
+        assert response.status_code == HTTPStatus.ACCEPTED
+        comment = Comment.objects.get(pk=response.json()["comment"]["id"])
+        assert (comment.text, comment.author, comment.game) == (
+            "Great game",
+            user,
+            game,
+        )
+        assert GameStats.objects.get(game=game).comments_count == 1
+        assert CommentActivityBucket.objects.get(game=game).comments_count == 1
+
+    def test_validates_parent(self, client, game, user, category):
+        client.force_login(user)
+        parent = Comment.objects.create(game=game, author=user, text="parent")
+        reply = Comment.objects.create(game=game, author=user, text="r", parent=parent)
+        other = Game.objects.create(title="Other", slug="other", category=category)
+
+        assert self._post(client, game, text="ok", parent=parent.pk).status_code == (
+            HTTPStatus.ACCEPTED
+        )
+        assert self._post(client, game, text="no", parent=reply.pk).status_code == (
+            HTTPStatus.BAD_REQUEST
+        )
+        assert self._post(client, other, text="no", parent=parent.pk).status_code == (
+            HTTPStatus.BAD_REQUEST
+        )
+
+    def test_login_required(self, client, game):
+        response = self._post(client, game, text="Great game")
+        assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+class TestCommentVotes:
+    def _vote(self, client, comment, value):
+        url = reverse(
+            "games:vote", kwargs={"game_pk": comment.game_id, "comment_pk": comment.pk}
+        )
+        return client.post(url, {"value": value}, content_type="application/json")
+
+    def test_votes_are_pending_until_flushed(self, client, game, user):
+        comment = Comment.objects.create(game=game, author=user, text="first")
+        client.force_login(user)
+
+        assert self._vote(client, comment, 1).json()["upvotes"] == 1
+        data = self._vote(client, comment, -1).json()
+        assert (data["vote"], data["upvotes"], data["downvotes"]) == (-1, 0, 1)
+        comment.refresh_from_db()
+        assert (comment.upvotes, comment.downvotes) == (0, 0)
+
+        call_command("flush_comment_votes", stdout=None)
+
+        comment.refresh_from_db()
+        assert (comment.upvotes, comment.downvotes) == (0, 1)
+        assert not CommentVoteShard.objects.exists()
+        assert CommentActivityBucket.objects.get(game=game).downvotes == 1
+
+    def test_one_vote_per_user(self, client, game, user):
+        comment = Comment.objects.create(game=game, author=user, text="first")
+        client.force_login(user)
+
+        self._vote(client, comment, 1)
+        assert self._vote(client, comment, 1).json()["upvotes"] == 1
+        assert self._vote(client, comment, 0).json()["upvotes"] == 0
+        assert not CommentVote.objects.exists()
+
+    def test_validates_comment_and_value(self, client, game, user, category):
+        comment = Comment.objects.create(game=game, author=user, text="first")
+        other = Game.objects.create(title="Other", slug="other", category=category)
+        client.force_login(user)
+
+        assert self._vote(client, comment, 2).status_code == HTTPStatus.BAD_REQUEST
+        comment.game_id = other.pk
+        assert self._vote(client, comment, 1).status_code == HTTPStatus.NOT_FOUND
+
+    def test_login_required(self, client, game, user):
+        comment = Comment.objects.create(game=game, author=user, text="first")
+        assert self._vote(client, comment, 1).status_code == HTTPStatus.UNAUTHORIZED
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_votes_are_not_lost(game, user):
+    comment = Comment.objects.create(game=game, author=user, text="hot")
+    voters = UserFactory.create_batch(8)
+
+    def vote(voter):
+        try:
+            comment_vote(comment_id=comment.pk, user=voter, value=1)
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(len(voters)) as executor:
+        list(executor.map(vote, voters))
+    comment_votes_flush()
+
+    comment.refresh_from_db()
+    assert comment.upvotes == len(voters)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_comment_write_queue_batches_and_skips_broken_comments(game, user):
+    write_queue = CommentWriteQueue(max_batch=10, flush_interval=5)
+    comments = [
+        Comment(id=comment_allocate_id(), game=game, author=user, text=f"c{i}")
+        for i in range(3)
+    ]
+    broken = Comment(id=comment_allocate_id(), game_id=game.pk + 1, text="x")
+
+    for comment in [*comments, broken]:
+        write_queue.add(comment)
+    write_queue.close(timeout=10)
+
+    saved = Comment.objects.order_by("id").values_list("id", flat=True)
+    assert list(saved) == [comment.id for comment in comments]
+    assert GameStats.objects.get(game=game).comments_count == len(comments)
+
+
+class TestCommentsStream:
+    def test_streams_new_comments(
+        self, async_client, game, user, django_capture_on_commit_callbacks
+    ):
+        url = reverse("games:comments_stream", kwargs={"game_pk": game.pk})
+
+        def post_comment():
+            with django_capture_on_commit_callbacks(execute=True):
+                return Comment.objects.create(game=game, author=user, text="live")
+
+        async def read_stream():
+            response = await async_client.get(url)
+            chunks = aiter(response.streaming_content)
+            assert (await anext(chunks)).startswith(b"retry:")
+
+            comment = await sync_to_async(post_comment)()
+            event = await asyncio.wait_for(anext(chunks), timeout=5)
+            await chunks.aclose()
+            return comment, event.decode()
+
+        comment, event = async_to_sync(read_stream)()
+
+        assert event.startswith("event: comment\nid: ")
+        assert json.loads(event.split("data: ", 1)[1])["comment"]["id"] == comment.pk
+
+    def test_replays_comments_committed_after_the_last_event(
+        self, async_client, game, user
+    ):
+        url = reverse("games:comments_stream", kwargs={"game_pk": game.pk})
+        old = Comment.objects.create(game=game, author=user, text="old")
+        Comment.objects.filter(pk=old.pk).update(
+            created=timezone.now() - datetime.timedelta(hours=1),
+        )
+        low, high = comment_allocate_id(), comment_allocate_id()
+        Comment.objects.create(id=high, game=game, author=user, text="high")
+        # the client got the event of `high`, then the batch of `low` commits
+        last_event_id = str(time.time_ns() // 1000)
+        Comment.objects.create(id=low, game=game, author=user, text="low")
+
+        async def read_replay():
+            response = await async_client.get(
+                url,
+                headers={"last-event-id": last_event_id},
+            )
+            chunks = aiter(response.streaming_content)
+            await anext(chunks)
+            events = [(await anext(chunks)).decode() for _ in range(2)]
+            await chunks.aclose()
+            return events
+
+        replayed = [
+            json.loads(event.split("data: ", 1)[1])["comment"]["id"]
+            for event in async_to_sync(read_replay)()
+        ]
+        assert replayed == [high, low]
+
+    def test_wsgi_tells_client_not_to_reconnect(self, client, game):
+        url = reverse("games:comments_stream", kwargs={"game_pk": game.pk})
+        assert client.get(url).status_code == HTTPStatus.NO_CONTENT
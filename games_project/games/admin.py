@@ -1,26 +1,42 @@
+import datetime
+import posixpath
+
+from django.conf import settings
 from django.contrib import admin
-from django.contrib import messages
 from django.contrib.admin import BooleanFieldListFilter
 from django.contrib.admin import DateFieldListFilter
+from django.contrib.admin.views.main import ChangeList
+from django.utils.html import format_html
 
+from games_project.contrib.admin_toolkit import AutocompleteFilter
+from games_project.contrib.admin_toolkit import LargeTableAdminMixin
+from games_project.contrib.admin_toolkit import PaginatedInlineMixin
 from games_project.feedback.models import Comment
+from games_project.jobs.admin import queue_job
 
 from .decorators import remove_delete_actions
 from .decorators import title
+from .models import RECENT_ACTIVITY_WINDOW
 from .models import Category
-from .models import Environment
 from .models import Game
 from .models import GameWithStats
+from .selectors import GROUP_SIZES
+from .selectors import RATING_RANGES
+from .selectors import games_anotated_with_materialized_stats
 from .selectors import games_anotated_with_stats
+from .selectors import games_recent_comment_counts
+from .selectors import games_search_query
 
 
-class CommentsInLine(admin.TabularInline):
+class CommentsInLine(PaginatedInlineMixin, admin.TabularInline):
     model = Comment
     extra = 0
     fields = ["author", "parent", "text", "rating", "created"]
     readonly_fields = ["created"]
+    # select widgets would list every user and comment in every row
+    raw_id_fields = ["author", "parent"]
     classes = ["collapse"]
-    ordering = ["created"]
+    ordering = ["created", "id"]
     show_change_link = True
 
 
@@ -38,56 +54,76 @@ class GroupSizeListFilter(admin.SimpleListFilter):
     parameter_name = "group_size"
 
     def lookups(self, request, model_admin):
-        return [
-            ("<10", "Under 10"),
-            ("10-20", "Between 10 and 20"),
-            ("21-50", "Between 21 and 50"),
-            ("50+", "Above 50"),
-        ]
+        return [(value, label) for value, (label, _) in GROUP_SIZES.items()]
+
+    def queryset(self, request, queryset):
+        if (value := self.value()) in GROUP_SIZES:
+            return queryset.filter(GROUP_SIZES[value][1])
+        return queryset
+
+
+@title("Average rating")
+class AverageRatingListFilter(admin.SimpleListFilter):
+    parameter_name = "avg_rating"
+
+    def lookups(self, request, model_admin):
+        return [(value, label) for value, (label, _) in RATING_RANGES.items()]
+
+    def queryset(self, request, queryset):
+        if (value := self.value()) in RATING_RANGES:
+            return queryset.filter(RATING_RANGES[value][1])
+        return queryset
+
+
+@title("equipment")
+class EquipmentFilter(AutocompleteFilter):
+    field_path = "equipment"
+
+    def queryset(self, request, queryset):
+        if (value := self.value()) is None:
+            return queryset
+        # the GIN indexed tag ids instead of the tagged items
+        return queryset.filter(equipment_ids__contains=[value])
+
+
+@title("comment author")
+class CommentAuthorFilter(AutocompleteFilter):
+    field_path = "comments__author"
+
+
+@title("Recent comments window")
+class ActivityWindowListFilter(admin.SimpleListFilter):
+    """Only picks the window of the recent comments column, filters nothing."""
+
+    parameter_name = "window"
+    windows = {
+        "7d": datetime.timedelta(days=7),
+        "30d": datetime.timedelta(days=30),
+    }
+
+    def lookups(self, request, model_admin):
+        return [("7d", "Last 7 days"), ("30d", "Last 30 days")]
 
     def queryset(self, request, queryset):
-        value = self.value()
-        match value:
-            case "<10":
-                return queryset.filter(min_players__lt=10)
-            case "10-20":
-                return queryset.filter(
-                    max_players__gte=10,
-                    min_players__lte=20,
-                )
-            case "21-50":
-                return queryset.filter(
-                    max_players__gte=21,
-                    min_players__lte=50,
-                )
-            case "50+":
-                return queryset.filter(max_players__gte=50)
-            case _:
-                return queryset
+        return queryset
+
+    def window(self):
+        return self.windows.get(self.value(), RECENT_ACTIVITY_WINDOW)
 
 
 @admin.action(description="Set selected games environment to indoor")
 def make_indoor(self, request, queryset):
-    updated = queryset.update(environment=Environment.INDOOR)
-    message = f"{updated} game(s) were successfully set as {Environment.INDOOR.label}"
-
-    self.message_user(request, message, messages.SUCCESS)
+    queue_job(self, request, "games.make_indoor", queryset)
 
 
 @admin.action(description="Reset games rating (comments rating will be set to None)")
 def reset_rating(self, request, queryset):
-    updated = Comment.objects.filter(game__in=queryset).update(rating=None)
-
-    message = f"{updated} comment ratings(s) were successfully reset"
-    self.message_user(request, message, messages.SUCCESS)
+    queue_job(self, request, "games.reset_rating", queryset)
 
 
 @admin.action(description="Soft delete selected games")
 def soft_delete(self, request, queryset):
-    updated = queryset.update(is_active=False)
-    message = f"{updated} game(s) were successfully soft_deleted"
-
-    self.message_user(request, message, messages.SUCCESS)
+    queue_job(self, request, "games.soft_delete", queryset)
 
 
 class NoDeleteMixin:
@@ -102,7 +138,7 @@ class NoDeleteMixin:
 
 
 @admin.register(Game)
-class GameAdmin(NoDeleteMixin, admin.ModelAdmin):
+class GameAdmin(NoDeleteMixin, LargeTableAdminMixin, admin.ModelAdmin):
     list_display = (
         "title",
         "slug",
@@ -112,7 +148,7 @@ class GameAdmin(NoDeleteMixin, admin.ModelAdmin):
         "max_players",
         "min_duration",
         "max_duration",
-        "attachments",
+        "display_attachments",
         "equipment_list",
         "category",
         "created",
@@ -130,15 +166,25 @@ class GameAdmin(NoDeleteMixin, admin.ModelAdmin):
         "environment",
         ("created", DateFieldListFilter),
         "max_duration",
-        "equipment",
+        EquipmentFilter,
         "category",
-        "comments__author",
+        CommentAuthorFilter,
     ]
 
     search_fields = ["title", "description"]
 
     inlines = [CommentsInLine]
 
+    def get_queryset(self, request):
+        # equipment_list of every row
+        return super().get_queryset(request).with_equipment()
+
+    def get_search_results(self, request, queryset, search_term):
+        # the indexed search vector instead of icontains over search_fields
+        if not search_term:
+            return queryset, False
+        return queryset.filter(search_vector=games_search_query(search_term)), False
+
     fieldsets = [
         (
             None,
@@ -161,10 +207,19 @@ class GameAdmin(NoDeleteMixin, admin.ModelAdmin):
             "Advanced options",
             {
                 "classes": ["collapse"],
-                "fields": ["attachments"],
+                "fields": ["attachments", "display_attachments"],
             },
         ),
     ]
+    # the media urls of the file inputs are not served, see games:attachment
+    readonly_fields = ["display_attachments"]
+
+    @admin.display(description="Download attachments")
+    def display_attachments(self, obj):
+        if url := obj.get_attachments_url():
+            name = posixpath.basename(obj.attachments.name)
+            return format_html('<a href="{}">{}</a>', url, name)
+        return None
 
 
 @admin.register(Category)
@@ -180,27 +235,54 @@ class CategoryAdmin(admin.ModelAdmin):
     inlines = [GamesInLine]
 
 
+class GameStatsChangeList(ChangeList):
+    def get_results(self, request):
+        super().get_results(request)
+
+        window = next(
+            (
+                spec.window()
+                for spec in self.filter_specs
+                if isinstance(spec, ActivityWindowListFilter)
+            ),
+            RECENT_ACTIVITY_WINDOW,
+        )
+
+        # one grouped query for the page instead of a COUNT per row
+        games = list(self.result_list)
+        counts = games_recent_comment_counts([game.pk for game in games], window)
+        for game in games:
+            game.recent_comments_count = counts.get(game.pk, 0)
+
+
 @admin.register(GameWithStats)
 @remove_delete_actions
 class GameStatsAdmin(admin.ModelAdmin):
     list_display = [
         "title",
         "last_comment",
-        "comments_count_last_day",
+        "display_recent_comments",
         "display_updated_last_day",
         "is_active",
         "average_rating",
         "display_avg_rating",
         "display_comment_count",
+        "display_last_activity",
         "environment",
         "created",
     ]
 
+    list_filter = [AverageRatingListFilter, ActivityWindowListFilter]
     actions = [reset_rating, soft_delete]
 
     def get_queryset(self, request):
+        if settings.GAME_STATS_MATERIALIZED_VIEW:
+            return games_anotated_with_materialized_stats()
         return games_anotated_with_stats()
 
+    def get_changelist(self, request, **kwargs):
+        return GameStatsChangeList
+
     @admin.display(ordering="avg_rating")
     @title("Avg rating calculated using selectors")
     def display_avg_rating(self, obj):
@@ -210,6 +292,15 @@ class GameStatsAdmin(admin.ModelAdmin):
     def display_comment_count(self, obj):
         return obj.comments_count
 
+    @admin.display(description="Last activity", ordering="last_activity")
+    def display_last_activity(self, obj):
+        return obj.last_activity
+
+    @admin.display(description="Recent comments")
+    def display_recent_comments(self, obj):
+        # last day unless another window is picked in the filter
+        return obj.comments_count_last_day
+
     @admin.display(description="Updated last day", boolean=True)
     def display_updated_last_day(self, obj):
         return obj.was_updated_last_day
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class GamesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'games_project.games'
+
+    def ready(self):
+        import games_project.games.signals  # noqa: F401, PLC0415
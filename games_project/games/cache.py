@@ -0,0 +1,82 @@
+import hashlib
+import time
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+
+COMMENTS_CACHE_TIMEOUT = 60 * 60
+FACETS_CACHE_TIMEOUT = 10 * 60
+FACETS_VERSION_KEY = "games:facets-version"
+
+
+def _params_digest(params):
+    return hashlib.sha1(repr(params).encode(), usedforsecurity=False).hexdigest()
+
+
+def _cache_version(key):
+    # a lost version key just starts a new version
+    version = cache.get(key)
+
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key, time.time_ns())
+
+    return version
+
+
+async def _acache_version(key):
+    version = await cache.aget(key)
+
+    if version is None:
+        await cache.aadd(key, time.time_ns(), timeout=None)
+        version = await cache.aget(key, time.time_ns())
+
+    return version
+
+
+def _comments_version_key(game_pk):
+    return f"games:comments-version:{game_pk}"
+
+
+async def acomments_cache_version(game_pk):
+    """
+    Version of the cached comments of a game, the time (ns) of its last
+    comment write.
+    """
+    return await _acache_version(_comments_version_key(game_pk))
+
+
+def _set_comments_versions(game_pks):
+    # old entries are not deleted, they are never read again and expire
+    version = time.time_ns()
+    cache.set_many(
+        {_comments_version_key(game_pk): version for game_pk in game_pks},
+        timeout=None,
+    )
+
+
+def invalidate_comments_cache(*game_pks):
+    # after commit, otherwise a concurrent read could cache the old comments
+    # under the new version
+    transaction.on_commit(partial(_set_comments_versions, game_pks))
+
+
+def comments_cache_key(game_pk, version, *params):
+    return f"games:comments:{game_pk}:{version}:{_params_digest(params)}"
+
+
+def facets_cache_version():
+    """Version of all cached facet counts, the time (ns) of the last game write."""
+    return _cache_version(FACETS_VERSION_KEY)
+
+
+def invalidate_facets_cache():
+    transaction.on_commit(
+        lambda: cache.set(FACETS_VERSION_KEY, time.time_ns(), timeout=None),
+    )
+
+
+def facets_cache_key(version, filters):
+    signature = sorted((name, sorted(values)) for name, values in filters.items())
+    return f"games:facets:{version}:{_params_digest(signature)}"
@@ -1,5 +1,6 @@
 from functools import wraps
 
+from asgiref.sync import iscoroutinefunction
 from django.http import JsonResponse
 
 
@@ -33,14 +34,29 @@ def remove_delete_actions(admin_class):
     return admin_class
 
 
+def _login_required_response():
+    return JsonResponse(
+        {"success": False, "errors": {"auth": ["Please log in to continue."]}},
+        status=401,
+    )
+
+
 def ajax_login_required(view_func):
+    if iscoroutinefunction(view_func):
+
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            user = await request.auser()
+            if not user.is_authenticated:
+                return _login_required_response()
+            return await view_func(request, *args, **kwargs)
+
+        return async_wrapper
+
     @wraps(view_func)
     def wrapper(request, *args, **kwargs):
         if not request.user.is_authenticated:
-            return JsonResponse(
-                {"success": False, "errors": {"auth": ["Please log in to continue."]}},
-                status=401,
-            )
+            return _login_required_response()
         return view_func(request, *args, **kwargs)
 
     return wrapper
@@ -1,6 +1,10 @@
 from django import forms
+from django.core.validators import validate_slug
 
 from games_project.feedback.models import Comment
+from games_project.feedback.models import CommentVote
+
+from .selectors import BUCKET_FACETS
 
 MIN_TEXT_LEN = 2
 MAX_TEXT_LEN = 2000
@@ -13,6 +17,10 @@ class CommentForm(forms.ModelForm):
         model = Comment
         fields = ["text"]
 
+    def __init__(self, *args, game_pk=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.game_pk = game_pk
+
     def clean_text(self):
         text = self.cleaned_data.get("text", "").strip()
 
@@ -31,7 +39,8 @@ class CommentForm(forms.ModelForm):
 
         if parent_id:
             try:
-                parent = Comment.objects.get(id=parent_id)
+                # only what the checks need, the parent is not loaded again
+                parent = Comment.objects.only("game_id", "parent_id").get(id=parent_id)
             except Comment.DoesNotExist as e:
                 msg = "Parent comment does not exist."
                 raise forms.ValidationError(msg) from e
@@ -39,6 +48,52 @@ class CommentForm(forms.ModelForm):
                 if parent.parent_id is not None:
                     msg = "Cannot reply to a reply."
                     raise forms.ValidationError(msg)
+                if self.game_pk is not None and parent.game_id != self.game_pk:
+                    msg = "Reply must be under the same Game as Parent."
+                    raise forms.ValidationError(msg)
                 return parent
 
         return None
+
+
+class CommentVoteForm(forms.Form):
+    value = forms.TypedChoiceField(
+        choices=[*CommentVote.Value.choices, (0, "No vote")],
+        coerce=int,
+    )
+
+
+class SlugListField(forms.Field):
+    widget = forms.MultipleHiddenInput
+
+    def to_python(self, value):
+        return sorted({slug for slug in value or [] if slug})
+
+    def validate(self, value):
+        super().validate(value)
+        for slug in value:
+            validate_slug(slug)
+
+
+class GameFilterForm(forms.Form):
+    """Selected facet values, several values of one facet are ORed."""
+
+    group_size = forms.MultipleChoiceField(required=False)
+    duration = forms.MultipleChoiceField(required=False)
+    environment = forms.MultipleChoiceField(required=False)
+    category = SlugListField(required=False)
+    equipment = SlugListField(required=False)
+    # not a facet, only games needing nothing but this equipment
+    available_equipment = SlugListField(required=False)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name, choices in BUCKET_FACETS.items():
+            self.fields[name].choices = [
+                (value, label) for value, (label, _) in choices.items()
+            ]
+
+    def clean(self):
+        cleaned_data = super().clean()
+        # sorted and without duplicates, the facets cache key depends on it
+        return {name: sorted(set(values)) for name, values in cleaned_data.items()}
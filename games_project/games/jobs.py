@@ -0,0 +1,30 @@
+"""Bulk actions of the games admin, run in chunks by the run_jobs command."""
+
+from games_project.feedback.models import Comment
+from games_project.feedback.services import activity_buckets_reset_rating
+from games_project.jobs.services import job_action
+
+from .cache import invalidate_comments_cache
+from .cache import invalidate_facets_cache
+from .models import Environment
+from .services import game_stats_reset_rating
+
+
+@job_action("games.make_indoor")
+def games_make_indoor(games):
+    games.update(environment=Environment.INDOOR)
+    invalidate_facets_cache()
+
+
+@job_action("games.reset_rating")
+def games_reset_rating(games):
+    Comment.objects.filter(game__in=games).update(rating=None)
+    game_stats_reset_rating(games)
+    activity_buckets_reset_rating(games)
+    invalidate_comments_cache(*games.values_list("pk", flat=True))
+
+
+@job_action("games.soft_delete")
+def games_soft_delete(games):
+    games.update(is_active=False)
+    invalidate_facets_cache()
@@ -0,0 +1,300 @@
+import json
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db import transaction
+from django.db.models import Count
+from django.http import HttpResponse
+from django.test import Client
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from games_project.feedback.models import Comment
+from games_project.games.models import Category
+from games_project.games.models import Game
+from games_project.users.middleware import UserIpMiddleware
+from games_project.users.models import User
+
+from .generate_fake_data import GAME_CATEGORIES
+
+# total comments of each dataset, replies included
+SCALES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+REPLIES_SHARE = 0.25
+COMMENTS_PER_GAME = 100
+COMMENTS_PER_USER = 50
+REPEAT = 20
+THRESHOLD = 0.25
+# timer noise of fast paths, smaller latency changes are never regressions
+MIN_LATENCY_DELTA_MS = 1.0
+BENCHMARK_USERNAME = "benchmark"
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure latency, query count and memory of the games and feedback "
+        "hot paths on a seeded dataset."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scale",
+            choices=SCALES,
+            default="1k",
+            help="Dataset size in comments, seeded when missing (default = 1k).",
+        )
+        parser.add_argument(
+            "--no-seed",
+            action="store_true",
+            help="Measure the current data without seeding.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Worker processes used to seed the dataset (default = 1).",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=REPEAT,
+            help=f"Timed runs of each path (default = {REPEAT}).",
+        )
+        parser.add_argument(
+            "--output",
+            type=Path,
+            help="Write the results to this JSON baseline file.",
+        )
+        parser.add_argument(
+            "--compare",
+            type=Path,
+            help="Fail if a path regressed compared to this JSON baseline file.",
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=THRESHOLD,
+            help=(
+                "Allowed latency and memory growth over the baseline, "
+                f"as a fraction (default = {THRESHOLD})."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        scale = options["scale"]
+        if not options["no_seed"]:
+            self._seed(SCALES[scale], options["workers"])
+
+        results = {
+            "scale": scale,
+            "comments": Comment.objects.count(),
+            "created": timezone.now().isoformat(),
+            "paths": self._measure_paths(options["repeat"]),
+        }
+
+        for name, result in results["paths"].items():
+            self.stdout.write(
+                f"{name:<20} {result['median_ms']:>9.2f} ms "
+                f"{result['p95_ms']:>9.2f} ms p95 "
+                f"{result['queries']:>4} queries "
+                f"{result['memory_kb']:>7} KiB",
+            )
+
+        if options["output"]:
+            options["output"].write_text(json.dumps(results, indent=2) + "\n")
+            self.stdout.write(
+                self.style.SUCCESS(f"Results written to {options['output']}."),
+            )
+
+        if options["compare"]:
+            baseline = json.loads(options["compare"].read_text())
+            if baseline["scale"] != scale:
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"Baseline was measured at scale {baseline['scale']}.",
+                    ),
+                )
+
+            regressions = compare_results(
+                baseline["paths"],
+                results["paths"],
+                options["threshold"],
+            )
+            if regressions:
+                raise CommandError("Regressions found:\n" + "\n".join(regressions))
+            self.stdout.write(self.style.SUCCESS("No regressions."))
+
+    def _seed(self, comments, workers):
+        """Top the data up to the dataset size with generate_fake_data."""
+        missing = comments - Comment.objects.count()
+        if missing <= 0:
+            return
+
+        bulk = {"bulk": True, "workers": workers, "stdout": self.stdout}
+        if not Category.objects.exists():
+            call_command(
+                "generate_fake_data",
+                "categories",
+                count=len(GAME_CATEGORIES),
+                stdout=self.stdout,
+            )
+
+        for name, model, target in [
+            ("users", User, comments // COMMENTS_PER_USER),
+            ("games", Game, comments // COMMENTS_PER_GAME),
+        ]:
+            count = max(target, 1) - model.objects.count()
+            if count > 0:
+                call_command("generate_fake_data", name, count=count, **bulk)
+
+        replies = int(missing * REPLIES_SHARE)
+        call_command("generate_fake_data", "comments", count=missing - replies, **bulk)
+        if replies:
+            call_command("generate_fake_data", "replies", count=replies, **bulk)
+
+    def _measure_paths(self, repeat):
+        game = (
+            Game.objects.filter(is_active=True)
+            .annotate(comments_total=Count("comments"))
+            .order_by("-comments_total")
+            .first()
+        )
+        user = User.objects.exclude(username=BENCHMARK_USERNAME).first()
+        if game is None or user is None:
+            msg = "No games or users found, seed a dataset first."
+            raise CommandError(msg)
+
+        # everything written while measuring is rolled back
+        with (
+            override_settings(
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"],
+                USER_IP_BACKGROUND_FLUSH=False,
+            ),
+            transaction.atomic(),
+        ):
+            admin = User.objects.create_superuser(
+                BENCHMARK_USERNAME,
+                f"{BENCHMARK_USERNAME}@example.com",
+                None,
+            )
+            admin_client = Client()
+            admin_client.force_login(admin)
+            client = Client()
+            user_client = Client()
+            user_client.force_login(user)
+
+            paths = {
+                "game_list": lambda: client.get(reverse("games:list")),
+                "game_detail": lambda: client.get(
+                    reverse("games:detail", kwargs={"slug": game.slug}),
+                ),
+                "comments_json": lambda: client.get(
+                    reverse("games:comments", kwargs={"game_pk": game.pk}),
+                ),
+                "reply": lambda: user_client.post(
+                    reverse("games:reply", kwargs={"game_pk": game.pk}),
+                    {"text": "Benchmark reply"},
+                    content_type="application/json",
+                ),
+                "stats_admin": lambda: admin_client.get(
+                    reverse("admin:games_gamewithstats_changelist"),
+                ),
+                "user_ip_middleware": _user_ip_middleware_path(user),
+            }
+            results = {name: _measure(path, repeat) for name, path in paths.items()}
+
+            transaction.set_rollback(True)
+
+        return results
+
+
+def _user_ip_middleware_path(user):
+    middleware = UserIpMiddleware(lambda request: HttpResponse())
+    factory = RequestFactory()
+
+    def path():
+        # a fresh session takes the new IP path, the most expensive one
+        request = factory.get("/")
+        request.user = user
+        request.session = {}
+        return middleware(request)
+
+    return path
+
+
+def _measure(path, repeat):
+    """
+    Count queries and peak memory of a first, cold run, then time `repeat`
+    warm runs.
+    """
+    queries = []
+
+    def count_query(execute, sql, params, many, context):
+        # savepoints of the nested atomic requests are not the path's queries
+        if "SAVEPOINT" not in sql.upper():
+            queries.append(sql)
+        return execute(sql, params, many, context)
+
+    # not CaptureQueriesContext, each request resets connection.queries
+    tracemalloc.start()
+    with connection.execute_wrapper(count_query):
+        response = path()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    if response.status_code >= 400:  # noqa: PLR2004
+        msg = f"Benchmarked path responded with status {response.status_code}."
+        raise CommandError(msg)
+
+    timings = []
+    for _ in range(max(repeat, 1)):
+        started = time.perf_counter()
+        path()
+        timings.append((time.perf_counter() - started) * 1000)
+
+    return {
+        "queries": len(queries),
+        "memory_kb": peak // 1024,
+        "median_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(_percentile(timings, 0.95), 3),
+    }
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def compare_results(baseline, results, threshold):
+    """
+    Return a message per regression: any extra query, or latency or memory
+    growing by more than `threshold` over the baseline (and latency by more
+    than MIN_LATENCY_DELTA_MS).
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        base = baseline[name]
+
+        if result["queries"] > base["queries"]:
+            regressions.append(
+                f"{name}: {result['queries']} queries, baseline {base['queries']}",
+            )
+        for metric, slack in [("median_ms", MIN_LATENCY_DELTA_MS), ("memory_kb", 0)]:
+            if result[metric] > max(
+                base[metric] * (1 + threshold), base[metric] + slack
+            ):
+                regressions.append(
+                    f"{name}: {metric} {result[metric]}, baseline {base[metric]}",
+                )
+
+    return regressions
@@ -1,13 +1,29 @@
+import argparse
+import multiprocessing
 import random
+import secrets
+import time
 
+from django.contrib.auth.hashers import make_password
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Max
+from django.db.models import Min
 from django.utils.text import slugify
 from faker import Faker
+from taggit.models import Tag
+from taggit.models import TaggedItem
 
 from games_project.feedback.models import Comment
+from games_project.games.cache import invalidate_facets_cache
 from games_project.games.models import Category
 from games_project.games.models import Environment
 from games_project.games.models import Game
+from games_project.games.services import game_equipment_ids_update
+from games_project.games.services import game_search_vector_update
+from games_project.games.services import game_stats_rebuild
 from games_project.users.models import User
 
 fake = Faker()
@@ -24,6 +40,29 @@ GAME_CATEGORIES = [
     "Cleanup",
     "Daily Review",
 ]
+EQUIPMENT = [
+    "ball",
+    "string",
+    "paper",
+    "pencil",
+    "rope",
+    "cones",
+    "blindfold",
+    "chalk",
+    "frisbee",
+    "whistle",
+]
+BULK_BATCH_SIZE = 5000
+# Faker is too slow to call per row when seeding millions of rows
+TEXT_POOL_SIZE = 1000
+
+
+def _positive_int(value):
+    number = int(value)
+    if number < 1:
+        msg = f"must be at least 1, got {number}"
+        raise argparse.ArgumentTypeError(msg)
+    return number
 
 
 class Command(BaseCommand):
@@ -33,7 +72,7 @@ class Command(BaseCommand):
         parser.add_argument(
             "model",
             type=str,
-            choices=["all", "games", "categories", "comments", "users"],
+            choices=["all", "games", "categories", "comments", "replies", "users"],
             help="Model type for generation",
         )
         parser.add_argument(
@@ -42,11 +81,41 @@ class Command(BaseCommand):
             default=5,
             help="Number of object to generate (default = 5).",
         )
+        parser.add_argument(
+            "--bulk",
+            action="store_true",
+            help="Insert rows with batched bulk_create, skipping model validation.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BULK_BATCH_SIZE,
+            help=f"Rows per bulk_create batch (default = {BULK_BATCH_SIZE}).",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Worker processes used in bulk mode (default = 1).",
+        )
+        parser.add_argument(
+            "--max-replies",
+            type=_positive_int,
+            default=3,
+            help="Maximum replies generated under one comment (default = 3).",
+        )
 
     def handle(self, *args, **options):
         model = options["model"]
         count = options["count"]
 
+        if options["bulk"]:
+            started = time.monotonic()
+            self._bulk_create(model, count, options)
+            elapsed = time.monotonic() - started
+            self.stdout.write(self.style.SUCCESS(f"Done in {elapsed:.1f}s."))
+            return
+
         match model:
             case "all":
                 self._create_all(count)
@@ -56,6 +125,8 @@ class Command(BaseCommand):
                 self._create_categories(count)
             case "comments":
                 self._create_comments(count)
+            case "replies":
+                self._create_replies(count)
             case "users":
                 self._create_users(count)
 
@@ -64,6 +135,7 @@ class Command(BaseCommand):
         self._create_categories(len(GAME_CATEGORIES))
         self._create_games(count)
         self._create_comments(count)
+        self._create_replies(count)
 
     def _create_games(self, count):
         categories = list(Category.objects.all())
@@ -146,6 +218,31 @@ class Command(BaseCommand):
 
         self.stdout.write(self.style.SUCCESS(f"Created {count} comments."))
 
+    def _create_replies(self, count):
+        parents = list(Comment.objects.filter(parent__isnull=True))
+        users = list(User.objects.all())
+
+        if not parents:
+            self.stdout.write(
+                self.style.ERROR(
+                    "No comments found, please create comments first.",
+                ),
+            )
+            return
+
+        for _ in range(count):
+            parent = random.choice(parents)
+            Comment.objects.create(
+                author=random.choice(users) if users else None,
+                game_id=parent.game_id,
+                parent=parent,
+                text=fake.paragraph()[:30],
+                upvotes=random.randint(0, 5),
+                downvotes=random.randint(0, 5),
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"Created {count} replies."))
+
     def _create_users(self, count):
         created_count = 0
 
@@ -158,3 +255,239 @@ class Command(BaseCommand):
                 created_count += 1
 
         self.stdout.write(self.style.SUCCESS(f"Created {created_count} users."))
+
+    # Bulk mode
+    # --------------------------------------------------------------------------
+    def _bulk_create(self, model, count, options):
+        batch_size = options["batch_size"]
+        workers = options["workers"]
+
+        match model:
+            case "all":
+                self._bulk_create_users(count, batch_size, workers)
+                self._create_categories(len(GAME_CATEGORIES))
+                self._bulk_create_games(count, batch_size, workers)
+                self._bulk_create_comments(count, batch_size, workers)
+                self._bulk_create_replies(
+                    count, batch_size, workers, options["max_replies"]
+                )
+            case "games":
+                self._bulk_create_games(count, batch_size, workers)
+            case "categories":
+                self._create_categories(count)
+            case "comments":
+                self._bulk_create_comments(count, batch_size, workers)
+            case "replies":
+                self._bulk_create_replies(
+                    count, batch_size, workers, options["max_replies"]
+                )
+            case "users":
+                self._bulk_create_users(count, batch_size, workers)
+
+        if model in ("all", "comments", "replies"):
+            # bulk_create skips the signals that keep GameStats up to date
+            rebuilt = game_stats_rebuild()
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt stats of {rebuilt} games."))
+            call_command("backfill_comment_activity", stdout=self.stdout)
+
+    def _bulk_create_users(self, count, batch_size, workers):
+        created = _run_chunks(_bulk_users_chunk, count, workers, batch_size)
+        self.stdout.write(self.style.SUCCESS(f"Created {created} users."))
+
+    def _bulk_create_games(self, count, batch_size, workers):
+        category_ids = list(Category.objects.values_list("pk", flat=True))
+        if not category_ids:
+            self.stdout.write(
+                self.style.ERROR(
+                    "No categories found, please create categories first.",
+                ),
+            )
+            return
+
+        tag_ids = [Tag.objects.get_or_create(name=name)[0].pk for name in EQUIPMENT]
+        created = _run_chunks(
+            _bulk_games_chunk, count, workers, batch_size, category_ids, tag_ids
+        )
+        invalidate_facets_cache()
+        self.stdout.write(self.style.SUCCESS(f"Created {created} games."))
+
+    def _bulk_create_comments(self, count, batch_size, workers):
+        game_ids = list(Game.objects.values_list("pk", flat=True))
+        user_ids = list(User.objects.values_list("pk", flat=True))
+
+        if not game_ids or not user_ids:
+            self.stdout.write(
+                self.style.ERROR(
+                    "No games or users found, please create them first.",
+                ),
+            )
+            return
+
+        created = _run_chunks(
+            _bulk_comments_chunk, count, workers, batch_size, game_ids, user_ids
+        )
+        self.stdout.write(self.style.SUCCESS(f"Created {created} comments."))
+
+    def _bulk_create_replies(self, count, batch_size, workers, max_replies):
+        # parents are sampled by id range, listing 50M comments would not fit
+        id_range = Comment.objects.filter(parent__isnull=True).aggregate(
+            low=Min("pk"),
+            high=Max("pk"),
+        )
+        user_ids = list(User.objects.values_list("pk", flat=True))
+
+        if id_range["low"] is None:
+            self.stdout.write(
+                self.style.ERROR(
+                    "No comments found, please create comments first.",
+                ),
+            )
+            return
+
+        created = _run_chunks(
+            _bulk_replies_chunk,
+            count,
+            workers,
+            batch_size,
+            (id_range["low"], id_range["high"]),
+            user_ids,
+            max_replies,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Created {created} replies."))
+
+
+def _run_chunks(chunk_func, count, workers, *args):
+    """Split `count` rows between worker processes, return rows created."""
+    if workers <= 1:
+        return chunk_func(count, *args)
+
+    shares = [count // workers + (i < count % workers) for i in range(workers)]
+    # forked workers must not share the parent's DB connection
+    connections.close_all()
+    context = multiprocessing.get_context("fork")
+    with context.Pool(workers, initializer=connections.close_all) as pool:
+        return sum(pool.starmap(chunk_func, [(share, *args) for share in shares]))
+
+
+def _batches(count, batch_size):
+    for start in range(0, count, batch_size):
+        yield min(batch_size, count - start)
+
+
+def _text_pool():
+    return [fake.paragraph()[:30] for _ in range(TEXT_POOL_SIZE)]
+
+
+def _bulk_users_chunk(count, batch_size):
+    token = secrets.token_hex(4)
+    password = make_password(None)
+    names = [fake.user_name() for _ in range(TEXT_POOL_SIZE)]
+
+    created = 0
+    for size in _batches(count, batch_size):
+        users = [
+            User(
+                username=f"{random.choice(names)}_{token}_{created + i}",
+                password=password,
+            )
+            for i in range(size)
+        ]
+        User.objects.bulk_create(users, ignore_conflicts=True)
+        created += size
+
+    # the rows actually inserted, the token is in the usernames of this chunk only
+    return User.objects.filter(username__contains=f"_{token}_").count()
+
+
+def _bulk_games_chunk(count, batch_size, category_ids, tag_ids):
+    token = secrets.token_hex(4)
+    descriptions = [fake.paragraph() for _ in range(TEXT_POOL_SIZE)]
+    names = [fake.first_name() for _ in range(TEXT_POOL_SIZE)]
+    content_type = ContentType.objects.get_for_model(Game)
+
+    created = 0
+    for size in _batches(count, batch_size):
+        games = []
+        for i in range(size):
+            title = random.choice(GAME_CATEGORIES) + " by " + random.choice(names)
+            games.append(
+                Game(
+                    title=title,
+                    slug=f"{slugify(title)}-{token}-{created + i}",
+                    description=random.choice(descriptions),
+                    environment=random.choice(Environment.values),
+                    min_players=random.randint(2, 15),
+                    max_players=random.randint(20, 100),
+                    min_duration=random.randint(5, 30),
+                    max_duration=random.randint(40, 90),
+                    category_id=random.choice(category_ids),
+                ),
+            )
+        Game.objects.bulk_create(games)
+
+        TaggedItem.objects.bulk_create(
+            [
+                TaggedItem(content_type=content_type, object_id=game.pk, tag_id=tag_id)
+                for game in games
+                for tag_id in random.sample(tag_ids, random.randint(1, 3))
+            ],
+        )
+        # bulk_create skips the signals that keep equipment ids and search
+        # vectors up to date
+        game_equipment_ids_update([game.pk for game in games])
+        game_search_vector_update([game.pk for game in games])
+        created += size
+
+    return created
+
+
+def _bulk_comments_chunk(count, batch_size, game_ids, user_ids):
+    texts = _text_pool()
+
+    for size in _batches(count, batch_size):
+        comments = [
+            Comment(
+                author_id=random.choice(user_ids),
+                game_id=random.choice(game_ids),
+                text=random.choice(texts),
+                upvotes=random.randint(0, 5),
+                downvotes=random.randint(0, 5),
+                rating=random.randint(1, 10),
+            )
+            for _ in range(size)
+        ]
+        Comment.objects.bulk_create(comments)
+
+    return count
+
+
+def _bulk_replies_chunk(count, batch_size, id_range, user_ids, max_replies):
+    texts = _text_pool()
+    low, high = id_range
+
+    created = 0
+    while created < count:
+        candidates = random.sample(
+            range(low, high + 1), min(batch_size, high - low + 1)
+        )
+        parents = Comment.objects.filter(
+            pk__in=candidates,
+            parent__isnull=True,
+        ).values_list("pk", "game_id")
+
+        replies = [
+            Comment(
+                author_id=random.choice(user_ids) if user_ids else None,
+                game_id=game_id,
+                parent_id=parent_id,
+                text=random.choice(texts),
+                upvotes=random.randint(0, 5),
+                downvotes=random.randint(0, 5),
+            )
+            for parent_id, game_id in parents
+            for _ in range(random.randint(1, max_replies))
+        ][: count - created]
+        Comment.objects.bulk_create(replies)
+        created += len(replies)
+
+    return created
@@ -0,0 +1,259 @@
+import http.client
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.db.models import Count
+from django.urls import reverse
+
+from games_project.games.models import Game
+
+# gunicorn arguments of each mode, as in compose/production/django/start
+SERVER_MODES = {
+    "wsgi": ["config.wsgi"],
+    "asgi": ["config.asgi", "-k", "uvicorn_worker.UvicornWorker"],
+}
+CONCURRENCY = 50
+DURATION = 20
+WORKERS = 2
+PORT = 8765
+HOST = "localhost"
+STARTUP_TIMEOUT = 30
+REQUEST_TIMEOUT = 30
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test the read paths (games list and detail, comments API) "
+        "served by gunicorn with sync workers (wsgi) and uvicorn workers "
+        "(asgi), and compare throughput and latency."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--mode",
+            choices=SERVER_MODES,
+            action="append",
+            help="Server mode to test, may be repeated (default = both).",
+        )
+        parser.add_argument(
+            "--url",
+            help="Load an already running server instead of starting gunicorn.",
+        )
+        parser.add_argument(
+            "--host",
+            default=HOST,
+            help=f"Host header, one of ALLOWED_HOSTS (default = {HOST}).",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=CONCURRENCY,
+            help=f"Concurrent clients (default = {CONCURRENCY}).",
+        )
+        parser.add_argument(
+            "--duration",
+            type=float,
+            default=DURATION,
+            help=f"Seconds of load per mode (default = {DURATION}).",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=WORKERS,
+            help=f"gunicorn worker processes (default = {WORKERS}).",
+        )
+        parser.add_argument(
+            "--port",
+            type=int,
+            default=PORT,
+            help=f"Port of the started servers (default = {PORT}).",
+        )
+        parser.add_argument(
+            "--output",
+            type=Path,
+            help="Write the results to this JSON file.",
+        )
+
+    def handle(self, *args, **options):
+        paths = _read_paths()
+        load = {
+            "paths": paths,
+            "host": options["host"],
+            "concurrency": options["concurrency"],
+            "duration": options["duration"],
+        }
+
+        results = {}
+        if options["url"]:
+            results["target"] = run_load(options["url"], **load)
+        else:
+            for mode in options["mode"] or SERVER_MODES:
+                with _gunicorn(mode, options["port"], options["workers"]) as url:
+                    results[mode] = run_load(url, **load)
+
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<8} {result['requests_per_second']:>9.1f} req/s "
+                f"{result['p50_ms']:>9.2f} ms p50 "
+                f"{result['p95_ms']:>9.2f} ms p95 "
+                f"{result['p99_ms']:>9.2f} ms p99 "
+                f"{result['errors']:>5} errors",
+            )
+
+        if results.get("wsgi", {}).get("requests_per_second") and "asgi" in results:
+            ratio = (
+                results["asgi"]["requests_per_second"]
+                / results["wsgi"]["requests_per_second"]
+            )
+            self.stdout.write(f"asgi served {ratio:.2f}x the requests of wsgi.")
+
+        if options["output"]:
+            options["output"].write_text(
+                json.dumps({**load, "results": results}, indent=2) + "\n",
+            )
+            self.stdout.write(
+                self.style.SUCCESS(f"Results written to {options['output']}."),
+            )
+
+
+def _read_paths():
+    game = (
+        Game.objects.filter(is_active=True)
+        .annotate(comments_total=Count("comments"))
+        .order_by("-comments_total")
+        .first()
+    )
+    if game is None:
+        msg = "No games found, seed a dataset first (see the benchmark command)."
+        raise CommandError(msg)
+
+    return [
+        reverse("games:list"),
+        reverse("games:detail", kwargs={"slug": game.slug}),
+        reverse("games:comments", kwargs={"game_pk": game.pk}),
+    ]
+
+
+@contextmanager
+def _gunicorn(mode, port, workers):
+    """Serve the current settings with gunicorn in `mode` until the block exits."""
+    # a file, a full pipe would block the logging server
+    with tempfile.TemporaryFile() as log:
+        process = subprocess.Popen(  # noqa: S603
+            [
+                sys.executable,
+                "-m",
+                "gunicorn",
+                *SERVER_MODES[mode],
+                "--bind",
+                f"127.0.0.1:{port}",
+                "--workers",
+                str(workers),
+                "--chdir",
+                str(settings.BASE_DIR),
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=log,
+        )
+        try:
+            _wait_until_serving(process, port, log)
+            yield f"http://127.0.0.1:{port}"
+        finally:
+            process.terminate()
+            process.wait(STARTUP_TIMEOUT)
+
+
+def _wait_until_serving(process, port, log):
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            log.seek(0)
+            msg = f"Server failed to start:\n{log.read().decode()}"
+            raise CommandError(msg)
+        try:
+            connection = http.client.HTTPConnection(
+                "127.0.0.1", port, timeout=REQUEST_TIMEOUT
+            )
+            connection.request("GET", "/")
+            connection.getresponse().read()
+        except OSError:
+            time.sleep(0.2)
+        else:
+            return
+
+    msg = f"Server did not answer within {STARTUP_TIMEOUT} seconds."
+    raise CommandError(msg)
+
+
+def run_load(url, paths, host, concurrency, duration):
+    """
+    Request `paths` in turn from `concurrency` keep-alive connections for
+    `duration` seconds and summarize the latencies.
+    """
+    headers = {"Host": host}
+    parts = urlsplit(url)
+    deadline = time.monotonic() + duration
+    timings = []
+    errors = []
+    lock = threading.Lock()
+
+    def client(offset):
+        connection = http.client.HTTPConnection(
+            parts.hostname, parts.port, timeout=REQUEST_TIMEOUT
+        )
+        own_timings, own_errors = [], 0
+        i = offset
+        while time.monotonic() < deadline:
+            path = parts.path.rstrip("/") + paths[i % len(paths)]
+            i += 1
+            started = time.perf_counter()
+            try:
+                connection.request("GET", path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+            except OSError:
+                own_errors += 1
+                connection.close()
+                connection = http.client.HTTPConnection(
+                    parts.hostname, parts.port, timeout=REQUEST_TIMEOUT
+                )
+                continue
+            own_timings.append((time.perf_counter() - started) * 1000)
+            if response.status >= 400:  # noqa: PLR2004
+                own_errors += 1
+        connection.close()
+
+        with lock:
+            timings.extend(own_timings)
+            errors.append(own_errors)
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(concurrency) as executor:
+        list(executor.map(client, range(concurrency)))
+    elapsed = time.monotonic() - started
+
+    timings.sort()
+    return {
+        "requests": len(timings),
+        "errors": sum(errors),
+        "requests_per_second": round(len(timings) / elapsed, 1),
+        "p50_ms": round(statistics.median(timings), 2) if timings else 0.0,
+        "p95_ms": round(_percentile(timings, 0.95), 2) if timings else 0.0,
+        "p99_ms": round(_percentile(timings, 0.99), 2) if timings else 0.0,
+    }
+
+
+def _percentile(values, fraction):
+    return values[min(int(len(values) * fraction), len(values) - 1)]
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from games_project.games.services import STATS_REBUILD_BATCH_SIZE
+from games_project.games.services import game_stats_rebuild
+
+
+class Command(BaseCommand):
+    help = "Rebuild denormalized game stats from comments."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--game",
+            type=int,
+            action="append",
+            dest="game_ids",
+            help="Only rebuild stats of this game id (can be repeated).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=STATS_REBUILD_BATCH_SIZE,
+            help=f"Games per batch (default = {STATS_REBUILD_BATCH_SIZE}).",
+        )
+
+    def handle(self, *args, **options):
+        rebuilt = game_stats_rebuild(
+            game_ids=options["game_ids"],
+            batch_size=options["batch_size"],
+        )
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt stats of {rebuilt} games."))
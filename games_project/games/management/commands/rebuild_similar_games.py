@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from games_project.games.recommendations import NEIGHBORS
+from games_project.games.recommendations import similar_games_rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the similar games of every active game from ratings, "
+        "equipment and categories."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--neighbors",
+            type=int,
+            default=NEIGHBORS,
+            help=f"Similar games kept per game (default = {NEIGHBORS}).",
+        )
+
+    def handle(self, *args, **options):
+        games = similar_games_rebuild(neighbors=options["neighbors"])
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Stored similar games of {games} games."),
+        )
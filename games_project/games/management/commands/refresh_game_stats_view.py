@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from games_project.games.services import game_stats_view_refresh
+
+
+class Command(BaseCommand):
+    help = (
+        "Refresh the game_stats_mv materialized view read by the stats admin "
+        "with GAME_STATS_MATERIALIZED_VIEW. Runs once, or every --interval "
+        "seconds until stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            help="Keep refreshing, waiting this many seconds between refreshes.",
+        )
+
+    def handle(self, *args, **options):
+        interval = options["interval"]
+
+        while True:
+            started = time.monotonic()
+            game_stats_view_refresh()
+            self.stdout.write(
+                f"Refreshed game stats in {time.monotonic() - started:.1f}s.",
+            )
+            if not interval:
+                break
+
+            time.sleep(interval)
+            close_old_connections()
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.10 on 2026-10-18 14:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+FILL_GAME_STATS = """
+INSERT INTO games_gamestats (
+    game_id, rating_sum, rating_count, comments_count,
+    last_comment_id, last_comment_text, last_activity
+)
+SELECT
+    g.id,
+    COALESCE(SUM(c.rating), 0),
+    COUNT(c.rating),
+    COUNT(c.id),
+    last.id,
+    COALESCE(last.text, ''),
+    MAX(c.modified)
+FROM games_game g
+LEFT JOIN feedback_comment c ON c.game_id = g.id
+LEFT JOIN LATERAL (
+    SELECT l.id, l.text FROM feedback_comment l
+    WHERE l.game_id = g.id
+    ORDER BY l.created DESC, l.id DESC
+    LIMIT 1
+) last ON TRUE
+GROUP BY g.id, last.id, last.text
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0012_alter_gamewithstats_options_game_is_active'),
+        ('feedback', '0004_alter_comment_options_alter_comment_parent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameStats',
+            fields=[
+                ('game', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='games.game')),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('rating_count', models.PositiveIntegerField(default=0)),
+                ('comments_count', models.PositiveIntegerField(default=0)),
+                ('last_comment_id', models.BigIntegerField(blank=True, null=True)),
+                ('last_comment_text', models.TextField(blank=True)),
+                ('last_activity', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Game stats',
+                'verbose_name_plural': 'Game stats',
+            },
+        ),
+        migrations.RunSQL(FILL_GAME_STATS, migrations.RunSQL.noop),
+    ]
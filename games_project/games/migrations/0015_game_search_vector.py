@@ -0,0 +1,44 @@
+# Generated by Django 5.2.10 on 2026-10-18 14:46
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+FILL_SEARCH_VECTOR = """
+UPDATE games_game g SET search_vector =
+    setweight(to_tsvector('english', g.title), 'A')
+    || setweight(to_tsvector('english', COALESCE(
+        (SELECT c.title FROM games_category c WHERE c.id = g.category_id), ''
+    )), 'B')
+    || setweight(to_tsvector('english', COALESCE(
+        (SELECT string_agg(t.name, ' ')
+         FROM taggit_taggeditem ti
+         JOIN taggit_tag t ON t.id = ti.tag_id
+         JOIN django_content_type ct ON ct.id = ti.content_type_id
+         WHERE ct.app_label = 'games' AND ct.model = 'game' AND ti.object_id = g.id),
+        ''
+    )), 'B')
+    || setweight(to_tsvector('english', g.description), 'C')
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('games', '0014_game_title_id_index'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='games_game_search_idx'),
+        ),
+        migrations.RunSQL(FILL_SEARCH_VECTOR, migrations.RunSQL.noop),
+    ]
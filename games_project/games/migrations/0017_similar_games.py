@@ -0,0 +1,29 @@
+# Generated by Django 5.2.10 on 2026-10-18 15:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0016_game_facet_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarGame',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_games', to='games.game')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommended_for', to='games.game')),
+            ],
+            options={
+                'verbose_name': 'Similar game',
+                'verbose_name_plural': 'Similar games',
+                'constraints': [models.UniqueConstraint(fields=('game', 'rank'), name='games_similar_game_rank_uniq')],
+            },
+        ),
+    ]
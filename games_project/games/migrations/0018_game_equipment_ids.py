@@ -0,0 +1,36 @@
+# Generated by Django 5.2.10 on 2026-10-18 15:24
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+FILL_EQUIPMENT_IDS = """
+UPDATE games_game g SET equipment_ids = ARRAY(
+    SELECT ti.tag_id
+    FROM taggit_taggeditem ti
+    JOIN django_content_type ct ON ct.id = ti.content_type_id
+    WHERE ct.app_label = 'games' AND ct.model = 'game' AND ti.object_id = g.id
+    ORDER BY ti.tag_id
+)
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0017_similar_games'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='equipment_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), blank=True, default=list, editable=False, size=None),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['equipment_ids'], name='games_game_equipment_idx'),
+        ),
+        migrations.RunSQL(FILL_EQUIPMENT_IDS, migrations.RunSQL.noop),
+    ]
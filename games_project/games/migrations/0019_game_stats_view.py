@@ -0,0 +1,54 @@
+# Generated by Django 5.2.10 on 2026-10-18 15:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# grouped over the comments only, the games are joined when it is read
+CREATE_GAME_STATS_VIEW = """
+CREATE MATERIALIZED VIEW game_stats_mv AS
+SELECT
+    game_id,
+    AVG(rating)::double precision AS avg_rating,
+    COUNT(rating) AS rating_count,
+    COUNT(*) AS comments_count,
+    MAX(modified) AS last_activity
+FROM feedback_comment
+GROUP BY game_id;
+
+-- REFRESH MATERIALIZED VIEW CONCURRENTLY needs a unique index
+CREATE UNIQUE INDEX game_stats_mv_game_idx ON game_stats_mv (game_id);
+CREATE INDEX game_stats_mv_avg_rating_idx ON game_stats_mv (avg_rating);
+CREATE INDEX game_stats_mv_comments_count_idx ON game_stats_mv (comments_count);
+CREATE INDEX game_stats_mv_last_activity_idx ON game_stats_mv (last_activity);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback', '0009_comment_scores'),
+        ('games', '0018_game_equipment_ids'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameStatsSnapshot',
+            fields=[
+                ('game', models.OneToOneField(on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='stats_snapshot', serialize=False, to='games.game')),
+                ('avg_rating', models.FloatField(null=True)),
+                ('rating_count', models.PositiveIntegerField()),
+                ('comments_count', models.PositiveIntegerField()),
+                ('last_activity', models.DateTimeField(null=True)),
+            ],
+            options={
+                'verbose_name': 'Game stats snapshot',
+                'verbose_name_plural': 'Game stats snapshots',
+                'db_table': 'game_stats_mv',
+                'managed': False,
+            },
+        ),
+        migrations.RunSQL(
+            CREATE_GAME_STATS_VIEW,
+            "DROP MATERIALIZED VIEW game_stats_mv",
+        ),
+    ]
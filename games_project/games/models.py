@@ -1,9 +1,19 @@
+import datetime
+
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.exceptions import ValidationError
 from django.db import models
-from django.db.models import Avg
+from django.urls import reverse
 from django.utils import timezone
 from taggit.managers import TaggableManager
 
+# text search configuration of Game.search_vector and its queries
+SEARCH_CONFIG = "english"
+# "last day" of the stats admin, measured back from each request
+RECENT_ACTIVITY_WINDOW = datetime.timedelta(days=1)
+
 
 class Environment(models.TextChoices):
     OUTDOOR = "OUT", "Outdoor"
@@ -27,6 +37,12 @@ class Category(models.Model):
         return self.title
 
 
+class GameQuerySet(models.QuerySet):
+    def with_equipment(self):
+        """Prefetch the equipment tags of all games in one query."""
+        return self.prefetch_related("equipment")
+
+
 class Game(models.Model):
     title = models.CharField(max_length=255)
     slug = models.SlugField(unique=True, db_index=True)
@@ -62,10 +78,38 @@ class Game(models.Model):
         help_text="list of equipment (ball, string, paper...)", blank=True
     )
 
+    # title, category, equipment and description, see games.services
+    search_vector = SearchVectorField(null=True, blank=True, editable=False)
+    # tag ids of equipment, see games.services, for indexed tag set queries
+    equipment_ids = ArrayField(
+        models.IntegerField(), default=list, blank=True, editable=False
+    )
+
+    objects = GameQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Game"
         verbose_name_plural = "Games"
         ordering = ["title"]
+        indexes = [
+            # keyset pagination of the games list
+            models.Index(fields=["title", "id"], name="games_game_title_id_idx"),
+            GinIndex(fields=["search_vector"], name="games_game_search_idx"),
+            GinIndex(fields=["equipment_ids"], name="games_game_equipment_idx"),
+            # facet filters, see games.selectors.games_filter
+            models.Index(
+                fields=["is_active", "environment", "category"],
+                name="games_game_facets_idx",
+            ),
+            models.Index(
+                fields=["min_players", "max_players"],
+                name="games_game_players_idx",
+            ),
+            models.Index(
+                fields=["min_duration", "max_duration"],
+                name="games_game_duration_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.title
@@ -86,35 +130,131 @@ class Game(models.Model):
             error = "Minimum duration cannot be bigger than maximum duration."
             raise ValidationError(error)
 
+    def get_attachments_url(self):
+        """Download url of the attachments, None without any."""
+        if not self.attachments:
+            return None
+        return reverse("games:attachment", kwargs={"game_pk": self.pk})
+
     def equipment_list(self):
+        # all() reads the tags of with_equipment() if they were prefetched
         return ", ".join(item.name for item in self.equipment.all())
 
 
+class GameStats(models.Model):
+    """Denormalized comment stats, kept up to date by games.services."""
+
+    game = models.OneToOneField(
+        Game, primary_key=True, on_delete=models.CASCADE, related_name="stats"
+    )
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    comments_count = models.PositiveIntegerField(default=0)
+    # plain id instead of FK, feedback app already depends on games
+    last_comment_id = models.BigIntegerField(null=True, blank=True)
+    last_comment_text = models.TextField(blank=True)
+    last_activity = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Game stats"
+        verbose_name_plural = "Game stats"
+
+    def __str__(self):
+        return f"Stats of game #{self.game_id}"
+
+    @property
+    def average_rating(self):
+        if not self.rating_count:
+            return None
+        return self.rating_sum / self.rating_count
+
+
+class GameStatsSnapshot(models.Model):
+    """
+    Comment stats of the games as of the last refresh of the game_stats_mv
+    materialized view, see games.services.game_stats_view_refresh.
+    """
+
+    game = models.OneToOneField(
+        Game,
+        primary_key=True,
+        on_delete=models.DO_NOTHING,
+        related_name="stats_snapshot",
+    )
+    avg_rating = models.FloatField(null=True)
+    rating_count = models.PositiveIntegerField()
+    comments_count = models.PositiveIntegerField()
+    last_activity = models.DateTimeField(null=True)
+
+    class Meta:
+        managed = False  # created and indexed by games migration 0019
+        db_table = "game_stats_mv"
+        verbose_name = "Game stats snapshot"
+        verbose_name_plural = "Game stats snapshots"
+
+    def __str__(self):
+        return f"Stats snapshot of game #{self.game_id}"
+
+
+class SimilarGame(models.Model):
+    """Top neighbors of each game, computed offline by games.recommendations."""
+
+    game = models.ForeignKey(
+        Game, on_delete=models.CASCADE, related_name="similar_games"
+    )
+    similar = models.ForeignKey(
+        Game, on_delete=models.CASCADE, related_name="recommended_for"
+    )
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        verbose_name = "Similar game"
+        verbose_name_plural = "Similar games"
+        constraints = [
+            # also the index of a game's neighbors in rank order
+            models.UniqueConstraint(
+                fields=["game", "rank"], name="games_similar_game_rank_uniq"
+            ),
+        ]
+
+    def __str__(self):
+        return f"#{self.rank} similar game of game #{self.game_id}"
+
+
 class GameWithStats(Game):
     class Meta:
         proxy = True  # don't create new DB table
         verbose_name = "Game with stats"
         verbose_name_plural = "Games with stats"
 
+    @property
+    def _stats(self):
+        # games without any comments may not have a stats row yet
+        return getattr(self, "stats", None)
+
     @property
     def average_rating(self):
-        rating = self.comments.filter(rating__isnull=False).aggregate(
-            avg=Avg("rating")
-        )["avg"]
+        rating = self._stats.average_rating if self._stats else None
 
         return f"{rating:.2f}" if rating else "no rating"
 
     @property
     def last_comment(self):
-        comment = self.comments.order_by("-created").first()
-        return comment.text if comment else None
+        stats = self._stats
+        return stats.last_comment_text if stats and stats.last_comment_id else None
 
-    yesterday = timezone.now() - timezone.timedelta(days=1)
+    # set for a whole page at once, see games_recent_comment_counts()
+    recent_comments_count = None
 
     @property
     def comments_count_last_day(self):
-        return self.comments.filter(created__gte=self.yesterday).count()
+        if self.recent_comments_count is not None:
+            return self.recent_comments_count
+
+        since = timezone.now() - RECENT_ACTIVITY_WINDOW
+        return self.comments.filter(created__gte=since).count()
 
     @property
     def was_updated_last_day(self):
-        return self.modified >= self.yesterday
+        return self.modified >= timezone.now() - RECENT_ACTIVITY_WINDOW
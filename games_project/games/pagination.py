@@ -0,0 +1,109 @@
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+# integers beyond a bigint would fail in the database instead of matching nothing
+CURSOR_INT_RANGE = range(-(2**63), 2**63)
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    # isoformat keeps microseconds, DjangoJSONEncoder would cut them to ms
+    values = [
+        value.isoformat() if isinstance(value, datetime.datetime) else value
+        for value in values
+    ]
+    raw = json.dumps(values).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, binascii.Error) as e:
+        msg = "Invalid cursor."
+        raise InvalidCursorError(msg) from e
+
+    if not isinstance(values, list) or any(
+        isinstance(value, int) and value not in CURSOR_INT_RANGE for value in values
+    ):
+        msg = "Invalid cursor."
+        raise InvalidCursorError(msg)
+    return values
+
+
+def keyset_filter(ordering, values):
+    """
+    Build a filter selecting rows that come after `values` in `ordering`,
+    e.g. ["-created", "-id"] gives created < x OR (created = x AND id < y).
+    """
+    after = Q()
+    for i, field in enumerate(ordering):
+        name = field.removeprefix("-")
+        lookup = "lt" if field.startswith("-") else "gt"
+
+        condition = Q(**{f"{name}__{lookup}": values[i]})
+        for previous, value in zip(ordering[:i], values[:i], strict=True):
+            condition &= Q(**{previous.removeprefix("-"): value})
+        after |= condition
+
+    return after
+
+
+def _keyset_queryset(queryset, ordering, cursor):
+    queryset = queryset.order_by(*ordering)
+    if not cursor:
+        return queryset
+
+    values = decode_cursor(cursor)
+    if len(values) != len(ordering):
+        msg = "Invalid cursor."
+        raise InvalidCursorError(msg)
+    try:
+        return queryset.filter(keyset_filter(ordering, values))
+    except (ValidationError, TypeError, ValueError) as e:
+        msg = "Invalid cursor."
+        raise InvalidCursorError(msg) from e
+
+
+def _keyset_page(rows, ordering, limit):
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(
+            [getattr(last, field.removeprefix("-")) for field in ordering],
+        )
+
+    return rows, next_cursor
+
+
+def paginate_keyset(queryset, ordering, cursor=None, limit=PAGE_SIZE):
+    """Return one page of rows and the cursor of the next page (or None)."""
+    queryset = _keyset_queryset(queryset, ordering, cursor)
+    return _keyset_page(list(queryset[: limit + 1]), ordering, limit)
+
+
+async def apaginate_keyset(queryset, ordering, cursor=None, limit=PAGE_SIZE):
+    """Async version of paginate_keyset()."""
+    queryset = _keyset_queryset(queryset, ordering, cursor)
+    rows = [row async for row in queryset[: limit + 1]]
+    return _keyset_page(rows, ordering, limit)
+
+
+def page_limit(request, default=PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    try:
+        limit = int(request.GET.get("limit", default))
+    except ValueError:
+        return default
+
+    return max(1, min(limit, maximum))
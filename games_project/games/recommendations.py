@@ -0,0 +1,169 @@
+"""
+Similar games, computed offline: the adjusted cosine of the ratings users
+gave to both games, blended with the overlap of their equipment tags and
+category. The top neighbors of every game are stored in SimilarGame.
+"""
+
+import numpy as np
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Avg
+from scipy import sparse
+from taggit.models import TaggedItem
+
+from games_project.feedback.models import Comment
+
+from .models import Game
+from .models import SimilarGame
+
+NEIGHBORS = 10
+# share of the rating similarity in the score, equipment and category get the rest
+RATING_WEIGHT = 0.7
+# common raters at which a rating similarity counts half, few are mostly noise
+RATING_SHRINKAGE = 5
+# games scored at once, a block is a dense BLOCK_SIZE x games array
+BLOCK_SIZE = 512
+SAVE_BATCH_SIZE = 1000
+
+
+def _normalize_columns(matrix):
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0))).ravel()
+    norms[norms == 0] = 1
+    return (matrix @ sparse.diags(1 / norms)).tocsc()
+
+
+def _rating_matrix(game_pks):
+    """
+    Users x games, the rating of every user minus their mean rating, so
+    users who rate everything high don't make all their games similar.
+    """
+    rows = list(
+        # anonymous ratings share a NULL author, they'd act as one huge rater
+        Comment.objects.filter(
+            rating__isnull=False,
+            author__isnull=False,
+            game__is_active=True,
+        )
+        .order_by()
+        .values("author_id", "game_id")
+        .annotate(rating=Avg("rating"))
+        .values_list("author_id", "game_id", "rating"),
+    )
+    if not rows:
+        return sparse.csc_matrix((0, len(game_pks)))
+
+    authors, games, ratings = np.array(rows, dtype=float).T
+    _, users = np.unique(authors, return_inverse=True)
+    means = np.bincount(users, weights=ratings) / np.bincount(users)
+
+    matrix = sparse.csc_matrix(
+        (ratings - means[users], (users, np.searchsorted(game_pks, games))),
+        shape=(users.max() + 1, len(game_pks)),
+    )
+    matrix.eliminate_zeros()
+    return matrix
+
+
+def _content_matrix(game_pks, categories):
+    """Equipment tags and categories x games, 1 where the game has it."""
+    tagged = np.array(
+        list(
+            TaggedItem.objects.filter(
+                content_type=ContentType.objects.get_for_model(Game),
+            ).values_list("object_id", "tag_id"),
+        ),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+    tagged = tagged[np.isin(tagged[:, 0], game_pks)]
+    _, tags = np.unique(tagged[:, 1], return_inverse=True)
+
+    has_category = categories >= 0
+    _, category_columns = np.unique(categories[has_category], return_inverse=True)
+
+    rows = np.concatenate(
+        [np.searchsorted(game_pks, tagged[:, 0]), np.flatnonzero(has_category)],
+    )
+    columns = np.concatenate([tags, category_columns + len(tags)])
+    return sparse.csc_matrix(
+        (np.ones(len(rows)), (columns, rows)),
+        shape=(columns.max(initial=-1) + 1, len(game_pks)),
+    )
+
+
+def similar_games_scores(game_pks, ratings, content, neighbors):
+    """
+    Yield (game index, neighbor indexes, scores) of every game with any
+    similar game. `ratings` and `content` are features x games matrices.
+    """
+    ratings = _normalize_columns(ratings)
+    raters = (ratings != 0).astype(float)
+    content = _normalize_columns(content)
+    neighbors = min(neighbors, len(game_pks) - 1)
+    if neighbors < 1:
+        return
+
+    for start in range(0, len(game_pks), BLOCK_SIZE):
+        block = slice(start, start + BLOCK_SIZE)
+
+        common_raters = (raters[:, block].T @ raters).toarray()
+        scores = RATING_WEIGHT * (ratings[:, block].T @ ratings).toarray()
+        scores *= common_raters / (common_raters + RATING_SHRINKAGE)
+        scores += (1 - RATING_WEIGHT) * (content[:, block].T @ content).toarray()
+
+        rows = np.arange(len(scores))
+        scores[rows, rows + start] = -np.inf
+
+        top = np.argpartition(-scores, neighbors - 1, axis=1)[:, :neighbors]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        for row in rows:
+            # dissimilar or unrelated games are no recommendation
+            similar = top_scores[row] > 0
+            if similar.any():
+                yield start + row, top[row][similar], top_scores[row][similar]
+
+
+def similar_games_rebuild(neighbors=NEIGHBORS):
+    """
+    Recompute the top `neighbors` similar games of every active game and
+    replace all SimilarGame rows. Returns the number of games with any.
+    """
+    games = list(
+        Game.objects.filter(is_active=True)
+        .order_by("pk")
+        .values_list("pk", "category_id"),
+    )
+    game_pks = np.array([pk for pk, _ in games], dtype=np.int64)
+    categories = np.array([-1 if c is None else c for _, c in games], dtype=np.int64)
+
+    similar_games = []
+    games_count = 0
+    for game, similar, scores in similar_games_scores(
+        game_pks,
+        _rating_matrix(game_pks),
+        _content_matrix(game_pks, categories),
+        neighbors,
+    ):
+        games_count += 1
+        similar_games.extend(
+            SimilarGame(
+                # numpy scalars to Python ones for the database driver
+                game_id=int(game_pks[game]),
+                similar_id=int(game_pks[neighbor]),
+                rank=rank,
+                score=float(score),
+            )
+            for rank, (neighbor, score) in enumerate(
+                zip(similar, scores, strict=True), start=1
+            )
+        )
+
+    # readers see the previous neighbors until the commit
+    with transaction.atomic():
+        SimilarGame.objects.all().delete()
+        SimilarGame.objects.bulk_create(similar_games, batch_size=SAVE_BATCH_SIZE)
+
+    return games_count
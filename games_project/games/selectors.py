@@ -1,17 +1,306 @@
-from django.db.models import Avg
+import datetime
+
+from django.contrib.postgres.expressions import ArraySubquery
+from django.contrib.postgres.search import SearchHeadline
+from django.contrib.postgres.search import SearchQuery
+from django.contrib.postgres.search import SearchRank
 from django.db.models import Count
+from django.db.models import F
+from django.db.models import FloatField
+from django.db.models import Q
+from django.db.models import Sum
+from django.db.models.functions import Cast
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from django.utils.html import escape
+from taggit.models import Tag
+
+from games_project.feedback.models import Comment
+from games_project.feedback.models import CommentActivityBucket
+from games_project.feedback.services import activity_hour
 
+from .models import RECENT_ACTIVITY_WINDOW
+from .models import SEARCH_CONFIG
+from .models import Environment
+from .models import Game
 from .models import GameWithStats
 
+# control characters can't come from user text, see games_search_highlight()
+HEADLINE_START = "\x02"
+HEADLINE_STOP = "\x03"
+
+# value: (label, condition), shared with the admin GroupSizeListFilter
+GROUP_SIZES = {
+    "<10": ("Under 10", Q(min_players__lt=10)),
+    "10-20": ("Between 10 and 20", Q(max_players__gte=10, min_players__lte=20)),
+    "21-50": ("Between 21 and 50", Q(max_players__gte=21, min_players__lte=50)),
+    "50+": ("Above 50", Q(max_players__gte=50)),
+}
+DURATIONS = {
+    "<15": ("Under 15 minutes", Q(min_duration__lt=15)),
+    "15-30": (
+        "Between 15 and 30 minutes",
+        Q(max_duration__gte=15, min_duration__lte=30),
+    ),
+    "30+": ("Above 30 minutes", Q(max_duration__gte=30)),
+}
+BUCKET_FACETS = {
+    "group_size": GROUP_SIZES,
+    "duration": DURATIONS,
+    "environment": {
+        value: (label, Q(environment=value)) for value, label in Environment.choices
+    },
+}
+FACETS = [*BUCKET_FACETS, "category", "equipment"]
+FACET_EQUIPMENT_LIMIT = 50
+# value: (label, condition) of the average rating filter of the stats admin
+RATING_RANGES = {
+    "4+": ("4 and above", Q(avg_rating__gte=4)),
+    "3-4": ("3 to 4", Q(avg_rating__gte=3, avg_rating__lt=4)),
+    "<3": ("Below 3", Q(avg_rating__lt=3)),
+}
+
 
 def games_that_have_comments_with_rating():
-    return GameWithStats.objects.filter(
-        comments__rating__isnull=False,
-    ).distinct()
+    return GameWithStats.objects.filter(stats__rating_count__gt=0)
 
 
 def games_anotated_with_stats():
-    return games_that_have_comments_with_rating().annotate(
-        avg_rating=Avg("comments__rating"),
-        comments_count=Count("comments", distinct=True),
+    return (
+        games_that_have_comments_with_rating()
+        .select_related("stats")
+        .annotate(
+            avg_rating=Cast("stats__rating_sum", FloatField())
+            / F("stats__rating_count"),
+            comments_count=F("stats__comments_count"),
+            last_activity=F("stats__last_activity"),
+        )
+    )
+
+
+def games_anotated_with_materialized_stats():
+    """
+    games_anotated_with_stats() from the game_stats_mv snapshot, sorting and
+    filtering on the stats use the indexes of the view.
+    """
+    return (
+        GameWithStats.objects.filter(stats_snapshot__rating_count__gt=0)
+        .select_related("stats")
+        .annotate(
+            avg_rating=F("stats_snapshot__avg_rating"),
+            comments_count=F("stats_snapshot__comments_count"),
+            last_activity=F("stats_snapshot__last_activity"),
+        )
+    )
+
+
+def _comment_counts(game_ids, since, until=None):
+    comments = Comment.objects.filter(game_id__in=game_ids, created__gte=since)
+    if until is not None:
+        comments = comments.filter(created__lt=until)
+
+    counts = comments.order_by().values("game_id").annotate(count=Count("id"))
+    return {row["game_id"]: row["count"] for row in counts}
+
+
+def games_recent_comment_counts(game_ids, window=RECENT_ACTIVITY_WINDOW):
+    """
+    Comments written in the last `window` (from now) per game, for many games
+    at once. Up to a day they are counted on the (game, created) index,
+    longer windows sum the hourly activity buckets and only count the
+    comments of the first, partial hour.
+    """
+    since = timezone.now() - window
+    if window <= RECENT_ACTIVITY_WINDOW:
+        return _comment_counts(game_ids, since)
+
+    first_hour = activity_hour(since)
+    if first_hour < since:
+        first_hour += datetime.timedelta(hours=1)
+
+    counts = _comment_counts(game_ids, since, first_hour)
+    buckets = (
+        CommentActivityBucket.objects.filter(game_id__in=game_ids, hour__gte=first_hour)
+        .values("game_id")
+        .annotate(count=Sum("comments_count"))
     )
+    for row in buckets:
+        counts[row["game_id"]] = counts.get(row["game_id"], 0) + row["count"]
+
+    return counts
+
+
+def games_activity_trend(game_pk, days=30):
+    """Daily comments, votes and average rating of a game, from the buckets."""
+    since = timezone.now() - datetime.timedelta(days=days)
+    rows = (
+        CommentActivityBucket.objects.filter(game_id=game_pk, hour__gte=since)
+        .annotate(day=TruncDate("hour", tzinfo=datetime.UTC))
+        .values("day")
+        .annotate(
+            comments_count=Sum("comments_count"),
+            rating_sum=Sum("rating_sum"),
+            rating_count=Sum("rating_count"),
+            upvotes=Sum("upvotes"),
+            downvotes=Sum("downvotes"),
+        )
+        .order_by("day")
+    )
+
+    return [
+        {
+            "day": row["day"],
+            "comments_count": row["comments_count"],
+            "average_rating": (
+                row["rating_sum"] / row["rating_count"] if row["rating_count"] else None
+            ),
+            "upvotes": row["upvotes"],
+            "downvotes": row["downvotes"],
+        }
+        for row in rows
+    ]
+
+
+def games_similar(game_pk):
+    """Active similar games of a game, best first, see games.recommendations."""
+    return Game.objects.filter(
+        recommended_for__game_id=game_pk,
+        is_active=True,
+    ).order_by("recommended_for__rank")
+
+
+def games_search_query(text):
+    return SearchQuery(text, search_type="websearch", config=SEARCH_CONFIG)
+
+
+def games_search(text):
+    query = games_search_query(text)
+
+    return (
+        Game.objects.filter(is_active=True, search_vector=query)
+        .select_related("category")
+        .annotate(
+            # real, cast so the rank in a keyset cursor compares equal
+            rank=Cast(SearchRank(F("search_vector"), query), FloatField()),
+            headline=SearchHeadline(
+                "description",
+                query,
+                config=SEARCH_CONFIG,
+                start_sel=HEADLINE_START,
+                stop_sel=HEADLINE_STOP,
+                max_words=35,
+                min_words=15,
+            ),
+        )
+    )
+
+
+def games_search_highlight(headline):
+    """Escape the headline, then turn the highlight markers into <mark> tags."""
+    return (
+        escape(headline)
+        .replace(HEADLINE_START, "<mark>")
+        .replace(HEADLINE_STOP, "</mark>")
+    )
+
+
+def _equipment_ids(slugs):
+    # a single array for the equipment_ids GIN index, no join of the tags
+    return ArraySubquery(Tag.objects.filter(slug__in=slugs).values("pk"))
+
+
+def _games_filter_conditions(filters):
+    """
+    One condition per filtered facet, values of the same facet are ORed.
+    `filters` maps facet names to lists of already validated values.
+    """
+    conditions = {}
+    for name, choices in BUCKET_FACETS.items():
+        if values := filters.get(name):
+            conditions[name] = Q.create([choices[value][1] for value in values], "OR")
+
+    if values := filters.get("category"):
+        conditions["category"] = Q(category__slug__in=values)
+    if values := filters.get("equipment"):
+        conditions["equipment"] = Q(equipment_ids__overlap=_equipment_ids(values))
+    if values := filters.get("available_equipment"):
+        # games needing nothing else, games without equipment included
+        conditions["available_equipment"] = Q(
+            equipment_ids__contained_by=_equipment_ids(values),
+        )
+
+    return conditions
+
+
+def games_filter(filters):
+    conditions = _games_filter_conditions(filters)
+    return Game.objects.filter(*conditions.values(), is_active=True).select_related(
+        "category",
+    )
+
+
+def games_facets(filters):
+    """
+    Count the active games of every facet value. Each facet is counted with
+    the filters of the other facets only, so selecting a value keeps the
+    alternatives of its own facet visible.
+
+    The fixed buckets are conditional counts of a single aggregate query,
+    categories and equipment one grouped query each.
+    """
+    conditions = _games_filter_conditions(filters)
+    games = Game.objects.filter(is_active=True).order_by()
+
+    def other_facets(name):
+        return Q.create(
+            [condition for facet, condition in conditions.items() if facet != name],
+        )
+
+    aggregates = {}
+    for name, choices in BUCKET_FACETS.items():
+        for i, (_, condition) in enumerate(choices.values()):
+            aggregates[f"{name}_{i}"] = Count(
+                "pk",
+                filter=other_facets(name) & condition,
+            )
+    counts = games.aggregate(**aggregates)
+
+    facets = {
+        name: [
+            {"value": value, "label": label, "count": counts[f"{name}_{i}"]}
+            for i, (value, (label, _)) in enumerate(choices.items())
+        ]
+        for name, choices in BUCKET_FACETS.items()
+    }
+
+    categories = (
+        games.filter(other_facets("category"), category__isnull=False)
+        .values("category__slug", "category__title")
+        .annotate(count=Count("pk"))
+        .order_by("-count", "category__title")
+    )
+    facets["category"] = [
+        {
+            "value": row["category__slug"],
+            "label": row["category__title"],
+            "count": row["count"],
+        }
+        for row in categories
+    ]
+
+    equipment = (
+        games.filter(other_facets("equipment"), equipment__isnull=False)
+        .values("equipment__slug", "equipment__name")
+        .annotate(count=Count("pk"))
+        .order_by("-count", "equipment__name")[:FACET_EQUIPMENT_LIMIT]
+    )
+    facets["equipment"] = [
+        {
+            "value": row["equipment__slug"],
+            "label": row["equipment__name"],
+            "count": row["count"],
+        }
+        for row in equipment
+    ]
+
+    return facets
@@ -0,0 +1,217 @@
+from collections import defaultdict
+
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.expressions import ArraySubquery
+from django.contrib.postgres.search import SearchVector
+from django.db import connection
+from django.db.models import Count
+from django.db.models import F
+from django.db.models import Max
+from django.db.models import OuterRef
+from django.db.models import Subquery
+from django.db.models import Sum
+from django.db.models import Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from taggit.models import TaggedItem
+
+from games_project.feedback.models import Comment
+
+from .models import SEARCH_CONFIG
+from .models import Category
+from .models import Game
+from .models import GameStats
+from .models import GameStatsSnapshot
+
+STATS_REBUILD_BATCH_SIZE = 1000
+STATS_FIELDS = [
+    "rating_sum",
+    "rating_count",
+    "comments_count",
+    "last_comment_id",
+    "last_comment_text",
+    "last_activity",
+]
+
+
+def game_stats_rebuild(game_ids=None, batch_size=STATS_REBUILD_BATCH_SIZE):
+    """Recalculate GameStats rows from comments (all games if no ids given)."""
+    games = Game.objects.order_by("pk").values_list("pk", flat=True)
+    if game_ids is not None:
+        games = games.filter(pk__in=game_ids)
+
+    rebuilt = 0
+    last_pk = 0
+    while batch := list(games.filter(pk__gt=last_pk)[:batch_size]):
+        _game_stats_rebuild_batch(batch)
+        rebuilt += len(batch)
+        last_pk = batch[-1]
+
+    return rebuilt
+
+
+def _game_stats_rebuild_batch(game_ids):
+    comments = Comment.objects.filter(game_id__in=game_ids)
+
+    totals = {
+        row["game_id"]: row
+        for row in comments.order_by()
+        .values("game_id")
+        .annotate(
+            rating_sum=Sum("rating", default=0),
+            rating_count=Count("rating"),
+            comments_count=Count("id"),
+            last_activity=Max("modified"),
+        )
+    }
+    last_comments = {
+        row["game_id"]: row
+        for row in comments.order_by("game_id", "-created", "-id")
+        .distinct("game_id")
+        .values("game_id", "id", "text")
+    }
+
+    stats = []
+    for game_id in game_ids:
+        total = totals.get(game_id, {})
+        last = last_comments.get(game_id, {})
+        stats.append(
+            GameStats(
+                game_id=game_id,
+                rating_sum=total.get("rating_sum", 0),
+                rating_count=total.get("rating_count", 0),
+                comments_count=total.get("comments_count", 0),
+                last_comment_id=last.get("id"),
+                last_comment_text=last.get("text", ""),
+                last_activity=total.get("last_activity"),
+            ),
+        )
+
+    GameStats.objects.bulk_create(
+        stats,
+        update_conflicts=True,
+        unique_fields=["game"],
+        update_fields=STATS_FIELDS,
+    )
+
+
+def game_stats_comment_created(comment):
+    game_stats_comments_created([comment])
+
+
+def game_stats_comments_created(comments):
+    """Add new comments to their games' stats, one UPDATE per game."""
+    by_game = defaultdict(list)
+    for comment in comments:
+        by_game[comment.game_id].append(comment)
+
+    missing = []
+    for game_id, game_comments in by_game.items():
+        ratings = [c.rating for c in game_comments if c.rating is not None]
+        last = max(game_comments, key=lambda c: (c.created, c.pk))
+
+        updated = GameStats.objects.filter(game_id=game_id).update(
+            comments_count=F("comments_count") + len(game_comments),
+            rating_sum=F("rating_sum") + sum(ratings),
+            rating_count=F("rating_count") + len(ratings),
+            last_comment_id=last.pk,
+            last_comment_text=last.text,
+            last_activity=last.created,
+        )
+        if not updated:
+            missing.append(game_id)
+
+    # first comments of these games, nothing to increment yet
+    if missing:
+        game_stats_rebuild(missing)
+
+
+def game_stats_comment_changed(comment):
+    # rating or text may have changed, the previous values are not known here
+    game_stats_rebuild([comment.game_id])
+
+
+def game_stats_comment_deleted(comment):
+    has_rating = comment.rating is not None
+    stats = GameStats.objects.filter(game_id=comment.game_id)
+
+    # never create rows here, the game itself may be deleted in this transaction
+    stats.update(
+        comments_count=F("comments_count") - 1,
+        rating_sum=F("rating_sum") - (comment.rating or 0),
+        rating_count=F("rating_count") - int(has_rating),
+        last_activity=timezone.now(),
+    )
+
+    latest = Comment.objects.filter(game_id=OuterRef("game_id")).order_by(
+        "-created",
+        "-id",
+    )
+    stats.filter(last_comment_id=comment.pk).update(
+        last_comment_id=Subquery(latest.values("id")[:1]),
+        last_comment_text=Coalesce(Subquery(latest.values("text")[:1]), Value("")),
+    )
+
+
+def game_stats_reset_rating(games):
+    return GameStats.objects.filter(game__in=games).update(
+        rating_sum=0,
+        rating_count=0,
+        last_activity=timezone.now(),
+    )
+
+
+def game_stats_view_refresh():
+    """
+    Recompute the game_stats_mv materialized view. CONCURRENTLY keeps the
+    previous rows readable while it runs.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "REFRESH MATERIALIZED VIEW CONCURRENTLY "
+            + connection.ops.quote_name(GameStatsSnapshot._meta.db_table),  # noqa: SLF001
+        )
+
+
+def game_equipment_ids_update(games):
+    """Recompute Game.equipment_ids of the given games in one UPDATE."""
+    tag_ids = (
+        TaggedItem.objects.filter(
+            content_type=ContentType.objects.get_for_model(Game),
+            object_id=OuterRef("pk"),
+        )
+        .order_by("tag_id")
+        .values("tag_id")
+    )
+
+    return Game.objects.filter(pk__in=games).update(
+        equipment_ids=ArraySubquery(tag_ids),
+    )
+
+
+def game_search_vector_update(games):
+    """Recompute Game.search_vector of the given games in one UPDATE."""
+    category_title = Category.objects.filter(pk=OuterRef("category_id")).values(
+        "title",
+    )
+    equipment = (
+        TaggedItem.objects.filter(
+            content_type=ContentType.objects.get_for_model(Game),
+            object_id=OuterRef("pk"),
+        )
+        .order_by()
+        .values("object_id")
+        .annotate(names=StringAgg("tag__name", " "))
+        .values("names")
+    )
+
+    return Game.objects.filter(pk__in=games).update(
+        search_vector=(
+            SearchVector("title", weight="A", config=SEARCH_CONFIG)
+            # SearchVector coalesces NULL subqueries to ""
+            + SearchVector(Subquery(category_title), weight="B", config=SEARCH_CONFIG)
+            + SearchVector(Subquery(equipment), weight="B", config=SEARCH_CONFIG)
+            + SearchVector("description", weight="C", config=SEARCH_CONFIG)
+        ),
+    )
@@ -0,0 +1,53 @@
+from django.db.models.signals import m2m_changed
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from taggit.models import Tag
+
+from .cache import invalidate_facets_cache
+from .models import Category
+from .models import Game
+from .services import game_equipment_ids_update
+from .services import game_search_vector_update
+
+
+@receiver(post_save, sender=Game)
+def update_search_vector_on_game_save(sender, instance, **kwargs):
+    game_search_vector_update([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+def update_search_vector_on_category_save(sender, instance, **kwargs):
+    game_search_vector_update(Game.objects.filter(category=instance))
+
+
+@receiver(m2m_changed, sender=Game.equipment.through)
+def update_equipment_on_change(sender, instance, action, **kwargs):
+    if isinstance(instance, Game) and action in (
+        "post_add",
+        "post_remove",
+        "post_clear",
+    ):
+        game_equipment_ids_update([instance.pk])
+        game_search_vector_update([instance.pk])
+
+
+@receiver(post_delete, sender=Tag)
+def update_equipment_on_tag_delete(sender, instance, **kwargs):
+    # the tagged items are deleted by the cascade, without m2m_changed
+    games = list(
+        Game.objects.filter(equipment_ids__contains=[instance.pk]).values_list(
+            "pk", flat=True
+        ),
+    )
+    game_equipment_ids_update(games)
+    game_search_vector_update(games)
+
+
+@receiver(post_save, sender=Game)
+@receiver(post_delete, sender=Game)
+@receiver(post_save, sender=Category)
+@receiver(m2m_changed, sender=Game.equipment.through)
+@receiver(post_delete, sender=Tag)
+def invalidate_facets_cache_on_change(sender, **kwargs):
+    invalidate_facets_cache()
@@ -1 +1,714 @@
-from django.test import TestCase
+import json
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.paginator import EmptyPage
+from django.db import connection
+from django.http import HttpResponse
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from taggit.models import Tag
+
+from games_project.contrib.admin_toolkit import INLINE_PAGE_SIZE
+from games_project.contrib.admin_toolkit import EstimatedCountPaginator
+from games_project.contrib.middleware import AsyncWhiteNoiseMiddleware
+from games_project.feedback.models import Comment
+from games_project.games.management.commands.benchmark import compare_results
+from games_project.games.models import Category
+from games_project.games.models import Environment
+from games_project.games.models import Game
+from games_project.games.models import GameStats
+from games_project.games.models import GameWithStats
+from games_project.games.models import SimilarGame
+from games_project.games.selectors import games_anotated_with_materialized_stats
+from games_project.games.selectors import games_anotated_with_stats
+from games_project.games.selectors import games_search
+from games_project.games.services import game_stats_rebuild
+from games_project.games.services import game_stats_reset_rating
+from games_project.games.views import GameListView
+from games_project.users.tests.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+class TestGameStats:
+    def test_comment_create_updates_stats(self, game, user):
+        Comment.objects.create(game=game, author=user, text="first", rating=4)
+        Comment.objects.create(game=game, author=user, text="second", rating=8)
+        Comment.objects.create(game=game, author=user, text="no rating")
+
+        stats = GameStats.objects.get(game=game)
+        assert (stats.comments_count, stats.rating_sum, stats.rating_count) == (
+            3,
+            12,
+            2,
+        )
+        assert stats.last_comment_text == "no rating"
+
+    def test_comment_change_and_delete_updates_stats(self, game, user):
+        first = Comment.objects.create(game=game, author=user, text="first", rating=4)
+        last = Comment.objects.create(game=game, author=user, text="last", rating=8)
+
+        first.rating = 10
+        first.save()
+        last.delete()
+
+        stats = GameStats.objects.get(game=game)
+        assert (stats.comments_count, stats.rating_sum, stats.rating_count) == (
+            1,
+            10,
+            1,
+        )
+        assert stats.last_comment_id == first.pk
+
+    def test_reset_rating(self, game, user):
+        Comment.objects.create(game=game, author=user, text="first", rating=4)
+
+        game_stats_reset_rating([game])
+
+        stats = GameStats.objects.get(game=game)
+        assert stats.rating_count == 0
+        assert stats.comments_count == 1
+
+    def test_rebuild_matches_incremental_stats(self, game, user):
+        Comment.objects.create(game=game, author=user, text="first", rating=3)
+        expected = GameStats.objects.values().get(game=game)
+        GameStats.objects.all().delete()
+
+        assert game_stats_rebuild() == 1
+        assert GameStats.objects.values().get(game=game) == expected
+
+    def test_games_anotated_with_stats(self, game, user):
+        Comment.objects.create(game=game, author=user, text="first", rating=3)
+        Comment.objects.create(game=game, author=user, text="second", rating=4)
+
+        annotated = games_anotated_with_stats().get()
+        assert (annotated.avg_rating, annotated.comments_count) == (
+            pytest.approx(3.5),
+            2,
+        )
+        assert GameWithStats.objects.get().average_rating == "3.50"
+
+    def test_stats_changelist(self, admin_client, game, user):
+        Comment.objects.create(game=game, author=user, text="first", rating=3)
+
+        url = reverse("admin:games_gamewithstats_changelist")
+        response = admin_client.get(url, data={"o": "7"})
+        assert response.status_code == HTTPStatus.OK
+
+    def test_stats_changelist_window_filter(self, admin_client, game, user):
+        Comment.objects.create(game=game, author=user, text="new", rating=3)
+        old = Comment.objects.create(game=game, author=user, text="old", rating=3)
+        Comment.objects.filter(pk=old.pk).update(
+            created=timezone.now() - timezone.timedelta(days=2),
+        )
+        url = reverse("admin:games_gamewithstats_changelist")
+
+        def recent_comments(**data):
+            response = admin_client.get(url, data=data)
+            assert response.status_code == HTTPStatus.OK
+            return [
+                g.comments_count_last_day for g in response.context["cl"].result_list
+            ]
+
+        assert recent_comments() == [1]
+        assert recent_comments(window="7d", o="7") == [2]
+
+    def test_materialized_stats_changelist(
+        self, admin_client, settings, game, category, user
+    ):
+        Comment.objects.create(game=game, author=user, text="first", rating=3)
+        liked = Game.objects.create(title="Liked", slug="liked", category=category)
+        Comment.objects.create(game=liked, author=user, text="first", rating=5)
+        Comment.objects.create(game=liked, author=user, text="second")
+        settings.GAME_STATS_MATERIALIZED_VIEW = True
+        url = reverse("admin:games_gamewithstats_changelist")
+
+        def titles(**data):
+            response = admin_client.get(url, data=data)
+            return [game.title for game in response.context["cl"].result_list]
+
+        # a snapshot, new comments show up after a refresh
+        assert titles() == []
+        call_command("refresh_game_stats_view", stdout=None)
+
+        assert titles(o="-7") == ["Liked", "Freeze tag"]
+        assert titles(avg_rating="4+") == ["Liked"]
+        snapshot = games_anotated_with_materialized_stats().get(pk=liked.pk)
+        assert (snapshot.avg_rating, snapshot.comments_count) == (5, 2)
+
+    def test_stats_changelist_counts_recent_comments_per_page(
+        self, admin_client, category, user
+    ):
+        for i in range(3):
+            game = Game.objects.create(
+                title=f"Game {i}", slug=f"game-{i}", category=category
+            )
+            Comment.objects.create(game=game, author=user, text="new", rating=3)
+        old = Comment.objects.create(game=game, author=user, text="old", rating=3)
+        Comment.objects.filter(pk=old.pk).update(
+            created=timezone.now() - timezone.timedelta(days=2),
+        )
+        url = reverse("admin:games_gamewithstats_changelist")
+
+        with CaptureQueriesContext(connection) as queries:
+            response = admin_client.get(url)
+
+        games = response.context["cl"].result_list
+        assert [game.comments_count_last_day for game in games] == [1, 1, 1]
+        recent_counts = [q for q in queries if "feedback_comment" in q["sql"]]
+        assert len(recent_counts) == 1
+
+
+class TestAdminToolkit:
+    def test_game_changelist_autocomplete_filters(self, admin_client, game, user):
+        game.equipment.add("ball")
+        Comment.objects.create(game=game, author=user, text="first")
+        Comment.objects.create(game=game, author=user, text="second")
+        Game.objects.create(title="Tag", slug="tag", category=game.category)
+        url = reverse("admin:games_game_changelist")
+
+        def titles(**data):
+            response = admin_client.get(url, data=data)
+            assert response.status_code == HTTPStatus.OK
+            return [game.title for game in response.context["cl"].result_list]
+
+        assert titles(comments__author__pk=user.pk) == ["Freeze tag"]
+        assert titles(equipment__pk=Tag.objects.get().pk) == ["Freeze tag"]
+        assert titles() == ["Freeze tag", "Tag"]
+
+        for param in ["comments__author__pk", "equipment__pk"]:
+            for value in ["abc", "1.5", str(2**63)]:
+                response = admin_client.get(url, data={param: value})
+                assert response.status_code == HTTPStatus.FOUND
+                assert response.url.endswith("?e=1")
+
+        response = admin_client.get(
+            reverse("admin:autocomplete"),
+            data={
+                "app_label": "games",
+                "model_name": "game",
+                "field_name": "equipment",
+                "term": "ba",
+            },
+        )
+        assert [r["text"] for r in response.json()["results"]] == ["ball"]
+
+    def test_estimated_count_paginator(self, monkeypatch, category):
+        analyzed = 3
+        for i in range(analyzed):
+            Game.objects.create(title=f"Game {i}", slug=f"game-{i}", category=category)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE games_game")
+        Game.objects.create(title="Game 3", slug="game-3", category=category)
+        monkeypatch.setattr(EstimatedCountPaginator, "threshold", analyzed - 1)
+
+        # the statistics of ANALYZE, not the rows since
+        assert EstimatedCountPaginator(Game.objects.all(), 10).count == analyzed
+        monkeypatch.setattr(EstimatedCountPaginator, "threshold", 100)
+        assert EstimatedCountPaginator(Game.objects.all(), 10).count == analyzed + 1
+
+    def test_estimated_count_paginator_end(self, monkeypatch, category):
+        analyzed = 30
+        Game.objects.bulk_create(
+            Game(title=f"Game {i}", slug=f"game-{i}", category=category)
+            for i in range(analyzed)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE games_game")
+        Game.objects.filter(pk__in=Game.objects.order_by("-pk")[:10]).delete()
+        monkeypatch.setattr(EstimatedCountPaginator, "threshold", 1)
+        games = Game.objects.order_by("pk")
+        per_page = 2
+
+        # far from the end, the last pages of the estimate aren't linked
+        paginator = EstimatedCountPaginator(games, per_page)
+        paginator.page(1)
+        assert paginator.count == analyzed
+        assert paginator.get_elided_page_range(1) == [1, 2, 3, 4, paginator.ELLIPSIS]
+
+        # near it, the rows left are counted
+        paginator = EstimatedCountPaginator(games, per_page)
+        assert len(paginator.page(8)) == per_page
+        assert (paginator.count, paginator.num_pages) == (20, 10)
+        assert paginator.get_elided_page_range(8) == [*range(1, 11)]
+
+        paginator = EstimatedCountPaginator(games, per_page)
+        with pytest.raises(EmptyPage):
+            paginator.page(12)
+
+
+class TestCommentsInline:
+    def _create_comments(self, game, user, count):
+        Comment.objects.bulk_create(
+            [
+                Comment(game=game, author=user, text=f"comment {i}")
+                for i in range(count)
+            ],
+        )
+
+    def test_change_form_shows_one_page(self, admin_client, game, user):
+        url = reverse("admin:games_game_change", args=[game.pk])
+
+        def get(**data):
+            with CaptureQueriesContext(connection) as queries:
+                response = admin_client.get(url, data=data)
+            assert response.status_code == HTTPStatus.OK
+            return response.context["inline_admin_formsets"][0].formset, len(queries)
+
+        self._create_comments(game, user, INLINE_PAGE_SIZE + 5)
+        get()  # warms the content type and permission caches
+        formset, queries_count = get()
+        assert len(formset.forms) == INLINE_PAGE_SIZE
+        assert formset.paginator.count == INLINE_PAGE_SIZE + 5
+
+        formset, _ = get(comment_page=2)
+        assert [form.instance.text for form in formset.forms] == [
+            f"comment {i}" for i in range(INLINE_PAGE_SIZE, INLINE_PAGE_SIZE + 5)
+        ]
+
+        self._create_comments(game, user, INLINE_PAGE_SIZE * 5)
+        assert get()[1] == queries_count
+
+    def test_save_page(self, admin_client, game, user):
+        self._create_comments(game, user, INLINE_PAGE_SIZE + 1)
+        last = Comment.objects.get(text=f"comment {INLINE_PAGE_SIZE}")
+        url = reverse("admin:games_game_change", args=[game.pk])
+
+        response = admin_client.post(
+            f"{url}?comment_page=2",
+            data={
+                "title": game.title,
+                "slug": game.slug,
+                "category": game.category_id,
+                "environment": game.environment,
+                "min_players": game.min_players,
+                "max_players": game.max_players,
+                "min_duration": game.min_duration,
+                "max_duration": game.max_duration,
+                "is_active": "on",
+                "comments-TOTAL_FORMS": 1,
+                "comments-INITIAL_FORMS": 1,
+                "comments-0-id": last.pk,
+                "comments-0-game": game.pk,
+                "comments-0-author": user.pk,
+                "comments-0-text": "edited",
+            },
+        )
+
+        assert response.status_code == HTTPStatus.FOUND
+        last.refresh_from_db()
+        assert last.text == "edited"
+        assert Comment.objects.filter(game=game).count() == INLINE_PAGE_SIZE + 1
+
+
+class TestGameListView:
+    def _create_games(self, category, user, count):
+        for i in range(count):
+            game = Game.objects.create(
+                title=f"Game {i}", slug=f"game-{i}", category=category
+            )
+            game.equipment.add("ball", f"item {i}")
+            Comment.objects.create(game=game, author=user, text="first")
+
+    def _count_queries(self, client, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        assert response.status_code == HTTPStatus.OK
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_games(self, client, category, user):
+        url = reverse("games:list")
+
+        self._create_games(category, user, 2)
+        few_games_queries = self._count_queries(client, url)
+
+        Game.objects.all().delete()
+        self._create_games(category, user, GameListView.page_size * 2)
+        many_games_queries = self._count_queries(client, url)
+
+        assert many_games_queries == few_games_queries
+
+    def test_game_changelist_prefetches_equipment(self, admin_client, category):
+        url = reverse("admin:games_game_changelist")
+
+        def count_queries():
+            with CaptureQueriesContext(connection) as queries:
+                assert admin_client.get(url).status_code == HTTPStatus.OK
+            return len(queries)
+
+        game = Game.objects.create(title="Game", slug="game", category=category)
+        game.equipment.add("ball")
+        few_games_queries = count_queries()
+
+        for i in range(5):
+            game = Game.objects.create(
+                title=f"Game {i}", slug=f"game-{i}", category=category
+            )
+            game.equipment.add("ball", "rope")
+
+        assert count_queries() == few_games_queries
+
+    def test_keyset_pages(self, client, category, user):
+        self._create_games(category, user, GameListView.page_size + 1)
+        url = reverse("games:list")
+
+        first = client.get(url).context
+        second = client.get(url, data={"cursor": first["next_cursor"]}).context
+
+        assert len(first["games"]) == GameListView.page_size
+        assert [game.title for game in second["games"]] == ["Game 9"]
+        assert second["games"][0].comments_count == 1
+        assert "item 9" in second["games"][0].equipment_list()
+        assert second["next_cursor"] is None
+
+    def test_invalid_cursor(self, client, game):
+        response = client.get(reverse("games:list"), data={"cursor": "broken"})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    def test_asgi_read_paths(self, async_client, game, user):
+        # the ASGI handler runs the whole middleware stack in async mode
+        async_client.force_login(user)
+        urls = [
+            reverse("games:list"),
+            reverse("games:detail", kwargs={"slug": game.slug}),
+            reverse("games:comments", kwargs={"game_pk": game.pk}),
+        ]
+
+        async def get_all():
+            return [await async_client.get(url) for url in urls]
+
+        responses = async_to_sync(get_all)()
+
+        assert [r.status_code for r in responses] == [HTTPStatus.OK] * len(urls)
+        assert responses[0].context["games"] == [game]
+        assert responses[1].context["game"] == game
+        assert user.ips.exists()
+
+
+class TestGameSearch:
+    def test_search_ranks_title_matches_first(self, client, category):
+        Game.objects.create(
+            title="Hunt", slug="hunt", category=category, description="Find a ball."
+        )
+        ball = Game.objects.create(title="Ball tag", slug="ball-tag", category=category)
+
+        response = client.get(reverse("games:search"), data={"q": "ball"})
+
+        results = response.json()["results"]
+        assert results[0]["id"] == ball.pk
+        assert "<mark>ball</mark>" in results[1]["headline"].lower()
+
+    def test_search_pages_through_equal_ranks(self, client, category):
+        games = [
+            Game.objects.create(title=f"Ball {i}", slug=f"ball-{i}", category=category)
+            for i in range(7)
+        ]
+
+        ids, data = [], {"q": "ball", "limit": 3}
+        # at most a page per game, should the cursor not move on
+        for _ in games:
+            page = client.get(reverse("games:search"), data=data).json()
+            ids += [result["id"] for result in page["results"]]
+            if not page["next_cursor"]:
+                break
+            data["cursor"] = page["next_cursor"]
+
+        assert ids == [game.pk for game in games]
+
+    def test_search_vector_follows_equipment_and_category(self, game, category):
+        game.equipment.add("frisbee")
+        category.title = "Chasing"
+        category.save()
+
+        assert games_search("frisbee chasing").get() == game
+
+    def test_admin_search_uses_search_vector(self, admin_client, game):
+        url = reverse("admin:games_game_changelist")
+
+        response = admin_client.get(url, data={"q": "freeze"})
+        assert list(response.context["cl"].result_list) == [game]
+
+
+class TestGameFilter:
+    def _counts(self, facet):
+        return {row["value"]: row["count"] for row in facet}
+
+    def test_filter_and_facet_counts(self, client, game, category):
+        game.equipment.add("rope")
+        Game.objects.create(
+            title="Dodgeball",
+            slug="dodgeball",
+            category=category,
+            environment=Environment.INDOOR,
+            max_players=30,
+        )
+
+        response = client.get(reverse("games:filter"), data={"environment": "IN"})
+
+        data = response.json()
+        assert [result["title"] for result in data["results"]] == ["Dodgeball"]
+        facets = data["facets"]
+        # a facet is counted without its own selection
+        assert self._counts(facets["environment"])["OUT"] == 1
+        assert self._counts(facets["group_size"]) == {
+            "<10": 1,
+            "10-20": 1,
+            "21-50": 1,
+            "50+": 0,
+        }
+        assert self._counts(facets["category"]) == {"tag": 1}
+        assert facets["equipment"] == []
+
+    def test_facets_are_cached_until_games_change(
+        self, client, game, django_capture_on_commit_callbacks
+    ):
+        url = reverse("games:filter")
+        client.get(url)
+
+        with CaptureQueriesContext(connection) as queries:
+            client.get(url)
+        # only the games page, facets come from the cache
+        selects = [q for q in queries if q["sql"].startswith("SELECT")]
+        assert len(selects) == 1
+
+        with django_capture_on_commit_callbacks(execute=True):
+            game.equipment.add("rope")
+
+        facets = client.get(url).json()["facets"]
+        assert self._counts(facets["equipment"]) == {"rope": 1}
+
+    def test_equipment_filters(self, client, game, category):
+        game.equipment.add("ball", "string")
+        ball = Game.objects.create(
+            title="Dodgeball", slug="dodgeball", category=category
+        )
+        ball.equipment.add("ball")
+        Game.objects.create(title="Tag", slug="tag", category=category)
+        url = reverse("games:filter")
+
+        def titles(**data):
+            return [
+                result["title"] for result in client.get(url, data).json()["results"]
+            ]
+
+        assert titles(equipment=["string", "cones"]) == ["Freeze tag"]
+        assert titles(available_equipment=["ball"]) == ["Dodgeball", "Tag"]
+        assert titles(available_equipment=["ball", "string"]) == [
+            "Dodgeball",
+            "Freeze tag",
+            "Tag",
+        ]
+
+    def test_equipment_ids_follow_tags(self, game):
+        game.equipment.add("ball", "string")
+        ball, string = Tag.objects.order_by("name")
+
+        game.refresh_from_db()
+        assert game.equipment_ids == [ball.pk, string.pk]
+
+        game.equipment.remove("ball")
+        game.refresh_from_db()
+        assert game.equipment_ids == [string.pk]
+
+        string.delete()
+        game.refresh_from_db()
+        assert game.equipment_ids == []
+
+    def test_invalid_facet_value(self, client):
+        response = client.get(reverse("games:filter"), data={"group_size": "huge"})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+class TestSimilarGames:
+    def test_rebuild_from_ratings_and_equipment(self, client, game, category):
+        liked = Game.objects.create(title="Tag", slug="tag", category=category)
+        disliked = Game.objects.create(title="Quiz", slug="quiz", category=category)
+        other = Category.objects.create(title="Ball games", slug="ball-games")
+        ball = Game.objects.create(title="Dodgeball", slug="dodgeball", category=other)
+        hidden = Game.objects.create(
+            title="Hidden", slug="hidden", category=other, is_active=False
+        )
+        game.equipment.add("ball")
+        ball.equipment.add("ball")
+        hidden.equipment.add("ball")
+        for _ in range(3):
+            author = UserFactory()
+            for rated, rating in [(game, 5), (liked, 5), (disliked, 1)]:
+                Comment.objects.create(
+                    game=rated, author=author, text="rated", rating=rating
+                )
+
+        call_command("rebuild_similar_games", stdout=None)
+
+        def similar(of):
+            return list(
+                SimilarGame.objects.filter(game=of)
+                .order_by("rank")
+                .values_list("similar__slug", flat=True),
+            )
+
+        assert similar(game)[0] == "tag"
+        assert similar(liked).index("freeze-tag") < similar(liked).index("quiz")
+        assert similar(ball) == ["freeze-tag"]
+        assert not SimilarGame.objects.filter(game=hidden).exists()
+        assert not SimilarGame.objects.filter(similar=hidden).exists()
+
+        response = client.get(reverse("games:detail", kwargs={"slug": ball.slug}))
+        assert response.context["similar_games"] == [game]
+
+    def test_deleted_authors_not_one_rater(self):
+        games = []
+        for title in ["Tag", "Quiz", "Relay"]:
+            category = Category.objects.create(title=title, slug=title.lower())
+            games.append(
+                Game.objects.create(title=title, slug=title.lower(), category=category)
+            )
+        for rated, rating in zip(games, [5, 5, 1], strict=True):
+            author = UserFactory()
+            Comment.objects.create(
+                game=rated, author=author, text="rated", rating=rating
+            )
+            # keeps the comment without an author
+            author.delete()
+
+        call_command("rebuild_similar_games", stdout=None)
+
+        assert not SimilarGame.objects.exists()
+
+
+class TestAttachments:
+    def test_download_streamed_without_nginx(self, client, game):
+        game.attachments.save("rules.pdf", ContentFile(b"%PDF rules"))
+        url = reverse("games:attachment", kwargs={"game_pk": game.pk})
+
+        response = client.get(url)
+        assert response.status_code == HTTPStatus.OK
+        assert b"".join(response.streaming_content) == b"%PDF rules"
+        assert response["Content-Type"] == "application/pdf"
+        assert response["Content-Disposition"] == 'attachment; filename="rules.pdf"'
+        assert "X-Accel-Redirect" not in response
+
+        response = client.get(url, headers={"if-none-match": response["ETag"]})
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+    def test_download_handed_off_to_nginx(self, client, settings, game, user):
+        settings.MEDIA_ACCEL_REDIRECT_URL = "/protected-media/"
+        comment = Comment.objects.create(game=game, author=user, text="photo")
+        comment.attachment.save("setup photo.jpg", ContentFile(b"jpeg"))
+
+        response = client.get(comment.get_attachment_url())
+        assert response.status_code == HTTPStatus.OK
+        assert response["X-Accel-Redirect"] == (
+            f"/protected-media/{comment.attachment.name.replace(' ', '%20')}"
+        )
+        assert response["Content-Type"] == "image/jpeg"
+        assert response.content == b""
+        assert comment.to_dict()["attachment_url"] == comment.get_attachment_url()
+
+    def test_download_access(self, client, admin_client, game, category, user):
+        game.attachments.save("rules.pdf", ContentFile(b"%PDF rules"))
+        other = Game.objects.create(title="Tag", slug="tag", category=category)
+        comment = Comment.objects.create(game=game, author=user, text="photo")
+        comment.attachment.save("photo.jpg", ContentFile(b"jpeg"))
+        game_url = game.get_attachments_url()
+
+        # the comment exists under another game only
+        response = client.get(
+            reverse(
+                "games:comment_attachment",
+                kwargs={"game_pk": other.pk, "comment_pk": comment.pk},
+            ),
+        )
+        assert response.status_code == HTTPStatus.NOT_FOUND
+        assert (
+            client.get(
+                reverse("games:attachment", kwargs={"game_pk": other.pk}),
+            ).status_code
+            == HTTPStatus.NOT_FOUND
+        )
+        assert client.post(game_url).status_code == HTTPStatus.METHOD_NOT_ALLOWED
+
+        Game.objects.filter(pk=game.pk).update(is_active=False)
+        assert client.get(game_url).status_code == HTTPStatus.NOT_FOUND
+        assert (
+            client.get(
+                comment.get_attachment_url(),
+            ).status_code
+            == HTTPStatus.NOT_FOUND
+        )
+        response = admin_client.get(game_url)
+        assert response.status_code == HTTPStatus.OK
+        response.close()
+
+
+class TestGenerateFakeData:
+    def test_bulk_users(self):
+        out = StringIO()
+        call_command(
+            "generate_fake_data", "users", "--bulk", "--count", "3", stdout=out
+        )
+        assert "Created 3 users." in out.getvalue()
+
+    def test_max_replies_at_least_one(self):
+        with pytest.raises(CommandError, match="must be at least 1"):
+            call_command(
+                "generate_fake_data", "replies", "--bulk", "--max-replies", "0"
+            )
+
+
+class TestBenchmark:
+    def test_baseline_and_compare(self, tmp_path, game, user):
+        Comment.objects.create(game=game, author=user, text="first", rating=4)
+        baseline = tmp_path / "baseline.json"
+
+        call_command("benchmark", "--no-seed", "--repeat=1", f"--output={baseline}")
+
+        paths = json.loads(baseline.read_text())["paths"]
+        assert paths["comments_json"]["queries"] > 0
+        assert not Comment.objects.filter(text="Benchmark reply").exists()
+
+        for result in paths.values():
+            result["queries"] = 0
+        baseline.write_text(json.dumps({"scale": "1k", "paths": paths}))
+        with pytest.raises(CommandError, match="Regressions found"):
+            call_command(
+                "benchmark", "--no-seed", "--repeat=1", f"--compare={baseline}"
+            )
+
+    def test_compare_results_threshold(self):
+        baseline = {"list": {"queries": 2, "median_ms": 10.0, "memory_kb": 100}}
+
+        assert not compare_results(
+            baseline,
+            {"list": {"queries": 2, "median_ms": 12.0, "memory_kb": 120}},
+            0.25,
+        )
+        assert compare_results(
+            baseline,
+            {"list": {"queries": 3, "median_ms": 13.0, "memory_kb": 100}},
+            0.25,
+        ) == ["list: 3 queries, baseline 2", "list: median_ms 13.0, baseline 10.0"]
+
+
+class TestAsyncWhiteNoiseMiddleware:
+    def test_autorefresh_lookup(self, rf, settings):
+        settings.WHITENOISE_AUTOREFRESH = True
+        settings.WHITENOISE_USE_FINDERS = True
+
+        async def get_response(request):
+            return HttpResponse(status=HTTPStatus.NOT_FOUND)
+
+        middleware = async_to_sync(AsyncWhiteNoiseMiddleware(get_response))
+
+        response = middleware(rf.get("/static/js/project.js"))
+        assert response.status_code == HTTPStatus.OK
+        response.close()
+        response = middleware(rf.get("/static/js/missing.js"))
+        assert response.status_code == HTTPStatus.NOT_FOUND
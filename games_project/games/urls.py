@@ -2,14 +2,51 @@ from django.urls import path
 
 from .views import GameDetailsView
 from .views import GameListView
+from .views import comment_attachment_view
 from .views import comments_json_view
+from .views import comments_stream_view
+from .views import filter_json_view
+from .views import game_attachment_view
+from .views import replies_json_view
+from .views import reply_async_view
 from .views import reply_view
+from .views import search_json_view
+from .views import vote_view
 
 app_name = "games"
 
 urlpatterns = [
     path("", view=GameListView.as_view(), name="list"),
+    # before the detail slug, which would match these too
+    path("search/", view=search_json_view, name="search"),
+    path("filter/", view=filter_json_view, name="filter"),
     path("<slug:slug>/", view=GameDetailsView.as_view(), name="detail"),
+    path(
+        "<int:game_pk>/attachment/",
+        view=game_attachment_view,
+        name="attachment",
+    ),
     path("<int:game_pk>/comments/", view=comments_json_view, name="comments"),
+    path(
+        "<int:game_pk>/comments/stream/",
+        view=comments_stream_view,
+        name="comments_stream",
+    ),
+    path(
+        "<int:game_pk>/comments/<int:comment_pk>/replies/",
+        view=replies_json_view,
+        name="replies",
+    ),
+    path(
+        "<int:game_pk>/comments/<int:comment_pk>/vote/",
+        view=vote_view,
+        name="vote",
+    ),
+    path(
+        "<int:game_pk>/comments/<int:comment_pk>/attachment/",
+        view=comment_attachment_view,
+        name="comment_attachment",
+    ),
     path("<int:game_pk>/reply/", view=reply_view, name="reply"),
+    path("<int:game_pk>/reply/async/", view=reply_async_view, name="reply_async"),
 ]
@@ -1,34 +1,370 @@
+import asyncio
+import datetime
+import hashlib
 import json
+import time
 
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.exceptions import BadRequest
 from django.core.exceptions import ValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models.functions import Coalesce
+from django.http import Http404
+from django.http import HttpResponse
 from django.http import JsonResponse
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.cache import patch_cache_control
+from django.utils.decorators import method_decorator
+from django.utils.http import http_date
 from django.views.decorators.http import require_http_methods
+from django.views.decorators.http import require_safe
 from django.views.generic import DetailView
 from django.views.generic import ListView
 
+from games_project.contrib.downloads import file_download_response
+from games_project.feedback.events import comments_broker
+from games_project.feedback.events import comments_channel
+from games_project.feedback.models import COMMENTS_ORDERINGS
 from games_project.feedback.models import Comment
+from games_project.feedback.queues import comment_write_queue
+from games_project.feedback.services import comment_allocate_id
+from games_project.feedback.services import comment_vote
+from games_project.feedback.services import comment_vote_counts
+from games_project.instrumentation.metrics import record_cache_lookup
 
+from .cache import COMMENTS_CACHE_TIMEOUT
+from .cache import FACETS_CACHE_TIMEOUT
+from .cache import acomments_cache_version
+from .cache import comments_cache_key
+from .cache import facets_cache_key
+from .cache import facets_cache_version
 from .decorators import ajax_login_required
 from .forms import CommentForm
+from .forms import CommentVoteForm
+from .forms import GameFilterForm
 from .models import Game
+from .pagination import PAGE_SIZE
+from .pagination import InvalidCursorError
+from .pagination import apaginate_keyset
+from .pagination import page_limit
+from .pagination import paginate_keyset
+from .selectors import games_facets
+from .selectors import games_filter
+from .selectors import games_search
+from .selectors import games_search_highlight
+from .selectors import games_similar
 
+# Game.Meta.ordering plus id to make the keyset unique
+GAMES_ORDERING = ["title", "id"]
+SEARCH_ORDERING = ["-rank", "id"]
+# comment stream: client reconnect delay, keepalive and replay after a reconnect
+STREAM_RETRY_MS = 3000
+STREAM_KEEPALIVE = 15
+STREAM_REPLAY_LIMIT = 100
+# the replay starts this long before the last event the client got: comments
+# are created before they commit, those of a write batch commit together
+STREAM_REPLAY_OVERLAP = datetime.timedelta(seconds=10)
 
+
+@method_decorator(transaction.non_atomic_requests, name="dispatch")
 class GameListView(ListView):
     model = Game
     context_object_name = "games"
     template_name = "games/list.html"
+    page_size = PAGE_SIZE
+
+    def get_queryset(self):
+        # stored counter instead of a COUNT query per listed game
+        return (
+            super()
+            .get_queryset()
+            .annotate(comments_count=Coalesce("stats__comments_count", 0))
+            .with_equipment()
+        )
 
+    async def get(self, request, *args, **kwargs):
+        try:
+            self.object_list, next_cursor = await apaginate_keyset(
+                self.get_queryset(),
+                GAMES_ORDERING,
+                request.GET.get("cursor"),
+                self.page_size,
+            )
+        except InvalidCursorError as e:
+            raise BadRequest(e) from e
 
+        # the template is rendered in a thread, the page is already loaded
+        context = self.get_context_data(next_cursor=next_cursor)
+        return self.render_to_response(context)
+
+
+@method_decorator(transaction.non_atomic_requests, name="dispatch")
 class GameDetailsView(DetailView):
     model = Game
     template_name = "games/detail.html"
     context_object_name = "game"
 
+    def get_queryset(self):
+        return super().get_queryset().with_equipment()
+
+    async def get(self, request, *args, **kwargs):
+        slug = self.kwargs[self.slug_url_kwarg]
+        try:
+            self.object = await self.get_queryset().aget(slug=slug)
+        except Game.DoesNotExist as e:
+            msg = "No game found matching the query."
+            raise Http404(msg) from e
+
+        similar_games = [game async for game in games_similar(self.object.pk)]
+        context = self.get_context_data(
+            object=self.object,
+            similar_games=similar_games,
+        )
+        return self.render_to_response(context)
+
+
+def _invalid_cursor_response():
+    return JsonResponse(
+        {"success": False, "errors": {"cursor": ["Invalid cursor."]}}, status=400
+    )
+
+
+def search_json_view(request):
+    text = request.GET.get("q", "").strip()
+    if not text:
+        return JsonResponse({"results": [], "next_cursor": None})
+
+    try:
+        games, next_cursor = paginate_keyset(
+            games_search(text),
+            SEARCH_ORDERING,
+            request.GET.get("cursor"),
+            page_limit(request),
+        )
+    except InvalidCursorError:
+        return _invalid_cursor_response()
+
+    results = [
+        {
+            "id": game.id,
+            "title": game.title,
+            "url": reverse("games:detail", kwargs={"slug": game.slug}),
+            "category": game.category.title if game.category else None,
+            "rank": game.rank,
+            "headline": games_search_highlight(game.headline),
+        }
+        for game in games
+    ]
+
+    return JsonResponse({"results": results, "next_cursor": next_cursor})
+
+
+def _cached_games_facets(filters):
+    key = facets_cache_key(facets_cache_version(), filters)
+
+    facets = cache.get(key)
+    record_cache_lookup(hit=facets is not None)
+    if facets is None:
+        facets = games_facets(filters)
+        cache.set(key, facets, FACETS_CACHE_TIMEOUT)
+
+    return facets
+
+
+def filter_json_view(request):
+    form = GameFilterForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({"success": False, "errors": form.errors}, status=400)
+    filters = form.cleaned_data
+
+    try:
+        games, next_cursor = paginate_keyset(
+            games_filter(filters),
+            GAMES_ORDERING,
+            request.GET.get("cursor"),
+            page_limit(request),
+        )
+    except InvalidCursorError:
+        return _invalid_cursor_response()
+
+    results = [
+        {
+            "id": game.id,
+            "title": game.title,
+            "url": reverse("games:detail", kwargs={"slug": game.slug}),
+            "category": game.category.title if game.category else None,
+            "environment": game.environment,
+            "min_players": game.min_players,
+            "max_players": game.max_players,
+            "min_duration": game.min_duration,
+            "max_duration": game.max_duration,
+        }
+        for game in games
+    ]
+
+    return JsonResponse(
+        {
+            "results": results,
+            "next_cursor": next_cursor,
+            "facets": _cached_games_facets(filters),
+        },
+    )
+
+
+async def _cached_comments_response(request, game_pk, build_data, *params):
+    """
+    Serve comment JSON from the cache, versioned by the game's last comment
+    write, with a strong ETag and Last-Modified for cheap 304 revalidation.
+    `build_data` is awaited on a cache miss.
+    """
+    version = await acomments_cache_version(game_pk)
+    key = comments_cache_key(game_pk, version, *params)
+
+    cached = await cache.aget(key)
+    record_cache_lookup(hit=cached is not None)
+    if cached is None:
+        try:
+            data = await build_data()
+        except InvalidCursorError:
+            return _invalid_cursor_response()
+
+        body = json.dumps(data, cls=DjangoJSONEncoder).encode()
+        digest = hashlib.sha256(body).hexdigest()
+        cached = (body, digest)
+        await cache.aset(key, cached, COMMENTS_CACHE_TIMEOUT)
+
+    body, digest = cached
+    etag = f'"{digest}"'
+    last_modified = version // 1_000_000_000
+
+    response = HttpResponse(body, content_type="application/json")
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    # always revalidate, the ETag makes that a cheap 304
+    patch_cache_control(response, no_cache=True)
+
+    return get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=last_modified,
+        response=response,
+    )
+
+
+@transaction.non_atomic_requests
+async def comments_json_view(request, game_pk):
+    """Top-level comments, `sort`ed by "new" (default), "top" or "hot"."""
+    cursor = request.GET.get("cursor")
+    limit = page_limit(request)
+    sort = request.GET.get("sort", "new")
+    if sort not in COMMENTS_ORDERINGS:
+        return JsonResponse(
+            {"success": False, "errors": {"sort": ["Invalid sort."]}}, status=400
+        )
+
+    return await _cached_comments_response(
+        request,
+        game_pk,
+        lambda: Comment.aget_page_for_game(
+            game_pk, cursor=cursor, limit=limit, sort=sort
+        ),
+        "comments",
+        sort,
+        cursor,
+        limit,
+    )
+
+
+@transaction.non_atomic_requests
+async def replies_json_view(request, game_pk, comment_pk):
+    cursor = request.GET.get("cursor")
+    limit = page_limit(request)
+
+    return await _cached_comments_response(
+        request,
+        game_pk,
+        lambda: Comment.aget_replies_page(
+            game_pk, comment_pk, cursor=cursor, limit=limit
+        ),
+        "replies",
+        comment_pk,
+        cursor,
+        limit,
+    )
+
 
-def comments_json_view(request, game_pk):
-    data = Comment.get_all_for_game(game_pk)
+def _sse_message(message):
+    data = json.loads(message)
+    # the time it is sent, comment ids commit out of order, see
+    # _comment_events
+    return f"event: {data['event']}\nid: {time.time_ns() // 1000}\ndata: {message}\n\n"
 
-    return JsonResponse(data, safe=False)
+
+def _replay_since(last_event_id):
+    """Creation time the replay starts at, None without a valid event id."""
+    if not last_event_id or not last_event_id.isdigit():
+        return None
+    try:
+        sent = datetime.datetime.fromtimestamp(
+            int(last_event_id) / 1_000_000,
+            tz=datetime.UTC,
+        )
+    except (OverflowError, OSError, ValueError):
+        return None
+    return sent - STREAM_REPLAY_OVERLAP
+
+
+async def _comment_events(game_pk, last_event_id):
+    async with comments_broker().subscribe(comments_channel(game_pk)) as queue:
+        yield f"retry: {STREAM_RETRY_MS}\n\n"
+
+        # comments written while the client was reconnecting, by creation
+        # time: a lower id can commit after a higher one was sent. The ones
+        # of the overlap the client has are updated in place by it
+        if (since := _replay_since(last_event_id)) is not None:
+            missed = (
+                Comment.objects.filter(game_id=game_pk, created__gte=since)
+                .select_related("author")
+                .order_by("created", "id")[:STREAM_REPLAY_LIMIT]
+            )
+            async for comment in missed:
+                yield _sse_message(
+                    json.dumps({"event": "comment", "comment": comment.to_dict()}),
+                )
+
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), STREAM_KEEPALIVE)
+            except TimeoutError:
+                yield ": keepalive\n\n"
+            else:
+                yield _sse_message(message)
+
+
+@require_http_methods(["GET"])
+@transaction.non_atomic_requests
+async def comments_stream_view(request, game_pk):
+    """
+    Server-sent events of the game's new, changed and deleted comments. Only
+    served by the ASGI application (config.asgi), a WSGI worker would be
+    held by every open page.
+    """
+    if not isinstance(request, ASGIRequest):
+        # 204 tells EventSource not to reconnect
+        return HttpResponse(status=204)
+
+    return StreamingHttpResponse(
+        _comment_events(game_pk, request.headers.get("Last-Event-ID")),
+        content_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @ajax_login_required
@@ -36,7 +372,7 @@ def comments_json_view(request, game_pk):
 def reply_view(request, game_pk):
     try:
         data = json.loads(request.body)
-        form = CommentForm(data)
+        form = CommentForm(data, game_pk=game_pk)
 
         if form.is_valid():
             comment = form.save(commit=False)
@@ -52,3 +388,89 @@ def reply_view(request, game_pk):
         return JsonResponse(
             {"success": False, "errors": {"general": str(e)}}, status=400
         )
+
+
+@ajax_login_required
+@require_http_methods(["POST"])
+@transaction.non_atomic_requests
+async def reply_async_view(request, game_pk):
+    """
+    Validate a comment and queue it for a batched insert, answering with its
+    id before it is saved. Only the parent is read, once.
+    """
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError as e:
+        return JsonResponse(
+            {"success": False, "errors": {"general": str(e)}}, status=400
+        )
+
+    form = CommentForm(data, game_pk=game_pk)
+    if not await sync_to_async(form.is_valid)():
+        return JsonResponse({"success": False, "errors": form.errors}, status=400)
+    if not await Game.objects.filter(pk=game_pk).aexists():
+        return JsonResponse(
+            {"success": False, "errors": {"general": "Game does not exist."}},
+            status=404,
+        )
+
+    comment = form.instance
+    comment.game_id = game_pk
+    comment.author = await request.auser()
+    comment.parent = form.cleaned_data.get("parent")
+    comment.id = await sync_to_async(comment_allocate_id)()
+    # replaced by the insert time, a moment later
+    comment.created = comment.modified = timezone.now()
+
+    await sync_to_async(comment_write_queue().add)(comment)
+
+    return JsonResponse({"success": True, "comment": comment.to_dict()}, status=202)
+
+
+@ajax_login_required
+@require_http_methods(["POST"])
+def vote_view(request, game_pk, comment_pk):
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError as e:
+        return JsonResponse(
+            {"success": False, "errors": {"general": str(e)}}, status=400
+        )
+
+    form = CommentVoteForm(data)
+    if not form.is_valid():
+        return JsonResponse({"success": False, "errors": form.errors}, status=400)
+    if not Comment.objects.filter(pk=comment_pk, game_id=game_pk).exists():
+        return JsonResponse(
+            {"success": False, "errors": {"general": "Comment does not exist."}},
+            status=404,
+        )
+
+    value = form.cleaned_data["value"]
+    comment_vote(comment_id=comment_pk, user=request.user, value=value)
+    upvotes, downvotes = comment_vote_counts(comment_pk)
+
+    return JsonResponse(
+        {"success": True, "vote": value, "upvotes": upvotes, "downvotes": downvotes},
+    )
+
+
+@require_safe
+def game_attachment_view(request, game_pk):
+    game = get_object_or_404(Game, pk=game_pk)
+    # soft deleted games stay downloadable in the admin
+    if not (game.is_active or request.user.has_perm("games.view_game")):
+        raise Http404
+    return file_download_response(request, game.attachments)
+
+
+@require_safe
+def comment_attachment_view(request, game_pk, comment_pk):
+    comment = get_object_or_404(
+        Comment.objects.select_related("game"),
+        pk=comment_pk,
+        game_id=game_pk,
+    )
+    if not (comment.game.is_active or request.user.has_perm("feedback.view_comment")):
+        raise Http404
+    return file_download_response(request, comment.attachment)
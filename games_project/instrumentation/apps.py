@@ -0,0 +1,6 @@
+from django.apps import AppConfig
+
+
+class InstrumentationConfig(AppConfig):
+    name = "games_project.instrumentation"
+    verbose_name = "Instrumentation"
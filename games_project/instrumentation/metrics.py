@@ -0,0 +1,107 @@
+import re
+import threading
+import time
+from collections import Counter
+from collections import defaultdict
+from collections import deque
+from contextvars import ContextVar
+
+_NUMBERS = re.compile(r"\b\d+\b")
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_IN_LISTS = re.compile(r"\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)")
+
+# metrics of the request being measured, None outside of sampled requests
+request_metrics = ContextVar("request_metrics", default=None)
+
+
+def fingerprint(sql):
+    """SQL with literals and IN lists collapsed, equal for N+1 repetitions."""
+    sql = _STRINGS.sub("?", sql)
+    sql = _NUMBERS.sub("?", sql)
+    return _IN_LISTS.sub("(...)", sql)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.fingerprints = Counter()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.view_started = None
+        self.view_time = 0.0
+
+    def execute(self, execute, sql, params, many, context):
+        """connection.execute_wrapper() counting and timing every query."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def view_finished(self):
+        if self.view_started is not None:
+            self.view_time = time.perf_counter() - self.view_started
+            self.view_started = None
+
+    def duplicates(self, threshold):
+        """Queries repeated at least `threshold` times, likely N+1 loops."""
+        return {
+            sql: count
+            for sql, count in self.fingerprints.most_common()
+            if count >= threshold
+        }
+
+
+def record_cache_lookup(*, hit):
+    """Count a cache hit or miss of the request being measured, if any."""
+    metrics = request_metrics.get()
+    if metrics is None:
+        return
+    if hit:
+        metrics.cache_hits += 1
+    else:
+        metrics.cache_misses += 1
+
+
+class SlowEndpoints:
+    """
+    Rolling window of the last requests, summarized per endpoint. Every
+    worker process keeps its own window.
+    """
+
+    def __init__(self, size):
+        self.samples = deque(maxlen=size)
+        self.lock = threading.Lock()
+
+    def add(self, endpoint, duration, queries):
+        with self.lock:
+            self.samples.append((endpoint, duration, queries))
+
+    def top(self, count):
+        with self.lock:
+            samples = list(self.samples)
+
+        endpoints = defaultdict(list)
+        for endpoint, duration, queries in samples:
+            endpoints[endpoint].append((duration, queries))
+
+        summary = []
+        for endpoint, requests in endpoints.items():
+            durations = sorted(duration for duration, _ in requests)
+            summary.append(
+                {
+                    "endpoint": endpoint,
+                    "requests": len(requests),
+                    "avg_ms": sum(durations) / len(durations) * 1000,
+                    "p95_ms": durations[int(len(durations) * 0.95)] * 1000,
+                    "max_ms": durations[-1] * 1000,
+                    "avg_queries": sum(queries for _, queries in requests)
+                    / len(requests),
+                },
+            )
+
+        summary.sort(key=lambda row: row["p95_ms"], reverse=True)
+        return summary[:count]
@@ -0,0 +1,162 @@
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+from contextlib import asynccontextmanager
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction
+from asgiref.sync import markcoroutinefunction
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .metrics import RequestMetrics
+from .metrics import SlowEndpoints
+from .metrics import request_metrics
+
+logger = logging.getLogger(__name__)
+
+slow_endpoints = SlowEndpoints(settings.INSTRUMENTATION_WINDOW)
+
+
+def _wrap_connections(stack, metrics):
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(metrics.execute))
+
+
+class InstrumentationMiddleware:
+    """
+    Opt-in (INSTRUMENTATION_ENABLED) per-request query count, DB time,
+    duplicate queries, cache lookups and view time of a sample of requests,
+    sent as a Server-Timing header and a JSON log line. Keep it last in
+    MIDDLEWARE so the view time covers the view only.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.INSTRUMENTATION_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+            # the handler runs sync hooks of async middleware in a thread
+            self.process_view = self._aprocess_view
+            self.process_template_response = self._aprocess_template_response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if random.random() >= settings.INSTRUMENTATION_SAMPLE_RATE:
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        with self._measure() as metrics:
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        self._report(request, response, metrics, duration)
+        return response
+
+    async def __acall__(self, request):
+        if random.random() >= settings.INSTRUMENTATION_SAMPLE_RATE:
+            return await self.get_response(request)
+
+        started = time.perf_counter()
+        async with self._ameasure() as metrics:
+            response = await self.get_response(request)
+        duration = time.perf_counter() - started
+
+        self._report(request, response, metrics, duration)
+        return response
+
+    @contextmanager
+    def _measure(self):
+        metrics = RequestMetrics()
+        token = request_metrics.set(metrics)
+        try:
+            with ExitStack() as stack:
+                _wrap_connections(stack, metrics)
+                yield metrics
+        finally:
+            request_metrics.reset(token)
+
+    @asynccontextmanager
+    async def _ameasure(self):
+        metrics = RequestMetrics()
+        token = request_metrics.set(metrics)
+        stack = ExitStack()
+        # connections belong to a thread, the ORM of async views runs in the
+        # request's sync_to_async thread
+        await sync_to_async(_wrap_connections)(stack, metrics)
+        try:
+            yield metrics
+        finally:
+            await sync_to_async(stack.close)()
+            request_metrics.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        self._view_started()
+
+    async def _aprocess_view(self, request, view_func, view_args, view_kwargs):
+        self._view_started()
+
+    def process_template_response(self, request, response):
+        # template responses are rendered after the view returned
+        response.add_post_render_callback(self._view_finished)
+        return response
+
+    async def _aprocess_template_response(self, request, response):
+        response.add_post_render_callback(self._view_finished)
+        return response
+
+    def _view_started(self):
+        if metrics := request_metrics.get():
+            metrics.view_started = time.perf_counter()
+
+    def _view_finished(self, response):
+        if metrics := request_metrics.get():
+            metrics.view_finished()
+
+    def _report(self, request, response, metrics, duration):
+        # other responses come straight from the view, this middleware is last
+        metrics.view_finished()
+        view_time = metrics.view_time
+        match = request.resolver_match
+        endpoint = f"{request.method} {match.route if match else request.path}"
+        duplicates = metrics.duplicates(settings.INSTRUMENTATION_DUPLICATE_QUERIES)
+
+        response["Server-Timing"] = ", ".join(
+            [
+                f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.queries} queries"',
+                f"view;dur={view_time * 1000:.1f}",
+                f'cache;desc="{metrics.cache_hits} hits, '
+                f'{metrics.cache_misses} misses"',
+                f"total;dur={duration * 1000:.1f}",
+            ],
+        )
+
+        slow_endpoints.add(endpoint, duration, metrics.queries)
+
+        slow = duration * 1000 >= settings.INSTRUMENTATION_SLOW_REQUEST_MS
+        logger.log(
+            logging.WARNING if slow or duplicates else logging.INFO,
+            json.dumps(
+                {
+                    "endpoint": endpoint,
+                    "path": request.path,
+                    "status": response.status_code,
+                    "duration_ms": round(duration * 1000, 1),
+                    "view_ms": round(view_time * 1000, 1),
+                    "queries": metrics.queries,
+                    "db_ms": round(metrics.db_time * 1000, 1),
+                    "duplicate_queries": duplicates,
+                    "cache_hits": metrics.cache_hits,
+                    "cache_misses": metrics.cache_misses,
+                },
+            ),
+        )
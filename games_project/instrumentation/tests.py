@@ -0,0 +1,99 @@
+import json
+import logging
+from http import HTTPStatus
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.http import HttpResponse
+from django.urls import reverse
+
+from games_project.feedback.models import Comment
+from games_project.games.models import Game
+from games_project.instrumentation.metrics import SlowEndpoints
+from games_project.instrumentation.metrics import fingerprint
+from games_project.instrumentation.middleware import InstrumentationMiddleware
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def instrumentation(settings):
+    settings.INSTRUMENTATION_ENABLED = True
+    settings.INSTRUMENTATION_SAMPLE_RATE = 1
+    settings.INSTRUMENTATION_DUPLICATE_QUERIES = 2
+
+
+def test_fingerprint_collapses_literals():
+    assert fingerprint("SELECT * FROM t WHERE id = 1 AND name = 'a'") == (
+        fingerprint("SELECT * FROM t WHERE id = 22 AND name = 'b'")
+    )
+    assert fingerprint("SELECT * FROM t WHERE id IN (%s, %s)") == (
+        "SELECT * FROM t WHERE id IN (...)"
+    )
+
+
+def test_slow_endpoints_top():
+    endpoints = SlowEndpoints(size=3)
+    slow_queries = [4, 2]
+    endpoints.add("GET fast/", 0.01, 1)
+    endpoints.add("GET slow/", 0.5, slow_queries[0])
+    endpoints.add("GET slow/", 0.3, slow_queries[1])
+
+    top = endpoints.top(1)
+    assert [row["endpoint"] for row in top] == ["GET slow/"]
+    assert top[0]["avg_queries"] == sum(slow_queries) / len(slow_queries)
+
+
+def test_disabled_by_default(client, game):
+    response = client.get(reverse("games:comments", kwargs={"game_pk": game.pk}))
+    assert "Server-Timing" not in response
+
+
+def test_server_timing_and_log(client, game, user, instrumentation, caplog):
+    Comment.objects.create(game=game, author=user, text="first")
+    url = reverse("games:comments", kwargs={"game_pk": game.pk})
+
+    with caplog.at_level(logging.INFO, logger="games_project.instrumentation"):
+        response = client.get(url)
+
+    assert response.status_code == HTTPStatus.OK
+    assert 'desc="0 hits, 1 misses"' in response["Server-Timing"]
+    record = json.loads(caplog.records[-1].getMessage())
+    assert record["endpoint"] == "GET games/<int:game_pk>/comments/"
+    assert record["queries"] > 0
+
+
+def test_async_requests_are_measured(async_client, game, instrumentation, caplog):
+    url = reverse("games:comments", kwargs={"game_pk": game.pk})
+
+    with caplog.at_level(logging.INFO, logger="games_project.instrumentation"):
+        response = async_to_sync(async_client.get)(url)
+
+    assert response.status_code == HTTPStatus.OK
+    assert 'desc="0 hits, 1 misses"' in response["Server-Timing"]
+    # queries run in sync_to_async threads are counted too
+    assert json.loads(caplog.records[-1].getMessage())["queries"] > 0
+
+
+def test_duplicate_queries_are_reported(rf, category, instrumentation, caplog):
+    def n_plus_one_view(request):
+        for game in Game.objects.all():
+            list(game.equipment.all())
+        return HttpResponse()
+
+    for i in range(2):
+        Game.objects.create(title=f"Game {i}", slug=f"game-{i}", category=category)
+
+    with caplog.at_level(logging.INFO, logger="games_project.instrumentation"):
+        InstrumentationMiddleware(n_plus_one_view)(rf.get("/"))
+
+    record = json.loads(caplog.records[-1].getMessage())
+    assert caplog.records[-1].levelno == logging.WARNING
+    assert list(record["duplicate_queries"].values()) == [2]
+
+
+def test_slow_endpoints_page_is_staff_only(client, admin_client):
+    url = reverse("slow_endpoints")
+
+    assert client.get(url).status_code == HTTPStatus.FOUND
+    assert admin_client.get(url).status_code == HTTPStatus.OK
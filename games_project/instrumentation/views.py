@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.views.decorators import staff_member_required
+from django.shortcuts import render
+
+from .middleware import slow_endpoints
+
+
+@staff_member_required
+def slow_endpoints_view(request):
+    context = {
+        **admin.site.each_context(request),
+        "title": "Slow endpoints",
+        "enabled": settings.INSTRUMENTATION_ENABLED,
+        "window": settings.INSTRUMENTATION_WINDOW,
+        "endpoints": slow_endpoints.top(settings.INSTRUMENTATION_SLOW_ENDPOINTS),
+    }
+    return render(request, "instrumentation/slow_endpoints.html", context)
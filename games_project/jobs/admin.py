@@ -0,0 +1,73 @@
+from django.contrib import admin
+from django.contrib import messages
+from django.urls import reverse
+from django.utils.html import format_html
+
+from .models import Job
+from .services import job_create
+from .services import job_resume
+
+
+def queue_job(modeladmin, request, action, queryset):
+    """Queue the job action `action` over the objects of an admin action."""
+    job = job_create(action=action, queryset=queryset, created_by=request.user)
+    message = format_html(
+        'Queued as <a href="{}">job #{}</a>, see its progress there',
+        reverse("admin:jobs_job_change", args=[job.pk]),
+        job.pk,
+    )
+
+    modeladmin.message_user(request, message, messages.SUCCESS)
+    return job
+
+
+@admin.action(description="Resume selected failed jobs", permissions=["change"])
+def resume(self, request, queryset):
+    resumed = job_resume(queryset)
+    message = f"{resumed} job(s) were queued again"
+
+    self.message_user(request, message, messages.SUCCESS)
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = [
+        "id",
+        "action",
+        "status",
+        "display_progress",
+        "created_by",
+        "created",
+        "started",
+        "finished",
+    ]
+    list_filter = ["status", "action"]
+    list_select_related = ["created_by"]
+    fields = [
+        "action",
+        "content_type",
+        "status",
+        "display_progress",
+        "last_pk",
+        "created_by",
+        "created",
+        "started",
+        "heartbeat",
+        "finished",
+        "error",
+    ]
+    readonly_fields = fields
+    actions = [resume]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        # for the resume action, jobs themselves are changed by the workers
+        return obj is None and super().has_change_permission(request)
+
+    @admin.display(description="Progress")
+    def display_progress(self, obj):
+        if obj.progress is None:
+            return f"{obj.processed} done"
+        return f"{obj.processed} / {obj.total} ({obj.progress}%)"
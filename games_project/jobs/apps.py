@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class JobsConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "games_project.jobs"
+    verbose_name = "Jobs"
+
+    def ready(self):
+        # the job actions of every app, see services.job_action
+        autodiscover_modules("jobs")
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from games_project.jobs.services import job_claim
+from games_project.jobs.services import job_run
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the queued jobs, and the ones of crashed workers, chunk by chunk. "
+        "Runs until none is left, or checks for new ones every --interval "
+        "seconds until stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            help="Keep running, waiting this many seconds for new jobs.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            help="Objects per transaction, JOBS_CHUNK_SIZE by default.",
+        )
+
+    def handle(self, *args, **options):
+        interval = options["interval"]
+
+        while True:
+            while (job := job_claim()) is not None:
+                self.stdout.write(f"Running job {job}.")
+                status = job_run(job, chunk_size=options["chunk_size"])
+                self.stdout.write(f"Job {job}: {status or 'taken over'}.")
+            if not interval:
+                break
+
+            time.sleep(interval)
+            close_old_connections()
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.10 on 2026-10-18 15:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# their selection was only kept in the dropped pickled query
+FAIL_UNFINISHED_JOBS = """
+UPDATE jobs_job SET
+    status = 'failed',
+    error = 'Queued before the selection was stored as job items, run the action again',
+    finished = now()
+WHERE status IN ('pending', 'running')
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunSQL(FAIL_UNFINISHED_JOBS, migrations.RunSQL.noop),
+        migrations.RemoveField(
+            model_name='job',
+            name='query',
+        ),
+        migrations.CreateModel(
+            name='JobItem',
+            fields=[
+                ('pk', models.CompositePrimaryKey('job', 'object_pk', blank=True, editable=False, primary_key=True, serialize=False)),
+                ('object_pk', models.BigIntegerField()),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='jobs.job')),
+            ],
+            options={
+                'verbose_name': 'Job item',
+                'verbose_name_plural': 'Job items',
+            },
+        ),
+    ]
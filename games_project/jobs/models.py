@@ -0,0 +1,80 @@
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import models
+
+
+class Job(models.Model):
+    """
+    A registered action run over the objects staged as its items in pk
+    ordered chunks by the run_jobs command. Every chunk commits with the
+    progress, so a job taken over from a crashed worker continues after
+    `last_pk`.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        RUNNING = "running", "Running"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+
+    action = models.CharField(max_length=100)
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    status = models.CharField(max_length=10, choices=Status, default=Status.PENDING)
+    total = models.PositiveIntegerField(null=True, blank=True)
+    processed = models.PositiveIntegerField(default=0)
+    last_pk = models.BigIntegerField(null=True, blank=True)
+    # set by the worker running it, which proves it is alive with `heartbeat`
+    worker = models.UUIDField(null=True, blank=True)
+    heartbeat = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    created = models.DateTimeField(auto_now_add=True)
+    started = models.DateTimeField(null=True, blank=True)
+    finished = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Job"
+        verbose_name_plural = "Jobs"
+        ordering = ["-created", "-id"]
+        indexes = [
+            # pending and stale jobs claimed by the workers
+            models.Index(
+                fields=["created", "id"],
+                name="jobs_job_unfinished_idx",
+                condition=models.Q(status__in=["pending", "running"]),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.action} #{self.pk}"
+
+    @property
+    def progress(self):
+        """Done share of the objects in percent, None until counted."""
+        if self.total is None:
+            return None
+        if not self.total:
+            return 100
+        return min(100, round(100 * self.processed / self.total))
+
+
+class JobItem(models.Model):
+    """An object selected for a job, staged when the job is queued."""
+
+    pk = models.CompositePrimaryKey("job", "object_pk")
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name="items")
+    # of the job's content type, which has an integer primary key
+    object_pk = models.BigIntegerField()
+
+    class Meta:
+        verbose_name = "Job item"
+        verbose_name_plural = "Job items"
+
+    def __str__(self):
+        return f"{self.job} item {self.object_pk}"
@@ -0,0 +1,193 @@
+"""
+Bulk actions run outside of the request. job_create() stages the pks of a
+queryset as job items, the run_jobs command claims the job and applies its
+action to JOBS_CHUNK_SIZE of them at a time in pk order, one short
+transaction each.
+"""
+
+import logging
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.db import models
+from django.db import transaction
+from django.db.models import F
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Job
+from .models import JobItem
+
+# name: function, filled by job_action from the jobs modules of the apps
+JOB_ACTIONS = {}
+
+logger = logging.getLogger(__name__)
+
+
+class JobLostError(Exception):
+    """Another worker took the job over, this one missed its heartbeat."""
+
+
+def job_action(name):
+    """
+    Register the decorated function as the job action `name`. It is called
+    with a queryset of one chunk of objects, inside the chunk's transaction.
+    """
+
+    def register(func):
+        JOB_ACTIONS[name] = func
+        return func
+
+    return register
+
+
+def job_create(*, action, queryset, created_by=None):
+    """
+    Queue `action` over the objects of `queryset` as they are now. Their pks
+    are copied into the job items by one INSERT ... SELECT, which stays in
+    the database however many objects are selected.
+    """
+    if action not in JOB_ACTIONS:
+        msg = f"Unknown job action {action!r}"
+        raise ValueError(msg)
+    if not isinstance(queryset.model._meta.pk, models.IntegerField):  # noqa: SLF001
+        msg = f"Jobs need an integer primary key, {queryset.model} has none"
+        raise TypeError(msg)
+
+    table = JobItem._meta.db_table  # noqa: SLF001
+    sql, params = (
+        queryset.order_by().values_list("pk").distinct().query.sql_with_params()
+    )
+
+    with transaction.atomic():
+        job = Job.objects.create(
+            action=action,
+            content_type=ContentType.objects.get_for_model(
+                queryset.model,
+                for_concrete_model=False,
+            ),
+            created_by=created_by,
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {table} (job_id, object_pk)
+                SELECT %s, selected.pk FROM ({sql}) AS selected (pk)
+                """,  # noqa: S608
+                [job.pk, *params],
+            )
+            job.total = cursor.rowcount
+        job.save(update_fields=["total"])
+
+    return job
+
+
+def job_claim():
+    """
+    Take the oldest pending job, or a running one without a heartbeat for
+    JOBS_STALE_AFTER seconds as its worker likely crashed. None if there is
+    nothing to run.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.JOBS_STALE_AFTER)
+
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=Job.Status.PENDING)
+                | Q(status=Job.Status.RUNNING, heartbeat__lt=stale),
+            )
+            .order_by("created", "id")
+            .first()
+        )
+        if job is None:
+            return None
+
+        job.status = Job.Status.RUNNING
+        job.worker = uuid.uuid4()
+        job.heartbeat = now
+        job.started = job.started or now
+        job.save(update_fields=["status", "worker", "heartbeat", "started"])
+
+    return job
+
+
+def job_resume(jobs):
+    """Queue failed jobs again, they continue after their last chunk."""
+    return jobs.filter(status=Job.Status.FAILED).update(
+        status=Job.Status.PENDING,
+        error="",
+        finished=None,
+    )
+
+
+def _job_update(job, **fields):
+    # only while the job is still ours
+    if not Job.objects.filter(pk=job.pk, worker=job.worker).update(**fields):
+        raise JobLostError(job)
+
+
+def _job_pks(job):
+    return (
+        JobItem.objects.filter(job=job)
+        .order_by("object_pk")
+        .values_list("object_pk", flat=True)
+    )
+
+
+def job_run(job, chunk_size=None):
+    """
+    Run a claimed job to its end. Every chunk commits with the job progress,
+    so the job resumes after the last committed chunk wherever it stopped.
+    Returns the final status, None if another worker took the job over.
+    """
+    chunk_size = chunk_size or settings.JOBS_CHUNK_SIZE
+    model = job.content_type.model_class()
+    action = JOB_ACTIONS[job.action]
+    pks = _job_pks(job)
+
+    try:
+        while True:
+            remaining = (
+                pks if job.last_pk is None else pks.filter(object_pk__gt=job.last_pk)
+            )
+            chunk = list(remaining[:chunk_size])
+            if not chunk:
+                break
+
+            with transaction.atomic():
+                action(model._base_manager.filter(pk__in=chunk))  # noqa: SLF001
+                _job_update(
+                    job,
+                    processed=F("processed") + len(chunk),
+                    last_pk=chunk[-1],
+                    heartbeat=timezone.now(),
+                )
+            job.processed += len(chunk)
+            job.last_pk = chunk[-1]
+
+        with transaction.atomic():
+            _job_update(job, status=Job.Status.DONE, finished=timezone.now())
+            # no longer needed once done, failed jobs keep theirs to resume
+            JobItem.objects.filter(job=job).delete()
+        return Job.Status.DONE  # noqa: TRY300
+    except JobLostError:
+        logger.warning("Job %s was taken over by another worker", job)
+        return None
+    except Exception:
+        logger.exception("Job %s failed", job)
+        try:
+            _job_update(
+                job,
+                status=Job.Status.FAILED,
+                error=traceback.format_exc(),
+                finished=timezone.now(),
+            )
+        except JobLostError:
+            return None
+        return Job.Status.FAILED
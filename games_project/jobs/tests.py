@@ -0,0 +1,178 @@
+import datetime
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from games_project.feedback.models import Comment
+from games_project.games.models import Environment
+from games_project.games.models import Game
+from games_project.games.models import GameWithStats
+from games_project.jobs.models import Job
+from games_project.jobs.models import JobItem
+from games_project.jobs.services import JOB_ACTIONS
+from games_project.jobs.services import job_claim
+from games_project.jobs.services import job_create
+from games_project.jobs.services import job_run
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def games(category):
+    return [
+        Game.objects.create(title=f"Game {i}", slug=f"game-{i}", category=category)
+        for i in range(3)
+    ]
+
+
+class TestJobs:
+    def test_admin_action_queues_job(self, admin_client, admin_user, games):
+        response = admin_client.post(
+            reverse("admin:games_game_changelist"),
+            data={
+                "action": "make_indoor",
+                "_selected_action": [game.pk for game in games[:2]],
+            },
+            follow=True,
+        )
+
+        job = Job.objects.get()
+        assert "job #" in response.content.decode()
+        assert (job.action, job.status, job.created_by, job.total) == (
+            "games.make_indoor",
+            Job.Status.PENDING,
+            admin_user,
+            2,
+        )
+        assert list(job.items.values_list("object_pk", flat=True)) == [
+            games[0].pk,
+            games[1].pk,
+        ]
+        assert not Game.objects.filter(environment=Environment.INDOOR).exists()
+
+        call_command("run_jobs", chunk_size=1, stdout=None)
+
+        job.refresh_from_db()
+        assert (job.status, job.processed, job.total) == (Job.Status.DONE, 2, 2)
+        assert job.last_pk == games[1].pk
+        assert not JobItem.objects.exists()
+        assert set(
+            Game.objects.filter(environment=Environment.INDOOR).values_list(
+                "pk", flat=True
+            ),
+        ) == {games[0].pk, games[1].pk}
+
+        response = admin_client.get(reverse("admin:jobs_job_changelist"))
+        assert "2 / 2 (100%)" in response.content.decode()
+
+    def test_stats_admin_reset_rating(self, admin_client, games, user):
+        comment = Comment.objects.create(
+            game=games[0], author=user, text="good", rating=8
+        )
+
+        admin_client.post(
+            reverse("admin:games_gamewithstats_changelist"),
+            data={
+                "action": "reset_rating",
+                "select_across": "1",
+                "_selected_action": [games[0].pk],
+            },
+        )
+        job = Job.objects.get()
+        assert job.content_type.model_class() is GameWithStats
+
+        call_command("run_jobs", stdout=None)
+
+        comment.refresh_from_db()
+        assert comment.rating is None
+        job.refresh_from_db()
+        # the stats admin lists the games with rated comments only
+        assert (job.status, job.processed, job.total) == (Job.Status.DONE, 1, 1)
+
+    def test_resume_after_crash(self, settings, games):
+        job = job_create(action="games.soft_delete", queryset=Game.objects.all())
+        # a worker committed the first chunk, then stopped sending heartbeats
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.Status.RUNNING,
+            processed=1,
+            last_pk=games[0].pk,
+            heartbeat=timezone.now(),
+        )
+        assert job_claim() is None
+
+        Job.objects.filter(pk=job.pk).update(
+            heartbeat=timezone.now()
+            - datetime.timedelta(seconds=settings.JOBS_STALE_AFTER + 1),
+        )
+        claimed = job_claim()
+        assert claimed.pk == job.pk
+        assert job_run(claimed, chunk_size=1) == Job.Status.DONE
+
+        # the first game was done by the crashed worker
+        assert list(
+            Game.objects.filter(is_active=False).values_list("pk", flat=True),
+        ) == [games[1].pk, games[2].pk]
+        claimed.refresh_from_db()
+        assert (claimed.processed, claimed.last_pk) == (3, games[2].pk)
+
+    def test_objects_selected_when_queued(self, games):
+        job_create(
+            action="games.soft_delete",
+            queryset=Game.objects.filter(title__in=["Game 0", "Game 1"]),
+        )
+        Game.objects.filter(pk=games[1].pk).update(title="Renamed")
+        Game.objects.filter(pk=games[2].pk).update(title="Game 1")
+
+        assert job_run(job_claim()) == Job.Status.DONE
+        assert list(
+            Game.objects.filter(is_active=False).values_list("pk", flat=True),
+        ) == [games[0].pk, games[1].pk]
+
+    def test_taken_over_job_stops(self, games):
+        job_create(action="games.soft_delete", queryset=Game.objects.all())
+        job = job_claim()
+        # another worker claimed it meanwhile
+        Job.objects.filter(pk=job.pk).update(worker=None)
+
+        assert job_run(job, chunk_size=1) is None
+        assert not Game.objects.filter(is_active=False).exists()
+
+    def test_failed_job_resumes(self, admin_client, monkeypatch, games):
+        fail = {"pk": games[1].pk}
+
+        def flaky_action(chunk):
+            if chunk.filter(pk=fail["pk"]).exists():
+                msg = "flaky"
+                raise RuntimeError(msg)
+            chunk.update(is_active=False)
+
+        monkeypatch.setitem(JOB_ACTIONS, "test.flaky", flaky_action)
+        job = job_create(action="test.flaky", queryset=Game.objects.all())
+
+        call_command("run_jobs", chunk_size=1, stdout=None)
+
+        job.refresh_from_db()
+        assert (job.status, job.processed) == (Job.Status.FAILED, 1)
+        assert "RuntimeError: flaky" in job.error
+        # the failed chunk was rolled back, the one before it kept
+        assert list(
+            Game.objects.filter(is_active=False).values_list("pk", flat=True),
+        ) == [games[0].pk]
+        assert job.items.count() == len(games)
+
+        fail["pk"] = None
+        admin_client.post(
+            reverse("admin:jobs_job_changelist"),
+            data={"action": "resume", "_selected_action": [job.pk]},
+        )
+        call_command("run_jobs", chunk_size=1, stdout=None)
+
+        job.refresh_from_db()
+        assert (job.status, job.processed, job.error) == (Job.Status.DONE, 3, "")
+        assert not Game.objects.filter(is_active=True).exists()
+
+    def test_unknown_action(self):
+        with pytest.raises(ValueError, match="Unknown job action"):
+            job_create(action="games.nope", queryset=Game.objects.all())
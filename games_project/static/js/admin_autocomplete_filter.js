@@ -0,0 +1,14 @@
+// Apply the object picked in an AutocompleteFilter, see contrib/admin_toolkit.py
+django.jQuery(function($) {
+    // select2 triggers the change event of the underlying select
+    $(".autocomplete-filter select").on("change", function() {
+        const params = new URLSearchParams(window.location.search);
+        params.delete("p");
+        if (this.value) {
+            params.set(this.name, this.value);
+        } else {
+            params.delete(this.name);
+        }
+        window.location.search = params.toString();
+    });
+});
@@ -0,0 +1,24 @@
+// Load another page of a paginated inline into the change form, see contrib/admin_toolkit.py
+django.jQuery(function($) {
+    $(document).on("click", ".paginated-inline .paginator a", function(event) {
+        event.preventDefault();
+        const container = $(this).closest(".paginated-inline");
+        const url = this.href;
+
+        fetch(url).then(response => response.text()).then(html => {
+            const page = new DOMParser().parseFromString(html, "text/html");
+            const loaded = $(page.getElementById(container.attr("id")));
+            loaded.find("details").attr("open", "");
+            container.replaceWith(loaded);
+
+            // the "add another" row, as inlines.js does on page load
+            const group = loaded.find(".js-inline-admin-formset");
+            const options = group.data("inlineFormset");
+            const selector = options.name + "-group .tabular.inline-related tbody:first > tr.form-row";
+            $(selector).tabularFormset(selector, options.options);
+
+            // the change form posts to this URL, with the forms of this page
+            window.history.replaceState(null, "", url);
+        });
+    });
+});
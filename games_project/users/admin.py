@@ -4,6 +4,9 @@ from django.contrib import admin
 from django.contrib.auth import admin as auth_admin
 from django.utils.translation import gettext_lazy as _
 
+from games_project.contrib.admin_toolkit import AutocompleteFilter
+from games_project.contrib.admin_toolkit import LargeTableAdminMixin
+
 from .forms import UserAdminChangeForm
 from .forms import UserAdminCreationForm
 from .models import User
@@ -21,13 +24,18 @@ class NoAddMixin:
         return False
 
 
+class UserFilter(AutocompleteFilter):
+    field_path = "user"
+
+
 @admin.register(UserIp)
-class UserIpAdmin(NoAddMixin, admin.ModelAdmin):
+class UserIpAdmin(NoAddMixin, LargeTableAdminMixin, admin.ModelAdmin):
     list_display = [
         "ip_address",
         "user",
         "created",
     ]
+    list_filter = [UserFilter]
 
 
 @admin.register(User)
@@ -55,4 +63,5 @@ class UserAdmin(auth_admin.UserAdmin):
         (_("Important dates"), {"fields": ("last_login", "date_joined")}),
     )
     list_display = ["username", "name", "is_superuser"]
-    search_fields = ["name"]
+    # also the search of the user autocomplete filters
+    search_fields = ["username", "name", "email"]
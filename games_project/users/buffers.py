@@ -0,0 +1,90 @@
+import logging
+import threading
+import time
+
+from django.db import connection
+
+from .models import UserIp
+
+logger = logging.getLogger(__name__)
+
+
+class UserIpBuffer:
+    """
+    Collects first-seen-today user IPs in memory and saves them with one
+    bulk insert once `max_size` users or `flush_interval` seconds are reached.
+    In the background mode one flusher thread wakes every `flush_interval`,
+    or earlier when the buffer is full, until `close()`.
+    """
+
+    def __init__(self, max_size, flush_interval, *, background=True):
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self.background = background
+
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._wakeup = threading.Event()
+        self._flusher = None
+        self._stop = None
+
+    def add(self, user_id, ip_address):
+        with self._lock:
+            self._pending.setdefault(user_id, ip_address)
+            full = len(self._pending) >= self.max_size
+            if self.background:
+                self._start_flusher()
+            due = full or time.monotonic() - self._last_flush >= self.flush_interval
+
+        if self.background:
+            if full:
+                self._wakeup.set()
+        elif due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+
+        if not pending:
+            return []
+        return UserIp.save_new_ips(pending)
+
+    def close(self, timeout=None):
+        """Save the buffered IPs and stop the flusher."""
+        with self._lock:
+            flusher, self._flusher = self._flusher, None
+            stop = self._stop
+        if flusher is None:
+            self.flush()
+            return
+
+        # the flusher saves the rest before it stops
+        stop.set()
+        self._wakeup.set()
+        flusher.join(timeout)
+
+    def _start_flusher(self):
+        # on first use, a thread started before a worker fork would not run
+        if self._flusher is None or not self._flusher.is_alive():
+            self._stop = threading.Event()
+            self._flusher = threading.Thread(
+                target=self._run_flusher,
+                args=(self._stop,),
+                daemon=True,
+            )
+            self._flusher.start()
+
+    def _run_flusher(self, stop):
+        while not stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to save buffered user IPs")
+            finally:
+                # don't hold a connection open between flushes
+                connection.close()
@@ -1,15 +1,63 @@
-from .models import UserIp
+import atexit
+
+from asgiref.sync import iscoroutinefunction
+from asgiref.sync import markcoroutinefunction
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+
+from .buffers import UserIpBuffer
+
+SESSION_KEY = "user_ip_saved_on"
 
 
 class UserIpMiddleware:
+    """
+    Saves the first IP of each user per day. A session marker skips the
+    database once today's IP is known, new IPs are written in batches.
+    """
+
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self.buffer = UserIpBuffer(
+            max_size=settings.USER_IP_BUFFER_SIZE,
+            flush_interval=settings.USER_IP_FLUSH_INTERVAL,
+            background=settings.USER_IP_BACKGROUND_FLUSH,
+        )
+        atexit.register(self.buffer.flush)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
         user = request.user
 
         if user.is_authenticated:
-            ip_address = request.META.get("REMOTE_ADDR")
-            UserIp.save_ip_if_new(user, ip_address)
+            today = timezone.localdate().isoformat()
+
+            if request.session.get(SESSION_KEY) != today:
+                request.session[SESSION_KEY] = today
+                self.buffer.add(user.pk, request.META.get("REMOTE_ADDR"))
 
         return self.get_response(request)
+
+    async def __acall__(self, request):
+        user = await request.auser()
+
+        if user.is_authenticated:
+            today = timezone.localdate().isoformat()
+
+            if await request.session.aget(SESSION_KEY) != today:
+                await request.session.aset(SESSION_KEY, today)
+                # once per user and day, a foreground flush writes here
+                await sync_to_async(self.buffer.add)(
+                    user.pk,
+                    request.META.get("REMOTE_ADDR"),
+                )
+
+        return await self.get_response(request)
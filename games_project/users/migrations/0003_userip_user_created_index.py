@@ -0,0 +1,17 @@
+# Generated by Django 5.2.10 on 2026-10-18 14:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_userip'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userip',
+            index=models.Index(fields=['user', 'created'], name='users_useri_user_id_282bc4_idx'),
+        ),
+    ]
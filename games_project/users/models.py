@@ -1,3 +1,5 @@
+import datetime
+
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.db import models
@@ -18,19 +20,45 @@ class UserIp(models.Model):
     class Meta:
         ordering = ["-created"]
         verbose_name_plural = "User IPs"
+        indexes = [models.Index(fields=["user", "created"])]
 
     def __str__(self):
         return f"{self.user.username}: {self.ip_address}"
 
+    @staticmethod
+    def _today_start():
+        # a range on `created` can use the index, created__date cannot
+        return timezone.make_aware(
+            datetime.datetime.combine(timezone.localdate(), datetime.time.min),
+        )
+
     @classmethod
     def save_ip_if_new(cls, user, ip_address):
-        today = timezone.now().date()
-
-        if cls.objects.filter(user=user, created__date=today).exists():
+        if cls.objects.filter(user=user, created__gte=cls._today_start()).exists():
             return None
 
         return cls.objects.create(user=user, ip_address=ip_address)
 
+    @classmethod
+    def save_new_ips(cls, ips_by_user_id):
+        """Bulk insert today's first IP of each user that has none stored yet."""
+        if not ips_by_user_id:
+            return []
+
+        # users may have been deleted while their IP waited in a buffer
+        user_ids = (
+            User.objects.filter(pk__in=ips_by_user_id)
+            .exclude(ips__created__gte=cls._today_start())
+            .values_list("pk", flat=True)
+        )
+
+        return cls.objects.bulk_create(
+            [
+                cls(user_id=user_id, ip_address=ips_by_user_id[user_id])
+                for user_id in user_ids
+            ],
+        )
+
 
 class User(AbstractUser):
     """
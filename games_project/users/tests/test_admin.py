@@ -9,6 +9,8 @@ from django.urls import reverse
 from pytest_django.asserts import assertRedirects
 
 from games_project.users.models import User
+from games_project.users.models import UserIp
+from games_project.users.tests.factories import UserFactory
 
 
 class TestUserAdmin:
@@ -63,3 +65,18 @@ class TestUserAdmin:
         # The `admin` login view should redirect to the `allauth` login view
         target_url = reverse(settings.LOGIN_URL) + "?next=" + request.path
         assertRedirects(response, target_url, fetch_redirect_response=False)
+
+
+@pytest.mark.django_db
+class TestUserIpAdmin:
+    def test_changelist_filtered_by_user(self, admin_client):
+        user, other = UserFactory(), UserFactory()
+        UserIp.objects.create(user=user, ip_address="10.0.0.1")
+        UserIp.objects.create(user=other, ip_address="10.0.0.2")
+        url = reverse("admin:users_userip_changelist")
+
+        response = admin_client.get(url, data={"user__pk": user.pk})
+
+        assert response.status_code == HTTPStatus.OK
+        assert [ip.user for ip in response.context["cl"].result_list] == [user]
+        assert "admin-autocomplete" in response.content.decode()
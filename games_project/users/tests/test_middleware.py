@@ -0,0 +1,129 @@
+import threading
+
+import pytest
+from asgiref.sync import async_to_sync
+from asgiref.sync import iscoroutinefunction
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from games_project.users.buffers import UserIpBuffer
+from games_project.users.middleware import UserIpMiddleware
+from games_project.users.models import User
+from games_project.users.models import UserIp
+from games_project.users.tests.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def _request(rf: RequestFactory, user: User, session=None):
+    request = rf.get("/fake-url/")
+    request.user = user
+    if session is None:
+        SessionMiddleware(lambda r: None).process_request(request)
+    else:
+        request.session = session
+    return request
+
+
+class TestUserIpMiddleware:
+    def test_session_marker_skips_database(
+        self, rf: RequestFactory, user: User, django_assert_num_queries, settings
+    ):
+        settings.USER_IP_BUFFER_SIZE = 1
+        middleware = UserIpMiddleware(lambda request: HttpResponse())
+        request = _request(rf, user)
+
+        middleware(request)
+        assert UserIp.objects.filter(user=user).count() == 1
+
+        with django_assert_num_queries(0):
+            middleware(_request(rf, user, session=request.session))
+
+    def test_async_request(self, rf: RequestFactory, user: User, settings):
+        settings.USER_IP_BUFFER_SIZE = 1
+
+        async def get_response(request):
+            return HttpResponse()
+
+        async def auser():
+            return user
+
+        middleware = UserIpMiddleware(get_response)
+        request = _request(rf, user)
+        request.auser = auser
+
+        assert iscoroutinefunction(middleware)
+        async_to_sync(middleware)(request)
+        assert UserIp.objects.filter(user=user).count() == 1
+
+    def test_buffer_flushes_in_batches(self, rf: RequestFactory, settings):
+        settings.USER_IP_BUFFER_SIZE = 2
+        middleware = UserIpMiddleware(lambda request: HttpResponse())
+
+        middleware(_request(rf, UserFactory()))
+        assert not UserIp.objects.exists()
+
+        middleware(_request(rf, UserFactory()))
+        assert UserIp.objects.count() == len(User.objects.all())
+
+
+@pytest.fixture
+def background_buffer():
+    buffers = []
+
+    def create(**kwargs):
+        buffers.append(UserIpBuffer(**kwargs))
+        return buffers[-1]
+
+    yield create
+    # don't leave flusher threads running across the tests
+    for buffer in buffers:
+        buffer.close(timeout=5)
+
+
+class TestUserIpBuffer:
+    def test_flush_skips_users_saved_today(self, user: User):
+        UserIp.save_ip_if_new(user, "10.0.0.1")
+        buffer = UserIpBuffer(max_size=10, flush_interval=60, background=False)
+
+        buffer.add(user.pk, "10.0.0.2")
+        assert buffer.flush() == []
+        assert list(user.ips.values_list("ip_address", flat=True)) == ["10.0.0.1"]
+
+    def test_one_background_flusher(self, monkeypatch, background_buffer):
+        buffer = background_buffer(max_size=3, flush_interval=60)
+        flushed = threading.Event()
+        monkeypatch.setattr(UserIp, "save_new_ips", lambda pending: flushed.set())
+        threads = threading.active_count()
+
+        buffer.add(1, "10.0.0.1")
+        buffer.add(2, "10.0.0.2")
+        assert threading.active_count() == threads + 1
+        assert not flushed.wait(timeout=0.1)
+
+        # full, the flusher is woken before the interval
+        buffer.add(3, "10.0.0.3")
+        assert flushed.wait(timeout=5)
+        assert threading.active_count() == threads + 1
+
+        buffer.close(timeout=5)
+        assert threading.active_count() == threads
+
+    def test_close_saves_the_rest(self, monkeypatch, background_buffer):
+        buffer = background_buffer(max_size=10, flush_interval=60)
+        saved = []
+        monkeypatch.setattr(UserIp, "save_new_ips", saved.append)
+
+        buffer.add(1, "10.0.0.1")
+        buffer.close(timeout=5)
+        assert saved == [{1: "10.0.0.1"}]
+
+    def test_background_flush_without_new_ips(self, monkeypatch, background_buffer):
+        buffer = background_buffer(max_size=10, flush_interval=0.05)
+        flushed = threading.Event()
+        monkeypatch.setattr(UserIp, "save_new_ips", lambda pending: flushed.set())
+
+        buffer.add(1, "10.0.0.1")
+        # no further add, the interval alone triggers the flush
+        assert flushed.wait(timeout=5)